@@ -17,6 +17,10 @@ return [
     // Credential TTL (time to live) in seconds
     'ttl' => 3600,  // 1 hour
     
+    // Ranked ICE server list from: uv run scripts/test_turn_server.py <url> --rank
+    // Used instead of the built-in list when the file exists
+    'iceServersFile' => __DIR__ . '/ice-servers.json',
+    
     // Allowed origins for CORS (production)
     // Set to your actual domain, or keep '*' for development
     'allowedOrigins' => ['*'],  // Example: ['https://yourdomain.com', 'https://www.yourdomain.com']
@@ -91,6 +91,34 @@ $timestamp = time() + $ttl;
 $username = $timestamp . ':webmidi';
 $password = base64_encode(hash_hmac('sha1', $username, $turnSecret, true));
 
+// Ranked server list written by scripts/test_turn_server.py --rank, if present.
+// TURN entries in it carry no credentials; the ones minted above are added here.
+$rankedFile = $config['iceServersFile'] ?? __DIR__ . '/ice-servers.json';
+$ranked = is_readable($rankedFile) ? json_decode(file_get_contents($rankedFile), true) : null;
+
+if (!empty($ranked['iceServers']) && is_array($ranked['iceServers'])) {
+    $iceServers = [];
+    foreach ($ranked['iceServers'] as $server) {
+        $urls = (array) ($server['urls'] ?? []);
+        if (empty($urls)) {
+            continue;
+        }
+        $entry = ['urls' => $server['urls']];
+        if (preg_match('/^turns?:/', $urls[0])) {
+            $entry['username'] = $username;
+            $entry['credential'] = $password;
+        }
+        $iceServers[] = $entry;
+    }
+    echo json_encode([
+        'iceServers' => $iceServers,
+        'ttl' => $ttl,
+        'generated' => date('Y-m-d H:i:s'),
+        'ranked' => $ranked['generated'] ?? null
+    ]);
+    exit;
+}
+
 // Return ICE servers (STUN + TURN from voice.denizsincar.ru only)
 echo json_encode([
     'iceServers' => [
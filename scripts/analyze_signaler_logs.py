@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Signaler log analyzer
+
+Parses the log output of signaler/main.go (plain files or journalctl
+exports) and answers capacity questions about the hub without re-running
+load tests:
+
+  - per-room churn: joins, leaves, peak peers, first/last activity
+  - peak concurrent peers across the whole hub (the sum of each room's
+    latest peers_now, cleared when the signaler restarts)
+  - time series of send-buffer drops, write errors and ping errors
+  - peer session lengths (join → leave of the same peer in the same room)
+
+The file is memory-mapped and scanned with one precompiled regular
+expression, so multi-GB logs are read in a single pass without loading
+them into memory. With -j N the file is split into N newline-aligned byte
+ranges that are parsed in parallel; per-chunk partial results are merged
+exactly, including sessions that span chunk boundaries.
+
+Usage:
+    python scripts/analyze_signaler_logs.py <logfile> [-j WORKERS] [--bucket SECONDS] [--json report.json]
+
+Example:
+    journalctl -u signaler --no-pager > signaler.log
+    python scripts/analyze_signaler_logs.py signaler.log -j 8 --json report.json
+
+Note:
+    - Timestamps are the Go log prefix (YYYY/MM/DD HH:MM:SS, server local time)
+    - A repeated join of the same peer without a leave restarts its session
+      (the browser reconnects with the same peer id)
+"""
+
+import argparse
+import calendar
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+LINE_RE = re.compile(
+    rb'(\d{4}/\d\d/\d\d \d\d:\d\d:\d\d)(?:\.\d+)? '
+    rb'(?:'
+    rb'(join|leave) +room=(.*?) +peer=(\S+) +peers_now=(\d+)'
+    rb'|drop +peer=(\S+) \(send buffer full\)'
+    rb'|(write|ping) err peer=[^:\s]+:'
+    rb'|signaler (listening) on'
+    rb')'
+)
+
+DEFAULT_BUCKET = 60
+
+# Event kinds as captured by LINE_RE → report column names
+KINDS = {b'join': 'join', b'leave': 'leave', b'drop': 'drop', b'write': 'write_err', b'ping': 'ping_err'}
+
+
+def _new_result():
+    return {
+        'lines': 0,
+        'first': None,
+        'last': None,
+        'rooms': {},             # room -> [joins, leaves, peak, first_ts, last_ts]
+        'series': Counter(),     # (bucket_start, kind) -> count
+        'drops_by_peer': Counter(),
+        'levels': {},            # room -> latest peers_now (since the last restart, if any)
+        'restarted': False,      # the chunk contains a "signaler listening on" line
+        'first_touch': [],       # [room, max hub sum, ts] per room first seen before any restart
+        'peak': 0,               # hub peak after the chunk's first restart
+        'peak_time': None,
+        'sessions': [],          # completed session lengths in seconds
+        'open': {},              # (room, peer) -> join ts, still open at chunk end
+        'orphans': [],           # ((room, peer), ts) leaves before any join of that key in the chunk
+        'joined': set(),         # keys that joined at least once in the chunk
+        'unmatched_leaves': 0,
+    }
+
+
+def parse_range(path, start, end, bucket):
+    """Parse bytes [start, end) of a log file into a partial result.
+
+    This loop runs once per log line, so it works on raw bytes and caches
+    timestamp parsing per distinct second; names are decoded in merge().
+    """
+    result = _new_result()
+    rooms, series, open_sessions = result['rooms'], result['series'], result['open']
+    joined, orphans, sessions = result['joined'], result['orphans'], result['sessions']
+    drops_by_peer = result['drops_by_peer']
+    ts_cache = {}
+    levels, first_touch = result['levels'], result['first_touch']
+    lines = level_sum = peak = unmatched = 0
+    first = ts = peak_time = None
+    restarted = False
+
+    with open(path, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return result
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for m in LINE_RE.finditer(mm, start, end):
+                stamp, kind, room, peer, peers_now, dropped, err, listening = m.groups()
+                cached = ts_cache.get(stamp)
+                if cached is None:
+                    ts = calendar.timegm(time.strptime(stamp.decode(), '%Y/%m/%d %H:%M:%S'))
+                    if len(ts_cache) > 4096:
+                        ts_cache.clear()
+                    cached = ts_cache[stamp] = (ts, ts - ts % bucket)
+                ts, slot = cached
+                if first is None:
+                    first = ts
+                lines += 1
+
+                if kind is not None:
+                    key = (room, peer)
+                    info = rooms.get(room)
+                    if info is None:
+                        info = rooms[room] = [0, 0, 0, ts, ts]
+                    info[4] = ts
+
+                    # Hub size is the sum of every room's latest peers_now. Until
+                    # the chunk's first restart the levels of rooms not yet seen
+                    # here come from earlier chunks, so record each first touch
+                    # and let merge() add the carried-in levels back.
+                    now = int(peers_now)
+                    old = levels.get(room)
+                    level_sum += now - (old or 0)
+                    levels[room] = now
+                    if restarted:
+                        if level_sum > peak:
+                            peak, peak_time = level_sum, ts
+                    elif old is None:
+                        first_touch.append([room, level_sum, ts])
+                    elif level_sum > first_touch[-1][1]:
+                        first_touch[-1][1:] = level_sum, ts
+
+                    if kind == b'join':
+                        info[0] += 1
+                        if now > info[2]:
+                            info[2] = now
+                        open_sessions[key] = ts
+                        joined.add(key)
+                    else:
+                        info[1] += 1
+                        began = open_sessions.pop(key, None)
+                        if began is not None:
+                            sessions.append(ts - began)
+                        elif key in joined:
+                            unmatched += 1
+                        else:
+                            orphans.append((key, ts))
+                    series[(slot, kind)] += 1
+                elif dropped is not None:
+                    series[(slot, b'drop')] += 1
+                    drops_by_peer[dropped] += 1
+                elif listening is not None:
+                    # Restart: every room is empty again
+                    restarted = True
+                    levels.clear()
+                    level_sum = 0
+                else:
+                    series[(slot, err)] += 1
+
+    result.update(lines=lines, first=first, last=ts, restarted=restarted, peak=peak,
+                  peak_time=peak_time, unmatched_leaves=unmatched)
+    return result
+
+
+def split_ranges(path, parts):
+    """Split a file into newline-aligned byte ranges"""
+    size = os.path.getsize(path)
+    if parts <= 1 or size < 1 << 20:
+        return [(0, size)]
+    bounds = [0]
+    with open(path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, parts):
+            nl = mm.find(b'\n', size * i // parts)
+            if nl == -1:
+                break
+            if nl + 1 > bounds[-1]:
+                bounds.append(nl + 1)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def merge(results):
+    """Merge per-chunk results in file order into one"""
+    total = _new_result()
+    levels = total['levels']
+    for part in results:
+        if not part['lines']:
+            continue
+        total['lines'] += part['lines']
+        if total['first'] is None:
+            total['first'] = part['first']
+        total['last'] = part['last']
+
+        for room, (joins, leaves, peak, first, last) in part['rooms'].items():
+            info = total['rooms'].setdefault(room, [0, 0, 0, first, last])
+            info[0] += joins
+            info[1] += leaves
+            info[2] = max(info[2], peak)
+            info[4] = last
+        total['series'].update(part['series'])
+        total['drops_by_peer'].update(part['drops_by_peer'])
+
+        # Before its first restart a chunk only knows the rooms it has seen;
+        # the rest of the hub is whatever earlier chunks left behind
+        carried_sum = sum(levels.values())
+        replaced = 0
+        for room, level_sum, ts in part['first_touch']:
+            replaced += levels.get(room, 0)
+            if carried_sum - replaced + level_sum > total['peak']:
+                total['peak'], total['peak_time'] = carried_sum - replaced + level_sum, ts
+        if part['restarted']:
+            levels.clear()
+            if part['peak'] > total['peak']:
+                total['peak'], total['peak_time'] = part['peak'], part['peak_time']
+        levels.update(part['levels'])
+
+        # Leaves in this chunk whose join is in an earlier chunk
+        carried = total['open']
+        for key, ts in part['orphans']:
+            began = carried.pop(key, None)
+            if began is not None:
+                total['sessions'].append(ts - began)
+            else:
+                total['unmatched_leaves'] += 1
+        # A join in this chunk restarts any session carried over for the same key
+        for key in part['joined']:
+            carried.pop(key, None)
+        carried.update(part['open'])
+
+        total['sessions'].extend(part['sessions'])
+        total['unmatched_leaves'] += part['unmatched_leaves']
+    return total
+
+
+def analyze(path, workers=1, bucket=DEFAULT_BUCKET):
+    ranges = split_ranges(path, workers)
+    if len(ranges) == 1:
+        return merge([parse_range(path, *ranges[0], bucket)])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(parse_range, [path] * len(ranges), *zip(*ranges), [bucket] * len(ranges))
+        return merge(list(parts))
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = (len(sorted_values) - 1) * q
+    lo = int(idx)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (idx - lo)
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S') if ts is not None else None
+
+
+def build_report(result, bucket=DEFAULT_BUCKET):
+    """Turn a merged result into a JSON-serialisable report"""
+    sessions = sorted(result['sessions'])
+    span_hours = max((result['last'] or 0) - (result['first'] or 0), 1) / 3600
+
+    rooms = []
+    for name, (joins, leaves, peak, first, last) in result['rooms'].items():
+        rooms.append({
+            'room': name.decode('utf-8', 'replace'),
+            'joins': joins,
+            'leaves': leaves,
+            'peak_peers': peak,
+            'churn_per_hour': (joins + leaves) / max((last - first) / 3600, 1 / 60),
+            'first_seen': _iso(first),
+            'last_seen': _iso(last),
+        })
+    rooms.sort(key=lambda r: r['joins'] + r['leaves'], reverse=True)
+
+    buckets = sorted({b for b, _ in result['series']})
+    series = [dict(time=_iso(b), **{name: result['series'].get((b, kind), 0) for kind, name in KINDS.items()})
+              for b in buckets]
+    for point in series:
+        point['drop_rate_per_sec'] = point['drop'] / bucket
+
+    totals = dict.fromkeys(KINDS.values(), 0)
+    for (_, kind), count in result['series'].items():
+        totals[KINDS[kind]] += count
+
+    return {
+        'lines_matched': result['lines'],
+        'first': _iso(result['first']),
+        'last': _iso(result['last']),
+        'totals': totals,
+        'churn_per_hour': (totals['join'] + totals['leave']) / span_hours,
+        'peak_concurrent_peers': result['peak'],
+        'peak_concurrent_at': _iso(result['peak_time']),
+        'sessions': {
+            'completed': len(sessions),
+            'still_open': len(result['open']),
+            'unmatched_leaves': result['unmatched_leaves'],
+            'p50_s': _percentile(sessions, 0.50),
+            'p90_s': _percentile(sessions, 0.90),
+            'p99_s': _percentile(sessions, 0.99),
+            'max_s': sessions[-1] if sessions else None,
+        },
+        'top_dropped_peers': [(peer.decode('utf-8', 'replace'), n)
+                              for peer, n in result['drops_by_peer'].most_common(10)],
+        'rooms': rooms,
+        'bucket_seconds': bucket,
+        'series': series,
+    }
+
+
+def print_report(report, top=15):
+    print(f"\n{'='*70}")
+    print(f"SIGNALER LOG SUMMARY")
+    print(f"{'='*70}")
+    print(f"Lines matched : {report['lines_matched']}")
+    print(f"Time span     : {report['first']} → {report['last']}")
+    t = report['totals']
+    print(f"Joins/leaves  : {t['join']} / {t['leave']}  ({report['churn_per_hour']:.1f} per hour)")
+    print(f"Drops         : {t['drop']}   write errors: {t['write_err']}   ping errors: {t['ping_err']}")
+    print(f"Peak peers    : {report['peak_concurrent_peers']} at {report['peak_concurrent_at']}")
+
+    s = report['sessions']
+    print(f"\nSessions: {s['completed']} completed, {s['still_open']} still open, "
+          f"{s['unmatched_leaves']} leaves without join")
+    if s['completed']:
+        print(f"  p50 {s['p50_s']:.0f}s   p90 {s['p90_s']:.0f}s   p99 {s['p99_s']:.0f}s   max {s['max_s']:.0f}s")
+
+    print(f"\nBusiest rooms (of {len(report['rooms'])}):")
+    print(f"  {'room':<24} {'joins':>7} {'leaves':>7} {'peak':>5} {'churn/h':>8}")
+    for r in report['rooms'][:top]:
+        print(f"  {r['room'][:24]:<24} {r['joins']:>7} {r['leaves']:>7} {r['peak_peers']:>5} {r['churn_per_hour']:>8.1f}")
+
+    worst = sorted(report['series'], key=lambda p: p['drop'], reverse=True)[:5]
+    if worst and worst[0]['drop']:
+        print(f"\nWorst {report['bucket_seconds']}s windows for send-buffer drops:")
+        for p in worst:
+            if p['drop']:
+                print(f"  {p['time']}  {p['drop']:>6} drops ({p['drop_rate_per_sec']:.2f}/s)")
+    print(f"\n{'='*70}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze signaler logs for churn, drops and session lengths")
+    parser.add_argument('logfile')
+    parser.add_argument('-j', '--workers', type=int, default=1, help="parallel chunks [1]")
+    parser.add_argument('--bucket', type=int, default=DEFAULT_BUCKET, help="time-series bucket in seconds [60]")
+    parser.add_argument('--json', metavar='PATH', help="also write the full report as JSON")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.logfile):
+        print(f"ERROR: File not found: {args.logfile}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    result = analyze(args.logfile, workers=args.workers, bucket=args.bucket)
+    report = build_report(result, bucket=args.bucket)
+    elapsed = time.perf_counter() - started
+
+    print_report(report)
+    size_mb = os.path.getsize(args.logfile) / 1e6
+    print(f"Parsed {size_mb:.1f} MB in {elapsed:.2f}s ({size_mb / max(elapsed, 1e-9):.0f} MB/s)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Wrote {args.json}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nAnalysis interrupted by user")
+        sys.exit(1)
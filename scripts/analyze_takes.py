@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "numpy>=1.24",
+#   "pyarrow>=14.0",
+# ]
+# ///
+"""
+Batch harmonic analysis of recorded takes
+
+Turns every .mid file exported by MIDIRecorder.exportMID into NumPy
+note-state arrays and summarises it: chord timeline, note density, velocity
+statistics and sustain-pedal usage. Chords are named with the same rules as
+detectChord() in src/chord-utils.js, applied through the lookup table from
+generate_chord_table.py, so no per-event Python loop is involved.
+
+Takes are analysed in parallel across a process pool and written to a
+Parquet file with one row per take.
+
+Usage:
+    uv run scripts/analyze_takes.py <takes_dir> [-o summary.parquet] [-j WORKERS]
+
+Example:
+    uv run scripts/analyze_takes.py ~/midi-takes -o takes.parquet -j 8
+
+Note:
+    - Directories are searched recursively for *.mid / *.midi
+    - Files that fail to parse are reported and recorded with an 'error' column
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from generate_chord_table import build_table
+from midi_file import SMFError, read_smf, ticks_to_seconds
+
+# Same spelling as NOTE_NAMES in src/chord-utils.js
+NOTE_NAMES = ['C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B']
+
+SUSTAIN_CC = 64
+PEDAL_DOWN_THRESHOLD = 64
+
+_CHORD_TYPES, _TABLE_BYTES = build_table()
+CHORD_TABLE = np.frombuffer(_TABLE_BYTES, dtype=np.uint8)
+PC_WEIGHTS = (1 << np.arange(12)).astype(np.int64)
+STATE_CHUNK = 8192   # events per note-state block: 8192 × 128 int32 = 4 MB
+
+
+def note_state(status, data1, data2, chunk=STATE_CHUNK):
+    """Sounding-note matrices (≤ chunk events × 128) after each event.
+
+    Note-on/off are turned into +1/-1 per pitch and accumulated. The running
+    count is reflected at zero so note-offs for keys held before the take
+    started cannot drive a pitch negative. Blocks are yielded in order with
+    the 128-wide count and floor carried between them, so memory stays
+    bounded however long the take is.
+    """
+    kind = status & 0xF0
+    on = (kind == 0x90) & (data2 > 0)
+    off = (kind == 0x80) | ((kind == 0x90) & (data2 == 0))
+
+    count = np.zeros(128, dtype=np.int32)
+    floor = np.zeros(128, dtype=np.int32)
+    for start in range(0, len(status), chunk):
+        stop = min(start + chunk, len(status))
+        steps = np.zeros((stop - start, 128), dtype=np.int32)
+        rows = np.flatnonzero(on[start:stop] | off[start:stop])
+        steps[rows, data1[start + rows]] = np.where(on[start + rows], 1, -1)
+
+        counts = np.cumsum(steps, axis=0) + count
+        floors = np.minimum(np.minimum.accumulate(counts, axis=0), floor)
+        count, floor = counts[-1], floors[-1]
+        yield (counts - floors) > 0
+
+
+def chord_indices(active):
+    """Per-row (root pitch class, chord type index, sounding-note count).
+
+    Root is the lowest sounding pitch class, as detectChord() uses the bass
+    note. Rows with no notes get root -1; a single pitch class gets type ''.
+    """
+    n = len(active)
+    count = active.sum(axis=1)
+
+    padded = np.zeros((n, 132), dtype=bool)
+    padded[:, :128] = active
+    pc_mask = padded.reshape(n, 11, 12).any(axis=1) @ PC_WEIGHTS
+
+    bass = np.argmax(active, axis=1)
+    root = np.where(count > 0, bass % 12, -1)
+    shift = np.where(count > 0, bass % 12, 0)
+    rotated = ((pc_mask >> shift) | (pc_mask << (12 - shift))) & 0xFFF
+
+    # A lone pitch class resolves to '' (index 0) in detectChord as well
+    chord = np.where(rotated == 1, 0, CHORD_TABLE[rotated])
+    return root, chord, count
+
+
+def chord_timeline(times, root, chord, count):
+    """Collapse per-event chord labels into (start, end, label) segments"""
+    if not len(times):
+        return []
+
+    # Several events on the same tick form one harmonic state — keep the last
+    last_in_tick = np.append(times[1:] != times[:-1], True)
+    times, root, chord, count = times[last_in_tick], root[last_in_tick], chord[last_in_tick], count[last_in_tick]
+
+    label = np.where(count > 0, root * 256 + chord, -1)
+    change = np.flatnonzero(np.append(True, label[1:] != label[:-1]))
+    ends = np.append(times[change[1:]], times[-1])
+
+    timeline = []
+    for start_idx, end in zip(change.tolist(), ends.tolist()):
+        if label[start_idx] < 0:
+            continue
+        name = NOTE_NAMES[root[start_idx]] + _CHORD_TYPES[chord[start_idx]]
+        timeline.append({'start': float(times[start_idx]), 'end': float(end), 'chord': name})
+    return timeline
+
+
+def pedal_stats(times, status, data1, data2, duration):
+    """Sustain-pedal press count and fraction of the take it is held down"""
+    is_sustain = ((status & 0xF0) == 0xB0) & (data1 == SUSTAIN_CC)
+    if not is_sustain.any():
+        return 0, 0.0
+
+    pedal_times = times[is_sustain]
+    down = data2[is_sustain] >= PEDAL_DOWN_THRESHOLD
+    presses = int(np.count_nonzero(down & ~np.append(False, down[:-1])))
+
+    held_until = np.append(pedal_times[1:], duration)
+    held = float(np.sum((held_until - pedal_times)[down]))
+    return presses, (held / duration) if duration > 0 else 0.0
+
+
+def analyze_take(path):
+    """Summarise one take; returns a flat dict suitable for a table row"""
+    row = {'path': str(path), 'error': None}
+    try:
+        take = read_smf(path)
+    except (OSError, SMFError) as e:
+        row['error'] = str(e)
+        return row
+
+    status, data1, data2 = take['status'], take['data1'], take['data2']
+    times = ticks_to_seconds(take['delta'], take['ppq'], take['tempos'])
+    duration = float(times[-1]) if len(times) else 0.0
+
+    note_on = ((status & 0xF0) == 0x90) & (data2 > 0)
+    velocities = data2[note_on].astype(np.float64)
+    note_count = int(velocities.size)
+
+    blocks = [chord_indices(active) for active in note_state(status, data1, data2)] or [chord_indices(np.zeros((0, 128), bool))]
+    root, chord, count = (np.concatenate(parts) for parts in zip(*blocks))
+    timeline = chord_timeline(times, root, chord, count)
+    presses, held = pedal_stats(times, status, data1, data2, duration)
+
+    per_second = np.bincount(times[note_on].astype(np.int64)) if note_count else np.zeros(1)
+
+    row.update({
+        'duration_s': duration,
+        'event_count': int(len(status)),
+        'note_count': note_count,
+        'notes_per_sec': note_count / duration if duration > 0 else 0.0,
+        'peak_notes_per_sec': int(per_second.max()),
+        'max_polyphony': int(count.max()) if len(count) else 0,
+        'velocity_mean': float(velocities.mean()) if note_count else None,
+        'velocity_std': float(velocities.std()) if note_count else None,
+        'velocity_min': int(velocities.min()) if note_count else None,
+        'velocity_max': int(velocities.max()) if note_count else None,
+        'velocity_p50': float(np.percentile(velocities, 50)) if note_count else None,
+        'velocity_p90': float(np.percentile(velocities, 90)) if note_count else None,
+        'pedal_presses': presses,
+        'pedal_down_ratio': held,
+        'chord_changes': len(timeline),
+        'distinct_chords': len({seg['chord'] for seg in timeline}),
+        'chord_timeline': timeline,
+    })
+    return row
+
+
+def find_takes(directory):
+    directory = Path(directory)
+    return sorted(p for p in directory.rglob('*') if p.suffix.lower() in ('.mid', '.midi') and p.is_file())
+
+
+def write_parquet(rows, output):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    timeline_type = pa.list_(pa.struct([
+        ('start', pa.float64()), ('end', pa.float64()), ('chord', pa.string()),
+    ]))
+    schema = pa.schema([
+        ('path', pa.string()),
+        ('error', pa.string()),
+        ('duration_s', pa.float64()),
+        ('event_count', pa.int64()),
+        ('note_count', pa.int64()),
+        ('notes_per_sec', pa.float64()),
+        ('peak_notes_per_sec', pa.int64()),
+        ('max_polyphony', pa.int64()),
+        ('velocity_mean', pa.float64()),
+        ('velocity_std', pa.float64()),
+        ('velocity_min', pa.int64()),
+        ('velocity_max', pa.int64()),
+        ('velocity_p50', pa.float64()),
+        ('velocity_p90', pa.float64()),
+        ('pedal_presses', pa.int64()),
+        ('pedal_down_ratio', pa.float64()),
+        ('chord_changes', pa.int64()),
+        ('distinct_chords', pa.int64()),
+        ('chord_timeline', timeline_type),
+    ])
+    table = pa.Table.from_pylist(rows, schema=schema)
+    pq.write_table(table, output, compression='zstd')
+
+
+def analyze_directory(directory, workers=None, chunksize=16):
+    """Analyse every take under directory in a process pool"""
+    paths = find_takes(directory)
+    if not paths:
+        return []
+    if workers == 1:
+        return [analyze_take(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze_take, paths, chunksize=chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chord timeline and performance statistics for recorded takes")
+    parser.add_argument('directory', help="directory containing .mid takes (searched recursively)")
+    parser.add_argument('-o', '--output', default='takes.parquet', help="Parquet output file [takes.parquet]")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="worker processes [CPU count]")
+    args = parser.parse_args()
+
+    if not Path(args.directory).is_dir():
+        print(f"ERROR: Not a directory: {args.directory}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    rows = analyze_directory(args.directory, workers=args.workers)
+    if not rows:
+        print(f"No .mid files found in {args.directory}")
+        sys.exit(1)
+
+    write_parquet(rows, args.output)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for r in rows if r['error'])
+    print(f"✅ Analysed {len(rows) - failed} take(s) in {elapsed:.2f}s → {args.output}")
+    if failed:
+        print(f"⚠ {failed} file(s) could not be parsed (see the 'error' column)")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nAnalysis interrupted by user")
+        sys.exit(1)
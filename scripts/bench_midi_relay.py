@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "aiohttp>=3.9",
+# ]
+# ///
+"""
+MIDI relay vs. mesh benchmark
+
+Every participant plays at the same time, sending midi-worker.js packets
+(flags + Float64 timestamp + 3 MIDI bytes), and every participant
+receives everyone else's notes. Two delivery modes are compared at each
+room size:
+
+  - mesh:  each client sends every packet to each of the N−1 peers itself
+           (plain UDP on loopback — a lower bound for DataChannel cost,
+           no DTLS/SCTP work)
+  - relay: each client sends every packet once over the signaler's /relay
+           WebSocket, and the server fans it out
+
+Per mode and room size it reports per-client egress (payload and an
+estimate including per-packet protocol headers), the time each client
+spends in its send path per note, end-to-end latency percentiles, the
+fraction of packets delivered and the relay's queue drops.
+
+Usage:
+    uv run scripts/bench_midi_relay.py [--binary signaler/signaler] [--sizes 4,8,16,32] [--rate 20] [--duration 10]
+
+Example:
+    (cd signaler && go build -o signaler .)
+    uv run scripts/bench_midi_relay.py --sizes 4,8,16,32 --duration 15 --json relay.json
+
+Note:
+    - All clients run in this process, so the clocks used for latency agree;
+      at large sizes the Python receive loop adds latency to both modes alike
+    - Results are appended to the benchmark result store as 'midi_relay'
+      (see bench_results.py; --no-record to skip)
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import struct
+import sys
+import time
+from pathlib import Path
+
+from bench_results import metric, percentile, record
+from bench_signaler_routing import Signaler
+from scrape_signaler_metrics import parse_metrics
+
+try:
+    import aiohttp
+except ImportError:
+    print("ERROR: aiohttp library not found. Install with: pip install aiohttp")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BINARY = ROOT / "signaler" / "signaler"
+
+# Approximate per-packet header bytes on the wire (IPv4, no options)
+#   mesh:  IP 20 + UDP 8 + DTLS record 13 + AES-GCM nonce/tag 24 + SCTP common 12 + DATA chunk 16
+#   relay: IP 20 + TCP 20 + TLS 1.3 record 5 + type/tag 17 + WebSocket client frame 6 (masked)
+MESH_OVERHEAD = 93
+RELAY_OVERHEAD = 68
+
+NOTE = bytes([0x90, 60, 100])
+
+
+def midi_packet():
+    """midi-worker.js layout: flags (bit 0 = timestamp), Float64 BE timestamp, MIDI bytes"""
+    return struct.pack('>Bd', 0x01, time.perf_counter() * 1000) + NOTE
+
+
+def packet_latency(packet):
+    if len(packet) < 9 or not packet[0] & 0x01:
+        return None
+    return time.perf_counter() * 1000 - struct.unpack_from('>d', packet, 1)[0]
+
+
+class Participant:
+    """Send/receive bookkeeping shared by both modes"""
+
+    def __init__(self, peer_id):
+        self.id = peer_id
+        self.sent = 0
+        self.sent_bytes = 0
+        self.send_time = 0.0       # seconds spent inside the send path
+        self.received = 0
+        self.latency = []
+
+
+class MeshParticipant(Participant, asyncio.DatagramProtocol):
+    def __init__(self, peer_id):
+        super().__init__(peer_id)
+        self.transport = None
+        self.peers = []
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=('127.0.0.1', 0))
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    @property
+    def address(self):
+        return self.transport.get_extra_info('sockname')
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        self.latency.append(packet_latency(data))
+
+    async def send(self, packet):
+        start = time.perf_counter()
+        for addr in self.peers:
+            self.transport.sendto(packet, addr)
+        self.send_time += time.perf_counter() - start
+        self.sent += 1
+        self.sent_bytes += len(packet) * len(self.peers)
+        return len(self.peers)
+
+    async def close(self):
+        self.transport.close()
+
+
+class RelayParticipant(Participant):
+    def __init__(self, peer_id, session, url):
+        super().__init__(peer_id)
+        self.session = session
+        self.url = url
+        self.ws = None
+        self.subscribers = set()
+        self.reader = None
+
+    async def open(self):
+        self.ws = await self.session.ws_connect(self.url, heartbeat=None)
+        self.reader = asyncio.create_task(self.read())
+
+    async def read(self):
+        async for msg in self.ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                data = json.loads(msg.data)
+                if data.get('type') == 'subscribers':
+                    self.subscribers = set(data['peers']) - {self.id}
+            elif msg.type == aiohttp.WSMsgType.BINARY:
+                frame = msg.data
+                self.received += 1
+                self.latency.append(packet_latency(frame[1 + frame[0]:]))
+            else:
+                break
+
+    async def send(self, packet):
+        start = time.perf_counter()
+        await self.ws.send_bytes(packet)
+        self.send_time += time.perf_counter() - start
+        self.sent += 1
+        self.sent_bytes += len(packet)
+        return len(self.subscribers)
+
+    async def close(self):
+        await self.ws.close()
+        self.reader.cancel()
+        await asyncio.gather(self.reader, return_exceptions=True)
+
+
+async def relay_metrics(session, port):
+    async with session.get(f"http://127.0.0.1:{port}/metrics") as resp:
+        values, _ = parse_metrics(await resp.text())
+    return values
+
+
+async def play(p, rate, deadline):
+    """Send notes at `rate` per second with jittered spacing until the deadline"""
+    await asyncio.sleep(random.uniform(0, 1 / rate))
+    while time.perf_counter() < deadline:
+        await p.send(midi_packet())
+        await asyncio.sleep(random.uniform(0.5, 1.5) / rate)
+
+
+async def run_size(mode, size, port, rate, duration, room):
+    async with aiohttp.ClientSession() as session:
+        if mode == 'mesh':
+            clients = [MeshParticipant(f"m{i:03d}") for i in range(size)]
+            for c in clients:
+                await c.open()
+            for c in clients:
+                c.peers = [o.address for o in clients if o is not c]
+        else:
+            url = lambda pid: f"ws://127.0.0.1:{port}/relay?room={room}&peer={pid}"
+            clients = [RelayParticipant(f"r{i:03d}", session, url(f"r{i:03d}")) for i in range(size)]
+            for c in clients:
+                await c.open()
+            for _ in range(100):
+                if all(len(c.subscribers) == size - 1 for c in clients):
+                    break
+                await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError(f"relay room {room} did not reach {size} subscribers")
+        before = await relay_metrics(session, port)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(play(c, rate, start + duration) for c in clients))
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.5)   # let in-flight packets arrive
+
+        after = await relay_metrics(session, port)
+        for c in clients:
+            await c.close()
+
+    latency = [ms for c in clients for ms in c.latency if ms is not None]
+    expected = sum(c.sent for c in clients) * (size - 1)
+    overhead = MESH_OVERHEAD if mode == 'mesh' else RELAY_OVERHEAD
+    egress = [c.sent_bytes / elapsed for c in clients]
+    wire = [(c.sent_bytes + c.sent * overhead * ((size - 1) if mode == 'mesh' else 1)) / elapsed for c in clients]
+    delta = lambda name: after.get(name, 0) - before.get(name, 0)
+    return {
+        'mode': mode,
+        'size': size,
+        'packets_per_client_s': sum(c.sent for c in clients) / size / elapsed,
+        'egress_Bps': egress,
+        'wire_Bps': wire,
+        'send_us': [c.send_time / c.sent * 1e6 for c in clients if c.sent],
+        'latency_ms': latency,
+        'delivered': sum(c.received for c in clients) / expected if expected else 0.0,
+        'relay_drops': int(delta('signaler_relay_drops_total')),
+        'server_egress_Bps': delta('signaler_relay_sent_bytes_total') / elapsed,
+    }
+
+
+def print_table(results):
+    mean = lambda xs: sum(xs) / len(xs) if xs else 0.0
+    print(f"\n{'='*70}")
+    print("MIDI RELAY VS MESH (per client)")
+    print(f"{'='*70}")
+    print(f"  {'mode':<6} {'peers':>5} {'egress KB/s':>12} {'wire KB/s':>10} {'send µs':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'deliv.':>7} {'drops':>6}")
+    for r in results:
+        lat = r['latency_ms'] or [0]
+        print(f"  {r['mode']:<6} {r['size']:>5} {mean(r['egress_Bps']) / 1024:>12.2f} {mean(r['wire_Bps']) / 1024:>10.2f} "
+              f"{mean(r['send_us']):>8.1f} {percentile(lat, 50):>7.2f} {percentile(lat, 95):>7.2f} "
+              f"{percentile(lat, 99):>7.2f} {r['delivered'] * 100:>6.1f}% {r['relay_drops']:>6}")
+    relay = [r for r in results if r['mode'] == 'relay']
+    if relay:
+        print()
+    for r in relay:
+        print(f"  relay server egress at {r['size']:>2} peers: {r['server_egress_Bps'] / 1024:8.1f} KB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare server-side MIDI relay with the WebRTC mesh")
+    parser.add_argument('--binary', default=str(DEFAULT_BINARY), help="signaler binary [signaler/signaler]")
+    parser.add_argument('--port', type=int, default=18767)
+    parser.add_argument('--sizes', default='4,8,16,32', help="room sizes [4,8,16,32]")
+    parser.add_argument('--modes', default='mesh,relay', help="mesh, relay or both [mesh,relay]")
+    parser.add_argument('--rate', type=float, default=20.0, help="packets per second per participant [20]")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of playing per size [10]")
+    parser.add_argument('--json', help="write results as JSON to this file")
+    parser.add_argument('--no-record', action='store_true', help="don't append to the benchmark result store")
+    args = parser.parse_args()
+
+    if not Path(args.binary).is_file():
+        print(f"ERROR: signaler binary not found: {args.binary}")
+        print("Build it with: cd signaler && go build -o signaler .")
+        sys.exit(1)
+    sizes = [int(s) for s in args.sizes.split(',')]
+    modes = [m.strip() for m in args.modes.split(',')]
+
+    async def run_all():
+        signaler = Signaler(args.binary, args.port)
+        await signaler.start()
+        results = []
+        try:
+            for size in sizes:
+                for mode in modes:
+                    print(f"  {mode:<6} {size:>3} peers × {args.rate:g} notes/s for {args.duration:g}s ...", flush=True)
+                    results.append(await run_size(mode, size, args.port, args.rate, args.duration,
+                                                  room=f"relay-bench-{size}"))
+        finally:
+            signaler.stop()
+        return results
+
+    print(f"Benchmarking {args.binary}")
+    results = asyncio.run(run_all())
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Wrote {args.json}")
+    if not args.no_record:
+        metrics = {}
+        for r in results:
+            key = f"{r['mode']}/n={r['size']}"
+            metrics[f"{key}/latency"] = metric(r['latency_ms'])
+            metrics[f"{key}/egress"] = metric(r['wire_Bps'], unit='B/s')
+            metrics[f"{key}/send"] = metric(r['send_us'], unit='µs')
+        run = record('midi_relay', metrics, params={
+            'binary': args.binary, 'sizes': sizes, 'modes': modes,
+            'rate': args.rate, 'duration': args.duration,
+        })
+        print(f"✅ Recorded midi_relay run {run['id']}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nBenchmark interrupted by user")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"\n✗ {e}")
+        sys.exit(1)
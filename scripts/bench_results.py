@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Benchmark result store
+
+Shared results layer for the project's Python tooling (test_turn_server.py,
+soak_signaler.py, generate_chord_table.py --bench, ...). A run is one JSON
+document:
+
+    {
+      "id": "20260105T120301Z-3f9a",
+      "benchmark": "turn_server",
+      "timestamp": "2026-01-05T12:03:01+00:00",
+      "env": {"host", "platform", "python", "cpus", "git_commit", "git_dirty"},
+      "params": {...},
+      "metrics": {"<name>": {"unit": "ms", "better": "lower", "count": N, "samples": [...]}}
+    }
+
+Runs are appended, one per line, to <store>/<benchmark>.jsonl and never
+rewritten. The store defaults to bench-results/ in the repo root
+(override with BENCH_RESULTS_DIR).
+
+Two runs are compared metric by metric: the change of each percentile
+gets a bootstrap confidence interval, and a metric is flagged as a
+regression when the whole interval lies beyond the threshold in the
+"worse" direction.
+
+Usage:
+    uv run scripts/bench_results.py list [benchmark]
+    uv run scripts/bench_results.py show <run_id>
+    uv run scripts/bench_results.py compare <benchmark> [--baseline ID] [--candidate ID] [--threshold 0.05]
+
+Example:
+    uv run scripts/test_turn_server.py https://example.com/get-turn-credentials.php
+    # ... change coturn config, run again ...
+    uv run scripts/bench_results.py compare turn_server
+
+Note:
+    - Standard library only, so every script can import it
+    - compare exits with code 1 when a regression is flagged
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_STORE = ROOT / "bench-results"
+
+MAX_SAMPLES = 5000          # samples kept per metric; larger inputs are subsampled uniformly
+BOOTSTRAP_RESAMPLES = 1000
+CONFIDENCE = 0.95
+MIN_SAMPLES_FOR_CI = 5      # below this a metric is compared by its point value only
+REGRESSION_THRESHOLD = 0.05
+PERCENTILES = (50, 90)
+
+
+class SampleReservoir:
+    """Uniform sample of an unbounded stream in constant memory (Algorithm R)"""
+
+    def __init__(self, size=MAX_SAMPLES, seed=None):
+        self.size = size
+        self.count = 0
+        self.values = []
+        self._rng = random.Random(seed)
+
+    def add(self, value):
+        self.count += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            i = self._rng.randrange(self.count)
+            if i < self.size:
+                self.values[i] = value
+
+    def extend(self, values):
+        for v in values:
+            self.add(v)
+
+
+def _git(*args):
+    try:
+        result = subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def environment():
+    """Metadata that decides whether two runs are comparable at all"""
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'git_commit': _git('rev-parse', '--short', 'HEAD'),
+        'git_dirty': bool(status) if status is not None else None,
+    }
+
+
+def new_run(benchmark, params=None):
+    """Empty run document; fill run['metrics'] with metric() values"""
+    now = datetime.now(timezone.utc)
+    return {
+        'id': f"{now.strftime('%Y%m%dT%H%M%SZ')}-{random.getrandbits(16):04x}",
+        'benchmark': benchmark,
+        'timestamp': now.isoformat(timespec='seconds'),
+        'env': environment(),
+        'params': params or {},
+        'metrics': {},
+    }
+
+
+def metric(samples, unit='ms', better='lower'):
+    """Metric entry from raw samples (a list or a SampleReservoir)"""
+    if isinstance(samples, SampleReservoir):
+        count, values = samples.count, list(samples.values)
+    else:
+        values = [v for v in samples if v is not None]
+        count = len(values)
+        if len(values) > MAX_SAMPLES:
+            values = random.sample(values, MAX_SAMPLES)
+    if better not in ('lower', 'higher'):
+        raise ValueError(f"better must be 'lower' or 'higher', not {better!r}")
+    return {'unit': unit, 'better': better, 'count': count, 'samples': values}
+
+
+class ResultStore:
+    """Append-only JSONL store, one file per benchmark"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or os.environ.get('BENCH_RESULTS_DIR') or DEFAULT_STORE)
+
+    def _file(self, benchmark):
+        if not benchmark or '/' in benchmark or benchmark.startswith('.'):
+            raise ValueError(f"invalid benchmark name: {benchmark!r}")
+        return self.path / f"{benchmark}.jsonl"
+
+    def append(self, run):
+        """Append one run; returns the file it went to"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = self._file(run['benchmark'])
+        line = json.dumps(run, separators=(',', ':')) + '\n'
+        # A single O_APPEND write keeps concurrent writers from interleaving lines
+        fd = os.open(target, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode('utf-8'))
+        finally:
+            os.close(fd)
+        return target
+
+    def benchmarks(self):
+        return sorted(p.stem for p in self.path.glob('*.jsonl'))
+
+    def runs(self, benchmark):
+        """All runs of a benchmark, oldest first; unreadable lines are skipped"""
+        target = self._file(benchmark)
+        if not target.exists():
+            return []
+        runs = []
+        with open(target, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue   # torn last line after a crash
+        return runs
+
+    def get(self, run_id, benchmark=None):
+        for name in [benchmark] if benchmark else self.benchmarks():
+            for run in self.runs(name):
+                if run['id'] == run_id:
+                    return run
+        return None
+
+
+def record(benchmark, metrics, params=None, store=None):
+    """Build and store a run in one call; returns the run"""
+    run = new_run(benchmark, params)
+    run['metrics'] = metrics
+    (store or ResultStore()).append(run)
+    return run
+
+
+# ── Statistics ─────────────────────────────────────────────────────────────────
+
+def percentile(values, p):
+    """Linear-interpolated percentile, p in 0..100"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def bootstrap_change(baseline, candidate, p, resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """Relative change of the p-th percentile with a percentile-bootstrap CI.
+
+    Returns (change, low, high) as fractions, e.g. 0.12 = 12% larger.
+    """
+    base = percentile(baseline, p)
+    cand = percentile(candidate, p)
+    if not base:
+        return None, None, None
+    change = (cand - base) / base
+
+    rng = random.Random(seed)
+    changes = []
+    for _ in range(resamples):
+        b = percentile(rng.choices(baseline, k=len(baseline)), p)
+        c = percentile(rng.choices(candidate, k=len(candidate)), p)
+        if b:
+            changes.append((c - b) / b)
+    if not changes:
+        return change, None, None
+    alpha = (1 - confidence) / 2
+    return change, percentile(changes, alpha * 100), percentile(changes, (1 - alpha) * 100)
+
+
+def compare_runs(baseline, candidate, percentiles=PERCENTILES, threshold=REGRESSION_THRESHOLD,
+                 resamples=BOOTSTRAP_RESAMPLES):
+    """Per-metric, per-percentile comparison rows.
+
+    Each row has 'metric', 'percentile', 'baseline', 'candidate', 'change',
+    'ci' and 'verdict' ('regression', 'improvement' or 'same'). With a CI the
+    whole interval must clear the threshold; without one the point change is
+    used.
+    """
+    rows = []
+    for name in sorted(set(baseline['metrics']) & set(candidate['metrics'])):
+        b, c = baseline['metrics'][name], candidate['metrics'][name]
+        if not b['samples'] or not c['samples']:
+            continue
+        lower_is_better = c.get('better', 'lower') == 'lower'
+        with_ci = min(len(b['samples']), len(c['samples'])) >= MIN_SAMPLES_FOR_CI
+
+        for p in percentiles:
+            if with_ci:
+                change, low, high = bootstrap_change(b['samples'], c['samples'], p, resamples)
+            else:
+                base, cand = percentile(b['samples'], p), percentile(c['samples'], p)
+                change = (cand - base) / base if base else None
+                low = high = None
+            if change is None:
+                continue
+
+            # Smallest plausible worsening / improvement within the interval
+            lo, hi = (low, high) if low is not None else (change, change)
+            worse, better = (lo, -hi) if lower_is_better else (-hi, lo)
+            verdict = 'regression' if worse > threshold else 'improvement' if better > threshold else 'same'
+            rows.append({
+                'metric': name,
+                'unit': c.get('unit', ''),
+                'percentile': p,
+                'baseline': percentile(b['samples'], p),
+                'candidate': percentile(c['samples'], p),
+                'change': change,
+                'ci': [low, high] if low is not None else None,
+                'verdict': verdict,
+            })
+    return rows
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────────
+
+def _pick(runs, ref, default_index):
+    """Run by id, or by negative index into the benchmark's history (-1 = latest)"""
+    if ref is None:
+        ref = str(default_index)
+    if ref.lstrip('-').isdigit():
+        index = int(ref)
+        return runs[index] if -len(runs) <= index < len(runs) else None
+    return next((r for r in runs if r['id'] == ref), None)
+
+
+def cmd_list(store, args):
+    names = [args.benchmark] if args.benchmark else store.benchmarks()
+    if not names:
+        print(f"No results in {store.path}")
+        return 0
+    for name in names:
+        runs = store.runs(name)
+        print(f"\n{name} ({len(runs)} run(s))")
+        for run in runs[-args.limit:]:
+            env = run.get('env', {})
+            dirty = '+' if env.get('git_dirty') else ''
+            print(f"  {run['id']}  {env.get('host', '?'):<16} {env.get('git_commit') or '-'}{dirty:<2} "
+                  f"{len(run['metrics'])} metric(s)")
+    return 0
+
+
+def cmd_show(store, args):
+    run = store.get(args.run_id)
+    if run is None:
+        print(f"ERROR: run not found: {args.run_id}")
+        return 1
+    print(f"{run['benchmark']} {run['id']} ({run['timestamp']})")
+    for key, value in {**run['env'], **run['params']}.items():
+        print(f"  {key:<12} {value}")
+    print(f"\n  {'metric':<56} {'n':>6} {'p50':>10} {'p90':>10} {'p99':>10}")
+    for name, m in sorted(run['metrics'].items()):
+        cells = ' '.join(f"{percentile(m['samples'], p):>10.3f}" if m['samples'] else f"{'-':>10}"
+                         for p in (50, 90, 99))
+        print(f"  {name[:56]:<56} {m['count']:>6} {cells} {m['unit']}")
+    return 0
+
+
+def cmd_compare(store, args):
+    runs = store.runs(args.benchmark)
+    candidate = _pick(runs, args.candidate, -1)
+    baseline = _pick(runs, args.baseline, -2)
+    if candidate is None or baseline is None:
+        print(f"ERROR: need two runs of '{args.benchmark}' to compare ({len(runs)} stored)")
+        return 1
+    if baseline['id'] == candidate['id']:
+        print("ERROR: baseline and candidate are the same run")
+        return 1
+
+    percentiles = tuple(float(p) for p in args.percentiles.split(','))
+    rows = compare_runs(baseline, candidate, percentiles, args.threshold, args.resamples)
+    regressions = [r for r in rows if r['verdict'] == 'regression']
+
+    if args.json:
+        print(json.dumps({'baseline': baseline['id'], 'candidate': candidate['id'],
+                          'threshold': args.threshold, 'rows': rows}, indent=2))
+        return 1 if regressions else 0
+
+    print(f"Baseline : {baseline['id']} ({baseline['env'].get('git_commit')}, {baseline['env'].get('host')})")
+    print(f"Candidate: {candidate['id']} ({candidate['env'].get('git_commit')}, {candidate['env'].get('host')})")
+    for key in ('host', 'cpus', 'platform'):
+        if baseline['env'].get(key) != candidate['env'].get(key):
+            print(f"⚠ Runs differ in {key}: {baseline['env'].get(key)} vs {candidate['env'].get(key)}")
+    if not rows:
+        print("\nNo metrics in common")
+        return 0
+
+    print(f"\n  {'metric':<56} {'pct':>4} {'baseline':>10} {'candidate':>10} {'change':>8} {'95% CI':>18}")
+    marks = {'regression': '✗', 'improvement': '✓', 'same': ' '}
+    for r in rows:
+        ci = f"[{r['ci'][0]:+6.1%}, {r['ci'][1]:+6.1%}]" if r['ci'] else f"{'(n too small)':>18}"
+        print(f"{marks[r['verdict']]} {r['metric'][:56]:<56} p{r['percentile']:<3g} {r['baseline']:>10.3f} "
+              f"{r['candidate']:>10.3f} {r['change']:>+8.1%} {ci:>18}")
+
+    improved = sum(1 for r in rows if r['verdict'] == 'improvement')
+    print(f"\n{len(regressions)} regression(s), {improved} improvement(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and compare stored benchmark runs")
+    parser.add_argument('--store', help=f"results directory [$BENCH_RESULTS_DIR or {DEFAULT_STORE.name}/]")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('list', help="list stored runs")
+    p.add_argument('benchmark', nargs='?')
+    p.add_argument('-n', '--limit', type=int, default=20, help="runs shown per benchmark [20]")
+
+    p = sub.add_parser('show', help="percentiles of every metric in a run")
+    p.add_argument('run_id')
+
+    p = sub.add_parser('compare', help="flag regressions between two runs")
+    p.add_argument('benchmark')
+    p.add_argument('--baseline', help="run id or index (-2 = previous run) [-2]")
+    p.add_argument('--candidate', help="run id or index (-1 = latest run) [-1]")
+    p.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                   help=f"relative change that counts as a regression [{REGRESSION_THRESHOLD}]")
+    p.add_argument('--percentiles', default=','.join(map(str, PERCENTILES)),
+                   help=f"percentiles to compare [{','.join(map(str, PERCENTILES))}]")
+    p.add_argument('--resamples', type=int, default=BOOTSTRAP_RESAMPLES,
+                   help=f"bootstrap resamples [{BOOTSTRAP_RESAMPLES}]")
+    p.add_argument('--json', action='store_true', help="print rows as JSON")
+
+    args = parser.parse_args()
+    store = ResultStore(args.store)
+    commands = {'list': cmd_list, 'show': cmd_show, 'compare': cmd_compare}
+    sys.exit(commands[args.command](store, args))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+        sys.exit(1)
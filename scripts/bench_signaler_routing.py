@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "aiohttp>=3.9",
+# ]
+# ///
+"""
+Signaler routing benchmark
+
+Replays the mesh-setup traffic webrtc.js produces when peers join a room
+and measures how the signaler delivers it as the room grows:
+
+  - every peer announces itself with a broadcast 'join'
+  - every peer already in the room answers with an SDP offer addressed
+    ('to') to the newcomer, which replies with an SDP answer
+  - both sides then trickle ICE candidates to each other
+
+Clients read with a small per-message delay (a busy browser main thread),
+so a hub that fans every message out to the whole room fills the 32-slot
+send channels and drops messages (read from /metrics, or counted from
+'drop  peer=...' log lines for builds without it).
+
+Per binary and room size it reports messages sent, messages received
+(and how many of those were addressed to someone else), the resulting
+fan-out, dropped messages and the time until every pair has exchanged
+offer, answer and candidates.
+
+Usage:
+    uv run scripts/bench_signaler_routing.py [--binary LABEL=PATH ...] [--sizes 4,8,16,32] [--trials 3]
+
+Example:
+    # Baseline: the signaler from before targeted routing
+    git worktree add /tmp/sig-old <old-commit> && (cd /tmp/sig-old/signaler && go build -o signaler .)
+    (cd signaler && go build -o signaler .)
+    uv run scripts/bench_signaler_routing.py --binary broadcast=/tmp/sig-old/signaler/signaler \\
+                                             --binary routed=signaler/signaler
+
+Note:
+    - Results are appended to the benchmark result store as
+      'signaler_routing' (see bench_results.py; --no-record to skip)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_results import metric, record
+from scrape_signaler_metrics import parse_metrics
+
+try:
+    import aiohttp
+except ImportError:
+    print("ERROR: aiohttp library not found. Install with: pip install aiohttp")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BINARY = ROOT / "signaler" / "signaler"
+
+SDP_BYTES = 3000           # typical data-channel-only offer/answer
+CANDIDATE_BYTES = 200
+CANDIDATES_PER_SIDE = 6
+SETUP_TIMEOUT = 15.0
+
+
+class Peer:
+    """One signaling client doing what webrtc.js does during mesh setup"""
+
+    def __init__(self, bench, room, peer_id, read_delay):
+        self.bench = bench
+        self.room = room
+        self.id = peer_id
+        self.read_delay = read_delay
+        self.ws = None
+        self.received = 0
+        self.foreign = 0          # addressed to another peer (webrtc.js discards these)
+        self.done_with = {}       # remote id → addressed messages received from it
+
+    async def connect(self, session, port):
+        url = f"ws://127.0.0.1:{port}/signal?room={self.room}&peer={self.id}"
+        self.ws = await session.ws_connect(url, heartbeat=None, max_msg_size=0)
+
+    async def send(self, msg):
+        await self.ws.send_str(json.dumps(msg))
+        self.bench.sent += 1
+
+    async def offer_to(self, remote, kind):
+        await self.send({'type': 'sdp', 'from': self.id, 'to': remote,
+                         'sdp': {'type': kind, 'sdp': 'v=0' + 'x' * SDP_BYTES}})
+        for i in range(CANDIDATES_PER_SIDE):
+            await self.send({'type': 'ice', 'from': self.id, 'to': remote,
+                             'candidate': {'candidate': f'candidate:{i} ' + 'x' * CANDIDATE_BYTES}})
+
+    async def run(self):
+        async for raw in self.ws:
+            if raw.type != aiohttp.WSMsgType.TEXT:
+                break
+            self.received += 1
+            if self.read_delay:
+                await asyncio.sleep(self.read_delay)
+            msg = json.loads(raw.data)
+            if msg.get('to') and msg['to'] != self.id:
+                self.foreign += 1
+                continue
+            sender = msg.get('from')
+            if msg['type'] == 'join':
+                await self.offer_to(sender, 'offer')
+            elif msg['type'] in ('sdp', 'ice'):
+                self.done_with[sender] = self.done_with.get(sender, 0) + 1
+                if msg['type'] == 'sdp' and msg['sdp']['type'] == 'offer':
+                    await self.offer_to(sender, 'answer')
+                self.bench.check_complete()
+
+
+class RoutingBenchmark:
+    """Runs one room of a given size against a running signaler"""
+
+    def __init__(self, port, size, join_interval, read_delay, room):
+        self.port = port
+        self.size = size
+        self.join_interval = join_interval
+        self.read_delay = read_delay
+        self.room = room
+        self.sent = 0
+        self.peers = []
+        self.complete = asyncio.Event()
+
+    def check_complete(self):
+        # Each side of every pair receives one SDP plus its candidates
+        needed = 1 + CANDIDATES_PER_SIDE
+        if all(len(p.done_with) == self.size - 1 and min(p.done_with.values()) >= needed for p in self.peers):
+            self.complete.set()
+
+    async def run(self):
+        async with aiohttp.ClientSession() as session:
+            self.peers = [Peer(self, self.room, f"p{i:03d}", self.read_delay) for i in range(self.size)]
+            for p in self.peers:
+                await p.connect(session, self.port)
+            readers = [asyncio.create_task(p.run()) for p in self.peers]
+
+            start = time.perf_counter()
+            for p in self.peers:
+                await p.send({'type': 'join', 'from': p.id})
+                await asyncio.sleep(self.join_interval)
+            try:
+                await asyncio.wait_for(self.complete.wait(), SETUP_TIMEOUT)
+                setup_ms = (time.perf_counter() - start) * 1000
+            except asyncio.TimeoutError:
+                setup_ms = None
+            # Let in-flight fan-out settle before counting
+            await asyncio.sleep(0.2)
+
+            for p in self.peers:
+                await p.ws.close()
+            for r in readers:
+                r.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+
+        needed = 1 + CANDIDATES_PER_SIDE
+        incomplete = sum(1 for p in self.peers for other in self.peers if other is not p
+                         and p.done_with.get(other.id, 0) < needed)
+        received = sum(p.received for p in self.peers)
+        return {
+            'sent': self.sent,
+            'received': received,
+            'foreign': sum(p.foreign for p in self.peers),
+            'fanout': received / self.sent if self.sent else 0.0,
+            'incomplete': incomplete,
+            'setup_ms': setup_ms,
+        }
+
+
+class Signaler:
+    """A signaler process; drops come from /metrics, or its log for older builds"""
+
+    def __init__(self, binary, port):
+        self.binary = binary
+        self.port = port
+        self.log = tempfile.NamedTemporaryFile(prefix='signaler-', suffix='.log', delete=False)
+        self.proc = None
+
+    async def start(self):
+        self.proc = subprocess.Popen([str(self.binary), '-addr', f'127.0.0.1:{self.port}'],
+                                     stdout=self.log, stderr=self.log)
+        async with aiohttp.ClientSession() as session:
+            for _ in range(100):
+                if self.proc.poll() is not None:
+                    raise RuntimeError(f"{self.binary} exited with code {self.proc.returncode}")
+                try:
+                    async with session.get(f"http://127.0.0.1:{self.port}/health") as resp:
+                        if resp.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise RuntimeError(f"{self.binary} did not answer /health within 10s")
+
+    async def drops(self):
+        async with aiohttp.ClientSession() as session:
+            try:
+                async with session.get(f"http://127.0.0.1:{self.port}/metrics") as resp:
+                    if resp.status == 200:
+                        values, _ = parse_metrics(await resp.text())
+                        if 'signaler_send_drops_total' in values:
+                            return int(values['signaler_send_drops_total'])
+            except aiohttp.ClientError:
+                pass
+        with open(self.log.name, 'rb') as f:
+            return sum(1 for line in f if b'drop  peer=' in line)
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.log.close()
+        os.unlink(self.log.name)
+
+
+async def bench_binary(label, binary, port, sizes, trials, join_interval, read_delay):
+    signaler = Signaler(binary, port)
+    await signaler.start()
+    results = []
+    try:
+        for size in sizes:
+            for trial in range(trials):
+                before = await signaler.drops()
+                bench = RoutingBenchmark(port, size, join_interval, read_delay, room=f"bench-{size}-{trial}")
+                result = await bench.run()
+                result.update(label=label, size=size, trial=trial, drops=await signaler.drops() - before)
+                results.append(result)
+                setup = f"{result['setup_ms']:8.1f} ms" if result['setup_ms'] is not None else "  timeout"
+                print(f"  {label:<12} n={size:<3} trial {trial + 1}: sent={result['sent']:<6} "
+                      f"recv={result['received']:<7} fan-out={result['fanout']:5.2f} "
+                      f"drops={result['drops']:<5} setup={setup}")
+    finally:
+        signaler.stop()
+    return results
+
+
+def print_table(results, sizes, labels):
+    print(f"\n{'='*70}")
+    print(f"ROUTING SUMMARY (mean over trials)")
+    print(f"{'='*70}")
+    print(f"  {'binary':<12} {'peers':>5} {'sent':>7} {'received':>9} {'foreign':>8} {'fan-out':>8} "
+          f"{'drops':>7} {'incompl.':>8} {'setup ms':>9}")
+    for label in labels:
+        for size in sizes:
+            rows = [r for r in results if r['label'] == label and r['size'] == size]
+            if not rows:
+                continue
+            mean = lambda key: sum(r[key] for r in rows) / len(rows)
+            setups = [r['setup_ms'] for r in rows if r['setup_ms'] is not None]
+            setup = f"{sum(setups) / len(setups):9.1f}" if setups else f"{'timeout':>9}"
+            print(f"  {label:<12} {size:>5} {mean('sent'):>7.0f} {mean('received'):>9.0f} {mean('foreign'):>8.0f} "
+                  f"{mean('fanout'):>8.2f} {mean('drops'):>7.0f} {mean('incomplete'):>8.0f} {setup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fan-out and drop rate of signaler routing versus room size")
+    parser.add_argument('--binary', action='append', metavar='LABEL=PATH',
+                        help="signaler binary to test, repeatable [routed=signaler/signaler]")
+    parser.add_argument('--sizes', default='4,8,16,32', help="room sizes [4,8,16,32]")
+    parser.add_argument('--trials', type=int, default=3, help="rooms per size [3]")
+    parser.add_argument('--port', type=int, default=18766)
+    parser.add_argument('--join-interval', type=float, default=0.02, help="seconds between joins [0.02]")
+    parser.add_argument('--read-delay', type=float, default=0.001, help="client processing time per message, s [0.001]")
+    parser.add_argument('--json', help="write all trial results as JSON to this file")
+    parser.add_argument('--no-record', action='store_true', help="don't append to the benchmark result store")
+    args = parser.parse_args()
+
+    binaries = []
+    for spec in args.binary or [f"routed={DEFAULT_BINARY}"]:
+        label, sep, path = spec.partition('=')
+        if not sep:
+            label, path = Path(spec).name, spec
+        if not Path(path).is_file():
+            print(f"ERROR: signaler binary not found: {path}")
+            print("Build it with: cd signaler && go build -o signaler .")
+            sys.exit(1)
+        binaries.append((label, path))
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    results = []
+    for label, path in binaries:
+        print(f"\nBenchmarking {label} ({path})")
+        results += asyncio.run(bench_binary(label, path, args.port, sizes, args.trials,
+                                            args.join_interval, args.read_delay))
+
+    print_table(results, sizes, [label for label, _ in binaries])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Wrote {args.json}")
+    if not args.no_record:
+        metrics = {}
+        for label, _ in binaries:
+            for size in sizes:
+                rows = [r for r in results if r['label'] == label and r['size'] == size]
+                metrics[f"{label}/n={size}/setup"] = metric([r['setup_ms'] for r in rows])
+                metrics[f"{label}/n={size}/fanout"] = metric([r['fanout'] for r in rows], unit='x')
+                metrics[f"{label}/n={size}/drops"] = metric([r['drops'] for r in rows], unit='messages')
+        run = record('signaler_routing', metrics, params={
+            'binaries': dict(binaries), 'sizes': sizes, 'trials': args.trials,
+            'join_interval': args.join_interval, 'read_delay': args.read_delay,
+        })
+        print(f"✅ Recorded signaler_routing run {run['id']}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nBenchmark interrupted by user")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"\n✗ {e}")
+        sys.exit(1)
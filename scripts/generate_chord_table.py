@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Chord lookup table generator for Web MIDI Streamer
+
+detectChord() in src/chord-utils.js walks a long chain of interval checks
+for every chord change. The chord type only depends on the set of pitch
+classes above the bass note, so this script enumerates all 4096 pitch-class
+sets, resolves each one with the same rules and writes src/chord-table.js.
+The JS side then builds a 12-bit interval mask (bit 0 = bass) and indexes
+the table in O(1).
+
+Usage:
+    python scripts/generate_chord_table.py            # regenerate src/chord-table.js
+    python scripts/generate_chord_table.py --check    # fail if the table is stale
+    python scripts/generate_chord_table.py --verify   # compare against the JS rules (needs node)
+    python scripts/generate_chord_table.py --bench    # micro-benchmark lookup vs rules (needs node)
+
+Note:
+    - The rules below are a line-by-line port of detectChordByRules() in
+      src/chord-utils.js. Change both together, then regenerate.
+    - The root of a detected chord is always the bass (first) note, so the
+      table stores only the chord type; masks without bit 0 set cannot be
+      produced by detectChord() and are stored as an empty type.
+"""
+
+import argparse
+import base64
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TABLE_PATH = ROOT / "src" / "chord-table.js"
+CHORD_UTILS_PATH = ROOT / "src" / "chord-utils.js"
+
+TABLE_SIZE = 1 << 12
+
+
+def resolve_chord_type(mask):
+    """Resolve a bass-relative interval mask to a chord type string.
+
+    Mirrors detectChordByRules() for a pitch-class set with at least two
+    distinct pitch classes. Bit n of mask is set when the interval of n
+    semitones above the bass is present.
+    """
+    def has(interval):
+        return bool(mask & (1 << interval))
+
+    # Step 1: Identify base chord quality
+    third_type = None
+    seventh_type = None
+
+    if has(4):
+        third_type = 'major'
+    elif has(3):
+        third_type = 'minor'
+
+    if has(11):
+        seventh_type = 'maj7'
+    elif has(10):
+        seventh_type = 'dom7'
+
+    # Sixth chords (interval 9, no seventh)
+    if has(9) and not has(10) and not has(11):
+        if third_type == 'major':
+            return '6/9' if has(2) else '6'
+        elif third_type == 'minor':
+            return 'm6/9' if has(2) else 'm6'
+
+    if third_type == 'major' and seventh_type == 'dom7':
+        base_chord = '7'
+    elif third_type == 'major' and seventh_type == 'maj7':
+        base_chord = 'maj7'
+    elif third_type == 'minor' and seventh_type == 'dom7':
+        base_chord = 'm7'
+    elif third_type == 'minor' and seventh_type == 'maj7':
+        base_chord = 'mM7'
+    elif third_type == 'major' and not seventh_type:
+        base_chord = ''
+    elif third_type == 'minor' and not seventh_type:
+        base_chord = 'm'
+    elif has(3) and has(6) and not has(7) and has(10):
+        return 'ø7'
+    elif has(3) and has(6) and not has(7) and has(9):
+        return 'dim7'
+    elif has(3) and has(6) and not has(7):
+        return 'dim'
+    elif has(4) and has(8):
+        return 'aug'
+    elif has(5) and has(7):
+        if has(10):
+            return '7sus4(b9)' if has(1) else '7sus4'
+        return 'sus4'
+    elif has(2) and has(7) and not has(3) and not has(4):
+        return '7sus2' if has(10) else 'sus2'
+    else:
+        return 'Custom'
+
+    # Step 2: Check for alterations and extensions
+    extensions = []
+
+    if has(1):
+        extensions.append('b9')
+    elif has(3) and third_type == 'major':
+        extensions.append('#9')
+    elif has(2) and base_chord in ('7', 'maj7', 'm7', 'mM7'):
+        if not has(1) and not has(3):
+            extensions.append('9')
+
+    # Interval 6 is #11 only alongside a perfect 5th
+    if has(6) and has(7):
+        extensions.append('#11')
+
+    if has(9) and base_chord in ('7', 'maj7', 'm7'):
+        extensions.append('13')
+    elif has(8) and base_chord in ('7', 'maj7'):
+        extensions.append('b13')
+
+    chord_name = base_chord
+
+    if (base_chord == '7' and '9' in extensions
+            and 'b9' not in extensions and '#9' not in extensions):
+        if len(extensions) == 1 or (len(extensions) == 2 and '13' in extensions):
+            chord_name = '9'
+            extensions.pop(0)
+
+    if base_chord == '7' and '13' in extensions:
+        chord_name = '13'
+        extensions.remove('13')
+
+    if extensions:
+        chord_name += '(' + ','.join(extensions) + ')'
+
+    return chord_name
+
+
+def build_table():
+    """Enumerate all 4096 masks; return (type names, per-mask type index)"""
+    types = ['']
+    index_of = {'': 0}
+    table = bytearray(TABLE_SIZE)
+
+    for mask in range(TABLE_SIZE):
+        # detectChord() always sets the bass bit
+        if not mask & 1:
+            continue
+        chord_type = resolve_chord_type(mask)
+        if chord_type not in index_of:
+            index_of[chord_type] = len(types)
+            types.append(chord_type)
+        table[mask] = index_of[chord_type]
+
+    if len(types) > 255:
+        raise ValueError(f"Too many chord types for a byte table: {len(types)}")
+
+    return types, bytes(table)
+
+
+def render_module(types, table):
+    """Render src/chord-table.js"""
+    encoded = base64.b64encode(table).decode('ascii')
+    # Wrap the base64 payload so the file stays diff-friendly
+    chunks = [encoded[i:i + 96] for i in range(0, len(encoded), 96)]
+    payload = ' +\n    '.join(f"'{chunk}'" for chunk in chunks)
+    type_list = ',\n    '.join(f"'{t}'" for t in types)
+
+    return f"""/**
+ * Chord lookup table — GENERATED by scripts/generate_chord_table.py, do not edit.
+ *
+ * CHORD_TABLE is indexed by a 12-bit interval mask relative to the bass note
+ * (bit n set = pitch class n semitones above the bass is sounding) and holds
+ * an index into CHORD_TYPES. Regenerate after changing detectChordByRules().
+ */
+
+export const CHORD_TYPES = [
+    {type_list},
+];
+
+const ENCODED =
+    {payload};
+
+export const CHORD_TABLE = Uint8Array.from(atob(ENCODED), c => c.charCodeAt(0));
+"""
+
+
+def write_table(path=TABLE_PATH):
+    types, table = build_table()
+    path.write_text(render_module(types, table), encoding='utf-8')
+    print(f"✅ Wrote {path.relative_to(ROOT)} ({len(types)} chord types, {len(table)} entries)")
+
+
+def check_table(path=TABLE_PATH):
+    types, table = build_table()
+    expected = render_module(types, table)
+    if not path.exists() or path.read_text(encoding='utf-8') != expected:
+        print(f"❌ {path.relative_to(ROOT)} is stale — run scripts/generate_chord_table.py")
+        return False
+    print(f"✅ {path.relative_to(ROOT)} is up to date")
+    return True
+
+
+# ── Node harnesses ─────────────────────────────────────────────────────────────
+#
+# src/*.js are ES modules without a package.json "type" field, so node is fed
+# .mjs copies of chord-utils.js and chord-table.js from a temporary directory.
+
+VERIFY_JS = r"""
+import { detectChord, detectChordByRules, NOTE_NAMES } from './chord-utils.mjs';
+
+const SHARPS = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'];
+let checked = 0, failures = [];
+
+function compare(notes) {
+    const a = JSON.stringify(detectChord(notes));
+    const b = JSON.stringify(detectChordByRules(notes));
+    checked++;
+    if (a !== b && failures.length < 20) failures.push({ notes, lookup: a, rules: b });
+}
+
+// Every pitch-class set, voiced over every bass note, with flat and sharp spellings
+for (let mask = 0; mask < 4096; mask++) {
+    for (let bass = 0; bass < 12; bass++) {
+        if (!(mask & (1 << bass))) continue;
+        for (const names of [NOTE_NAMES, SHARPS]) {
+            const notes = [names[bass] + '3'];
+            for (let pc = 0; pc < 12; pc++) {
+                if (pc !== bass && (mask & (1 << pc))) notes.push(names[pc] + '4');
+            }
+            compare(notes);
+        }
+    }
+}
+
+// Degenerate inputs: empty, single notes, doubled notes, mixed spellings
+compare([]);
+compare(['C4']);
+compare(['C3', 'C4', 'C5']);
+compare(['C#3', 'Db4', 'F4']);
+compare(['E2', 'C4', 'E4', 'G4']);
+
+console.log(JSON.stringify({ checked, failures }));
+"""
+
+BENCH_JS = r"""
+import { detectChord, detectChordByRules, NOTE_NAMES } from './chord-utils.mjs';
+
+// A fixed pool of realistic voicings (3-6 notes) so both paths see the same input
+let seed = 42;
+const rand = () => (seed = (seed * 1103515245 + 12345) & 0x7fffffff) / 0x7fffffff;
+const pool = [];
+for (let i = 0; i < 4096; i++) {
+    const size = 3 + Math.floor(rand() * 4);
+    const notes = [];
+    for (let j = 0; j < size; j++) notes.push(36 + Math.floor(rand() * 48));
+    notes.sort((a, b) => a - b);
+    pool.push(notes.map(n => NOTE_NAMES[n % 12] + (Math.floor(n / 12) - 1)));
+}
+
+function bench(fn, iterations, batches) {
+    let sink = 0;
+    for (let i = 0; i < 20000; i++) sink += fn(pool[i % pool.length])?.type.length ?? 0;  // warm-up
+    const perBatch = Math.max(1, Math.floor(iterations / batches));
+    const batchNs = [];
+    for (let b = 0; b < batches; b++) {
+        const t0 = performance.now();
+        for (let i = 0; i < perBatch; i++) sink += fn(pool[i % pool.length])?.type.length ?? 0;
+        batchNs.push(((performance.now() - t0) * 1e6) / perBatch);
+    }
+    return { nsPerCall: batchNs.reduce((a, b) => a + b, 0) / batches, batchNs, sink };
+}
+
+const iterations = Number(process.argv[2] || 500000);
+const batches = Number(process.argv[3] || 20);
+const lookup = bench(detectChord, iterations, batches);
+const rules  = bench(detectChordByRules, iterations, batches);
+console.log(JSON.stringify({
+    iterations, lookupNs: lookup.nsPerCall, rulesNs: rules.nsPerCall,
+    lookupBatchNs: lookup.batchNs, rulesBatchNs: rules.batchNs,
+}));
+"""
+
+
+def run_node(script, *args):
+    """Run a JS harness against .mjs copies of the chord modules; return stdout"""
+    node = shutil.which('node')
+    if not node:
+        raise RuntimeError("node not found in PATH")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        utils = CHORD_UTILS_PATH.read_text(encoding='utf-8')
+        utils = utils.replace("'./chord-table.js'", "'./chord-table.mjs'")
+        (tmp / 'chord-utils.mjs').write_text(utils, encoding='utf-8')
+        shutil.copy(TABLE_PATH, tmp / 'chord-table.mjs')
+        (tmp / 'harness.mjs').write_text(script, encoding='utf-8')
+
+        result = subprocess.run(
+            [node, str(tmp / 'harness.mjs'), *map(str, args)],
+            capture_output=True, text=True, timeout=300
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "node harness failed")
+        return result.stdout.strip().splitlines()[-1]
+
+
+def verify_against_js():
+    """Check detectChord() (table) against detectChordByRules() for every set"""
+    import json
+
+    print("Comparing table lookup with the rule-based detector...")
+    report = json.loads(run_node(VERIFY_JS))
+    if report['failures']:
+        print(f"❌ {len(report['failures'])} mismatches (first {len(report['failures'])} shown):")
+        for f in report['failures']:
+            print(f"   {' '.join(f['notes'])}: lookup={f['lookup']} rules={f['rules']}")
+        return False
+    print(f"✅ {report['checked']} voicings agree")
+    return True
+
+
+def benchmark(iterations, batches=20):
+    """Time detectChord() (table) against detectChordByRules()"""
+    import json
+
+    print(f"Benchmarking {iterations} calls per implementation in {batches} batches...")
+    report = json.loads(run_node(BENCH_JS, iterations, batches))
+    speedup = report['rulesNs'] / report['lookupNs'] if report['lookupNs'] else float('inf')
+    print(f"  lookup table : {report['lookupNs']:8.1f} ns/call")
+    print(f"  rule chain   : {report['rulesNs']:8.1f} ns/call")
+    print(f"  speedup      : {speedup:8.2f}x")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the chord lookup table for src/chord-table.js")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--check', action='store_true', help="exit non-zero if src/chord-table.js is stale")
+    mode.add_argument('--verify', action='store_true', help="compare lookup and rule detectors in node")
+    mode.add_argument('--bench', action='store_true', help="micro-benchmark lookup vs rules in node")
+    parser.add_argument('--iterations', type=int, default=500000, help="calls per implementation for --bench")
+    parser.add_argument('--no-record', action='store_true', help="don't append --bench results to the result store")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check_table() else 1)
+    if args.verify:
+        sys.exit(0 if check_table() and verify_against_js() else 1)
+    if args.bench:
+        report = benchmark(args.iterations)
+        if not args.no_record:
+            from bench_results import metric, record
+            run = record('chord_detect', {
+                'lookup_ns_per_call': metric(report['lookupBatchNs'], unit='ns'),
+                'rules_ns_per_call': metric(report['rulesBatchNs'], unit='ns'),
+            }, params={'iterations': args.iterations})
+            print(f"✅ Recorded chord_detect run {run['id']}")
+        return
+
+    write_table()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
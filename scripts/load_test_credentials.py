@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "requests>=2.31.0",
+# ]
+# ///
+"""
+Credential endpoint load test
+
+Drives get-turn-credentials.php at a target request rate from many
+concurrent clients, each holding its own pooled keep-alive connection
+(like browsers joining rooms), and reports:
+
+  - latency percentiles, measured from each request's scheduled start so
+    that queueing behind a slow server is counted (no coordinated omission)
+  - the achieved rate and error rates by kind (HTTP status, rate limited,
+    connection errors)
+  - credential validity: every TURN username/credential pair is checked
+    against HMAC-SHA1 with the configured secret, and its expiry against
+    now + ttl
+
+The endpoint can be started locally: --serve php runs a copy of
+get-turn-credentials.php under PHP's built-in server with a throwaway
+config.php, --serve stub runs an in-process stand-in that mints
+credentials the same way.
+
+Usage:
+    uv run scripts/load_test_credentials.py [URL] [--serve php|stub] [--rate 50] [--duration 30] [--clients 32]
+
+Example:
+    uv run scripts/load_test_credentials.py --serve php --rate 200 --duration 60
+    uv run scripts/load_test_credentials.py https://example.com/get-turn-credentials.php --config config.php --rate 5
+
+Note:
+    - Cookies are dropped after every request, so each request is a new
+      visitor; pass --keep-cookies to exercise the per-session rate limit
+      (MAX_REQUESTS_PER_MINUTE in the PHP endpoint)
+    - Without --secret/--config only the expiry can be checked
+    - Results are appended to the benchmark result store as
+      'credential_load' (see bench_results.py; --no-record to skip)
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from bench_results import metric, percentile, record
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    print("ERROR: requests library not found. Install with: pip install requests")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parent.parent
+ENDPOINT_PATH = ROOT / "get-turn-credentials.php"
+
+DEFAULT_PORT = 18089
+EXPIRY_SKEW = 5            # seconds of clock/processing slack allowed when checking expiry
+MAX_ERROR_RATE = 0.01
+
+
+def mint_credentials(secret, ttl, user='webmidi'):
+    """Same scheme as get-turn-credentials.php (TURN REST API)"""
+    username = f"{int(time.time()) + ttl}:{user}"
+    password = base64.b64encode(hmac.new(secret.encode(), username.encode(), hashlib.sha1).digest()).decode()
+    return username, password
+
+
+def check_credentials(body, secret=None, now=None, received=None):
+    """Problems with one endpoint response; an empty list means valid
+
+    now is when the request was sent and received when the response
+    arrived (both wall-clock); the server issued the credentials somewhere
+    in between, so a slow response does not make a valid expiry look wrong.
+    """
+    now = now or time.time()
+    received = max(received or now, now)
+    problems = []
+    servers = body.get('iceServers') if isinstance(body, dict) else None
+    if not isinstance(servers, list) or not servers:
+        return ["no iceServers"]
+    ttl = body.get('ttl')
+
+    turn = [s for s in servers if any(u.startswith(('turn:', 'turns:')) for u in
+                                      (s.get('urls') if isinstance(s.get('urls'), list) else [s.get('urls', '')]))]
+    if not turn:
+        return ["no TURN server in response"]
+
+    for server in turn:
+        username, credential = server.get('username', ''), server.get('credential', '')
+        prefix = username.split(':', 1)[0]
+        if not prefix.isdigit():
+            problems.append(f"username without expiry: {username!r}")
+            continue
+        expiry = int(prefix)
+        if expiry <= now:
+            problems.append(f"expired {now - expiry:.0f}s ago")
+        elif isinstance(ttl, (int, float)) and not now + ttl - EXPIRY_SKEW <= expiry <= received + ttl + EXPIRY_SKEW:
+            off = expiry - (now + ttl) if expiry < now + ttl else expiry - (received + ttl)
+            problems.append(f"expiry off by {off:+.0f}s from request time + ttl")
+        if secret is not None:
+            expected = base64.b64encode(hmac.new(secret.encode(), username.encode(), hashlib.sha1).digest()).decode()
+            if not hmac.compare_digest(expected, credential):
+                problems.append("HMAC mismatch")
+    return problems
+
+
+def read_secret(config_path):
+    """turnSecret from a config.php"""
+    text = Path(config_path).read_text(encoding='utf-8')
+    match = re.search(r"""['"]turnSecret['"]\s*=>\s*['"]([^'"]+)['"]""", text)
+    if not match:
+        raise ValueError(f"no 'turnSecret' in {config_path}")
+    return match.group(1)
+
+
+# ── Local endpoints ────────────────────────────────────────────────────────────
+
+def serve_stub(port, secret, ttl=3600):
+    """In-process stand-in for get-turn-credentials.php; returns the server"""
+
+    class CredentialHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'   # keep-alive, as PHP behind a web server
+
+        def do_GET(self):
+            username, password = mint_credentials(secret, ttl)
+            body = json.dumps({
+                'iceServers': [
+                    {'urls': 'stun:localhost:3479'},
+                    {'urls': 'turn:localhost:3479', 'username': username, 'credential': password},
+                    {'urls': 'turn:localhost:5350?transport=tcp', 'username': username, 'credential': password},
+                    {'urls': 'turns:localhost:5350?transport=tcp', 'username': username, 'credential': password},
+                ],
+                'ttl': ttl,
+                'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), CredentialHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_php(port, secret, workers, ttl=3600):
+    """Run a copy of the endpoint under `php -S` with a throwaway config.php.
+
+    Returns (process, temp dir). PHP_CLI_SERVER_WORKERS lets the built-in
+    server handle requests in parallel.
+    """
+    php = shutil.which('php')
+    if not php:
+        raise RuntimeError("php not found in PATH (use --serve stub instead)")
+
+    docroot = Path(tempfile.mkdtemp(prefix='credload-'))
+    shutil.copy(ENDPOINT_PATH, docroot / ENDPOINT_PATH.name)
+    (docroot / 'config.php').write_text(
+        "<?php\nreturn [\n"
+        "    'turnServer' => 'localhost',\n"
+        f"    'turnSecret' => '{secret}',\n"
+        f"    'ttl' => {ttl},\n"
+        "    'allowedOrigins' => ['*'],\n"
+        "];\n", encoding='utf-8')
+
+    env = dict(os.environ, PHP_CLI_SERVER_WORKERS=str(workers))
+    proc = subprocess.Popen([php, '-S', f'127.0.0.1:{port}', '-t', str(docroot)], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/{ENDPOINT_PATH.name}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"php -S exited with code {proc.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return proc, docroot
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("php -S did not start within 10s")
+
+
+# ── Load generator ─────────────────────────────────────────────────────────────
+
+class CredentialLoadTest:
+    """Open-loop load: request i is due at start + i / rate, whoever sends it"""
+
+    def __init__(self, url, rate, duration, clients, secret=None, keep_cookies=False, timeout=5.0):
+        self.url = url
+        self.rate = rate
+        self.duration = duration
+        self.clients = clients
+        self.secret = secret
+        self.keep_cookies = keep_cookies
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.latency_ms = []        # from scheduled start (includes queueing)
+        self.service_ms = []        # from actual send
+        self.errors = {}
+        self.invalid = {}
+        self.ok = 0
+        self._local = threading.local()
+
+    def session(self):
+        """One keep-alive session per client thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._local.session = session
+        return session
+
+    def _count(self, table, key):
+        table[key] = table.get(key, 0) + 1
+
+    def client(self, schedule, start):
+        session = self.session()
+        end = start + self.duration
+        while True:
+            due = start + next(schedule) / self.rate
+            if due >= end:
+                return
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            sent = time.perf_counter()
+            sent_wall = time.time()
+            error = None
+            problems = []
+            try:
+                response = session.get(self.url, timeout=self.timeout)
+                if response.status_code == 429:
+                    error = 'HTTP 429 (rate limited)'
+                elif response.status_code != 200:
+                    error = f"HTTP {response.status_code}"
+                else:
+                    problems = check_credentials(response.json(), self.secret, now=sent_wall, received=time.time())
+            except requests.exceptions.Timeout:
+                error = 'timeout'
+            except requests.exceptions.ConnectionError:
+                error = 'connection error'
+            except ValueError:
+                error = 'invalid JSON'
+            done = time.perf_counter()
+            if not self.keep_cookies:
+                session.cookies.clear()
+
+            with self.lock:
+                self.latency_ms.append((done - due) * 1000)
+                self.service_ms.append((done - sent) * 1000)
+                if error:
+                    self._count(self.errors, error)
+                elif problems:
+                    for p in set(problems):
+                        self._count(self.invalid, p)
+                else:
+                    self.ok += 1
+
+    def run(self):
+        schedule = itertools.count()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.clients) as pool:
+            for f in [pool.submit(self.client, schedule, start) for _ in range(self.clients)]:
+                f.result()
+        self.elapsed = time.perf_counter() - start
+
+    def summary(self):
+        total = len(self.latency_ms)
+        failed = sum(self.errors.values())
+        invalid = total - failed - self.ok
+        stats = {
+            'requests': total,
+            'ok': self.ok,
+            'errors': failed,
+            'invalid': invalid,
+            'error_rate': failed / total if total else 0.0,
+            'target_rate': self.rate,
+            'achieved_rate': total / self.elapsed if self.elapsed else 0.0,
+        }
+        for name, values in (('latency', self.latency_ms), ('service', self.service_ms)):
+            for p in (50, 90, 99, 100):
+                stats[f'{name}_p{p}_ms'] = percentile(values, p)
+        return stats
+
+
+def print_report(test, stats):
+    print(f"\n{'='*70}")
+    print(f"CREDENTIAL ENDPOINT LOAD TEST")
+    print(f"{'='*70}")
+    print(f"  URL            {test.url}")
+    print(f"  clients        {test.clients}")
+    print(f"  rate           {stats['achieved_rate']:.1f} req/s achieved of {stats['target_rate']:.1f} target")
+    print(f"  requests       {stats['requests']} ({stats['ok']} valid, {stats['errors']} failed, "
+          f"{stats['invalid']} with invalid credentials)")
+    print(f"  error rate     {stats['error_rate']:.2%}")
+
+    if stats['requests']:
+        print(f"\n  {'ms':<22} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+        for name, label in (('latency', 'from scheduled start'), ('service', 'from send')):
+            cells = ' '.join(f"{stats[f'{name}_p{p}_ms']:>8.2f}" for p in (50, 90, 99, 100))
+            print(f"  {label:<22} {cells}")
+
+    for kind, n in sorted(test.errors.items(), key=lambda kv: -kv[1]):
+        print(f"  ✗ {kind}: {n}")
+    for problem, n in sorted(test.invalid.items(), key=lambda kv: -kv[1]):
+        print(f"  ✗ {problem}: {n}")
+    if test.secret is None:
+        print("\n  ⚠ No secret given — HMAC not checked (use --secret or --config)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the TURN credential endpoint")
+    parser.add_argument('url', nargs='?', help="endpoint URL (omit with --serve)")
+    parser.add_argument('--serve', choices=('php', 'stub'), help="start a local endpoint to test")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port for --serve [{DEFAULT_PORT}]")
+    parser.add_argument('--rate', type=float, default=50.0, help="target requests per second [50]")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds [30]")
+    parser.add_argument('--clients', type=int, default=32, help="concurrent clients / keep-alive connections [32]")
+    parser.add_argument('--secret', help="TURN static-auth-secret for HMAC validation")
+    parser.add_argument('--config', help="read the secret from this config.php")
+    parser.add_argument('--keep-cookies', action='store_true', help="reuse the PHP session (hits the rate limit)")
+    parser.add_argument('--timeout', type=float, default=5.0, help="per-request timeout, s [5]")
+    parser.add_argument('--max-error-rate', type=float, default=MAX_ERROR_RATE,
+                        help=f"exit 1 above this error rate [{MAX_ERROR_RATE}]")
+    parser.add_argument('--json', help="write the summary as JSON to this file")
+    parser.add_argument('--no-record', action='store_true', help="don't append to the benchmark result store")
+    args = parser.parse_args()
+
+    if bool(args.url) == bool(args.serve):
+        parser.error("give either an endpoint URL or --serve")
+
+    secret = args.secret
+    if args.config:
+        secret = read_secret(args.config)
+
+    server = proc = docroot = None
+    url = args.url
+    if args.serve:
+        secret = secret or base64.b64encode(os.urandom(24)).decode()
+        if args.serve == 'stub':
+            server = serve_stub(args.port, secret)
+            url = f"http://127.0.0.1:{args.port}/{ENDPOINT_PATH.name}"
+        else:
+            proc, docroot = serve_php(args.port, secret, workers=min(args.clients, os.cpu_count() or 1))
+            url = f"http://127.0.0.1:{args.port}/{ENDPOINT_PATH.name}"
+        print(f"Serving {args.serve} endpoint at {url}")
+
+    test = CredentialLoadTest(url, args.rate, args.duration, args.clients, secret=secret,
+                              keep_cookies=args.keep_cookies, timeout=args.timeout)
+    print(f"Sending {args.rate:g} req/s for {args.duration:g}s from {args.clients} client(s)...")
+    try:
+        test.run()
+    finally:
+        if server:
+            server.shutdown()
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=5)
+            shutil.rmtree(docroot, ignore_errors=True)
+
+    stats = test.summary()
+    print_report(test, stats)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'url': url, 'clients': args.clients, 'stats': stats,
+                       'errors': test.errors, 'invalid': test.invalid}, f, indent=2)
+        print(f"\n✅ Wrote {args.json}")
+    if not args.no_record and stats['requests']:
+        run = record('credential_load', {
+            'latency': metric(test.latency_ms),
+            'service_time': metric(test.service_ms),
+        }, params={'url': url, 'serve': args.serve, 'rate': args.rate, 'clients': args.clients,
+                   'duration': args.duration, 'error_rate': stats['error_rate']})
+        print(f"✅ Recorded credential_load run {run['id']}")
+
+    failed = stats['invalid'] or stats['error_rate'] > args.max_error_rate
+    print(f"\n{'✗ FAIL' if failed else '✓ PASS'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nLoad test interrupted by user")
+        sys.exit(1)
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"\n✗ {e}")
+        sys.exit(1)
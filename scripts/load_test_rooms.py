@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "aiohttp>=3.9",
+# ]
+# ///
+"""
+Lobby /rooms load test
+
+Simulates many lobby viewers watching the room list while peers join and
+leave rooms, and measures what each way of keeping the list fresh costs
+the signaler:
+
+  - poll:        GET /rooms every 5 s, full listing each time
+                 (what rooms.js did before the listing was versioned)
+  - conditional: the same polling with If-None-Match, 304 when unchanged
+  - longpoll:    GET /rooms?wait=25&delta=1 with If-None-Match, held until
+                 the list changes and answered with only what changed
+
+For each binary and mode it reports requests per second, the share of 304
+answers, response bytes per second to all viewers (headers included), the
+signaler's CPU use from /proc, how many listings were encoded, and how long
+it took viewers to see a room appear or vanish.
+
+Usage:
+    uv run scripts/load_test_rooms.py [--binary LABEL=PATH ...] [--viewers 300] [--churn 0.2] [--duration 60]
+
+Example:
+    # Current signaler against one built from before the versioned listing
+    uv run scripts/load_test_rooms.py --binary before=/tmp/sig-old/signaler/signaler \\
+                                      --binary after=signaler/signaler --viewers 500
+
+Note:
+    - Linux only (signaler CPU is read from /proc/<pid>/stat)
+    - Every mode replays the same seeded join/leave sequence
+    - conditional and longpoll are skipped for binaries without an ETag on /rooms
+    - Results are appended to the benchmark result store as 'rooms_listing'
+      (see bench_results.py; --no-record to skip)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from bench_results import metric, percentile, record
+from bench_signaler_routing import Signaler
+from scrape_signaler_metrics import parse_metrics
+
+try:
+    import aiohttp
+except ImportError:
+    print("ERROR: aiohttp library not found. Install with: pip install aiohttp")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BINARY = ROOT / "signaler" / "signaler"
+MODES = ('poll', 'conditional', 'longpoll')
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+
+
+def cpu_seconds(pid):
+    """utime + stime of a process, in seconds"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK
+
+
+def response_bytes(resp, body):
+    """Bytes on the wire for a response: status line, headers and body"""
+    headers = sum(len(k) + len(v) + 4 for k, v in resp.raw_headers)
+    return len(f"HTTP/1.1 {resp.status} {resp.reason}\r\n") + headers + 2 + len(body)
+
+
+class Lobby:
+    """Viewers of one mode, plus the room churn they are watching"""
+
+    def __init__(self, port, mode, viewers, interval, rooms, churn, seed):
+        self.base = f"http://127.0.0.1:{port}"
+        self.ws_base = f"ws://127.0.0.1:{port}"
+        self.mode = mode
+        self.viewers = viewers
+        self.interval = interval
+        self.room_count = rooms
+        self.churn = churn
+        self.rng = random.Random(seed)   # the same churn for every mode
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.errors = 0
+        self.members = {}        # room name → peers in it
+        self.changes = {}        # room name → (time it appeared or emptied, present)
+        self.staleness = []      # ms from a room appearing/vanishing to a viewer seeing it
+        self.peers = []          # (room, ws)
+        self._stop = asyncio.Event()
+        self._serial = 0
+
+    # ── Room churn ─────────────────────────────────────────────────────────────
+
+    async def add_peer(self, session, room):
+        self._serial += 1
+        ws = await session.ws_connect(f"{self.ws_base}/signal?room={room}&peer=lp{self._serial}", heartbeat=None)
+        self.members[room] = self.members.get(room, 0) + 1
+        if self.members[room] == 1:
+            self.changes[room] = (time.perf_counter(), True)
+        self.peers.append((room, ws))
+
+    async def remove_peer(self, index):
+        room, ws = self.peers.pop(index)
+        await ws.close()
+        self.members[room] -= 1
+        if not self.members[room]:
+            del self.members[room]
+            self.changes[room] = (time.perf_counter(), False)
+
+    async def churner(self, session):
+        while not self._stop.is_set():
+            await asyncio.sleep(self.rng.expovariate(self.churn))
+            if self.peers and self.rng.random() < 0.5:
+                await self.remove_peer(self.rng.randrange(len(self.peers)))
+            else:
+                # A third of joins open a room nobody has seen yet
+                new = self.rng.random() < 0.33
+                room = f"lobby-{self.mode}-{self._serial}" if new else f"lobby-{self.mode}-base{self.rng.randrange(self.room_count)}"
+                await self.add_peer(session, room)
+
+    # ── Viewers ────────────────────────────────────────────────────────────────
+
+    def saw(self, known, names):
+        """Record how late this viewer learned of rooms appearing or vanishing"""
+        now = time.perf_counter()
+        for name, present in [(n, True) for n in names - known] + [(n, False) for n in known - names]:
+            if name in self.changes and self.changes[name][1] == present:
+                self.staleness.append((now - self.changes[name][0]) * 1000)
+        known.clear()
+        known |= names
+
+    async def get(self, session, path, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        async with session.get(f"{self.base}{path}", headers=headers) as resp:
+            body = await resp.read()
+            self.requests += 1
+            self.bytes += response_bytes(resp, body)
+            if resp.status == 304:
+                self.not_modified += 1
+                return resp.status, resp.headers.get('ETag'), None
+            resp.raise_for_status()
+            return resp.status, resp.headers.get('ETag'), body
+
+    async def poller(self, session, conditional):
+        known, etag = set(), None
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while not self._stop.is_set():
+            try:
+                status, new_etag, body = await self.get(session, '/rooms', etag if conditional else None)
+                if body is not None:
+                    etag = new_etag
+                    self.saw(known, {r['name'] for r in json.loads(body)})
+            except aiohttp.ClientError:
+                self.errors += 1
+            await asyncio.sleep(self.interval)
+
+    async def long_poller(self, session):
+        known, rooms, etag = set(), {}, None
+        while not self._stop.is_set():
+            try:
+                status, new_etag, body = await self.get(session, '/rooms?wait=25&delta=1' if etag else '/rooms?delta=1', etag)
+                if body is None:
+                    continue
+                delta = json.loads(body)
+                if delta.get('full'):
+                    rooms = {r['name']: r for r in delta['rooms']}
+                for r in delta.get('changed', []):
+                    rooms[r['name']] = r
+                for name in delta.get('removed', []):
+                    rooms.pop(name, None)
+                etag = delta['version']
+                self.saw(known, set(rooms))
+            except aiohttp.ClientError:
+                self.errors += 1
+                await asyncio.sleep(1)
+
+    async def run(self, duration, pid):
+        connector = aiohttp.TCPConnector(limit=0)
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=40)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            for i in range(self.room_count):
+                await self.add_peer(session, f"lobby-{self.mode}-base{i}")
+            self.changes.clear()   # only changes made during the run count for staleness
+
+            if self.mode == 'longpoll':
+                viewers = [asyncio.create_task(self.long_poller(session)) for _ in range(self.viewers)]
+            else:
+                viewers = [asyncio.create_task(self.poller(session, self.mode == 'conditional'))
+                           for _ in range(self.viewers)]
+            await asyncio.sleep(min(self.interval, 5))   # let viewers reach steady state
+            before = await scrape(session, self.base)
+            start_req, start_bytes, start_304 = self.requests, self.bytes, self.not_modified
+            self.staleness.clear()
+            cpu0, t0 = cpu_seconds(pid), time.perf_counter()
+
+            churn = asyncio.create_task(self.churner(session))
+            await asyncio.sleep(duration)
+
+            elapsed = time.perf_counter() - t0
+            cpu = cpu_seconds(pid) - cpu0
+            after = await scrape(session, self.base)
+            self._stop.set()
+            for t in viewers + [churn]:
+                t.cancel()
+            await asyncio.gather(*viewers, churn, return_exceptions=True)
+            for _, ws in self.peers:
+                await ws.close()
+
+        requests = self.requests - start_req
+        delta = lambda name: after.get(name, 0) - before.get(name, 0)
+        return {
+            'mode': self.mode,
+            'requests_per_s': requests / elapsed,
+            'not_modified_pct': (self.not_modified - start_304) / requests * 100 if requests else 0.0,
+            'bytes_per_s': (self.bytes - start_bytes) / elapsed,
+            'cpu_pct': cpu / elapsed * 100,
+            'encodes_per_s': delta('signaler_rooms_encodes_total') / elapsed if 'signaler_rooms_encodes_total' in after else None,
+            'staleness_ms': list(self.staleness),
+            'errors': self.errors,
+        }
+
+
+async def scrape(session, base):
+    try:
+        async with session.get(f"{base}/metrics") as resp:
+            if resp.status != 200:
+                return {}
+            return parse_metrics(await resp.text())[0]
+    except aiohttp.ClientError:
+        return {}
+
+
+async def supports_etag(port):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/rooms") as resp:
+            return 'ETag' in resp.headers
+
+
+async def bench_binary(label, binary, args):
+    results = []
+    for mode in args.modes:
+        signaler = Signaler(binary, args.port)
+        await signaler.start()
+        try:
+            if mode != 'poll' and not await supports_etag(args.port):
+                print(f"  {label:<10} {mode:<12} skipped (no ETag on /rooms)")
+                continue
+            lobby = Lobby(args.port, mode, args.viewers, args.interval, args.rooms, args.churn, args.seed)
+            r = await lobby.run(args.duration, signaler.proc.pid)
+        finally:
+            signaler.stop()
+        r['label'] = label
+        results.append(r)
+        print(f"  {label:<10} {mode:<12} {r['requests_per_s']:8.1f} req/s  {r['bytes_per_s'] / 1024:8.1f} KB/s  "
+              f"cpu={r['cpu_pct']:5.1f}%  errors={r['errors']}")
+    return results
+
+
+def print_table(results):
+    print(f"\n{'='*70}")
+    print("LOBBY /rooms LOAD")
+    print(f"{'='*70}")
+    print(f"  {'binary':<10} {'mode':<12} {'req/s':>7} {'304 %':>6} {'KB/s':>8} {'CPU %':>6} "
+          f"{'enc/s':>6} {'seen p50':>9} {'seen p95':>9}")
+    for r in results:
+        seen = r['staleness_ms']
+        p50 = f"{percentile(seen, 50):7.0f}ms" if seen else f"{'-':>9}"
+        p95 = f"{percentile(seen, 95):7.0f}ms" if seen else f"{'-':>9}"
+        enc = f"{r['encodes_per_s']:6.1f}" if r['encodes_per_s'] is not None else f"{'-':>6}"
+        print(f"  {r['label']:<10} {r['mode']:<12} {r['requests_per_s']:>7.1f} {r['not_modified_pct']:>6.1f} "
+              f"{r['bytes_per_s'] / 1024:>8.1f} {r['cpu_pct']:>6.1f} {enc} {p50} {p95}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /rooms polling, conditional requests and long-poll")
+    parser.add_argument('--binary', action='append', metavar='LABEL=PATH',
+                        help="signaler binary to test, repeatable [current=signaler/signaler]")
+    parser.add_argument('--modes', default=','.join(MODES), help=f"[{','.join(MODES)}]")
+    parser.add_argument('--port', type=int, default=18768)
+    parser.add_argument('--viewers', type=int, default=300, help="lobby viewers [300]")
+    parser.add_argument('--interval', type=float, default=5.0, help="poll interval of rooms.js, s [5]")
+    parser.add_argument('--rooms', type=int, default=40, help="rooms open before the run [40]")
+    parser.add_argument('--churn', type=float, default=0.2, help="peer joins/leaves per second [0.2]")
+    parser.add_argument('--seed', type=int, default=1, help="seed for the join/leave sequence [1]")
+    parser.add_argument('--duration', type=float, default=60.0, help="measured seconds per mode [60]")
+    parser.add_argument('--json', help="write results as JSON to this file")
+    parser.add_argument('--no-record', action='store_true', help="don't append to the benchmark result store")
+    args = parser.parse_args()
+
+    args.modes = [m.strip() for m in args.modes.split(',')]
+    unknown = set(args.modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(sorted(unknown))}")
+    if not Path('/proc/self/stat').exists():
+        print("ERROR: /proc not available — the load test runs on Linux only")
+        sys.exit(1)
+
+    binaries = []
+    for spec in args.binary or [f"current={DEFAULT_BINARY}"]:
+        label, sep, path = spec.partition('=')
+        if not sep:
+            label, path = Path(spec).name, spec
+        if not Path(path).is_file():
+            print(f"ERROR: signaler binary not found: {path}")
+            print("Build it with: cd signaler && go build -o signaler .")
+            sys.exit(1)
+        binaries.append((label, path))
+
+    results = []
+    for label, path in binaries:
+        print(f"\nLoading {label} ({path}) with {args.viewers} viewers")
+        results += asyncio.run(bench_binary(label, path, args))
+
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Wrote {args.json}")
+    if not args.no_record and results:
+        metrics = {}
+        for r in results:
+            key = f"{r['label']}/{r['mode']}"
+            metrics[f"{key}/staleness"] = metric(r['staleness_ms'])
+            metrics[f"{key}/cpu"] = metric([r['cpu_pct']], unit='%')
+            metrics[f"{key}/bandwidth"] = metric([r['bytes_per_s']], unit='B/s')
+        run = record('rooms_listing', metrics, params={
+            'binaries': dict(binaries), 'modes': args.modes, 'viewers': args.viewers,
+            'interval': args.interval, 'rooms': args.rooms, 'churn': args.churn, 'seed': args.seed, 'duration': args.duration,
+        })
+        print(f"\n✅ Recorded rooms_listing run {run['id']}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nLoad test interrupted by user")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"\n✗ {e}")
+        sys.exit(1)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "numpy>=1.24",
+# ]
+# ///
+"""
+Standard MIDI File reader/writer for recorded takes
+
+Shared by the take tooling (analyze_takes.py, take_archive.py). Takes are
+handled as struct-of-arrays columns instead of per-event objects:
+
+    delta   uint32  ticks since the previous channel/system event
+    status  uint8   status byte (running status is expanded)
+    data1   uint8   first data byte (0 when the message has none)
+    data2   uint8   second data byte (0 when the message has none)
+
+Meta and SysEx events are not part of the columns; their delta time is
+carried over to the next event so absolute timing is preserved. SysEx is
+accepted both length-framed (SMF) and raw F0 ... F7, as exportMID writes
+it. Tempo changes are kept separately as (tick, microseconds per quarter
+note).
+
+write_smf() produces byte-for-byte the same layout as
+MIDIRecorder.exportMID() in src/recorder.js: format 0, one track, 480 PPQ,
+a tempo meta-event at tick 0 and an End-of-Track meta-event.
+
+Usage:
+    uv run scripts/midi_file.py    # round-trip check of the reader and writer
+"""
+
+import struct
+from pathlib import Path
+
+import numpy as np
+
+PPQ = 480          # ticks per quarter note, as in MIDIRecorder.exportMID
+TEMPO = 500000     # µs per beat = 120 BPM
+
+# Message length (status byte included) by status; 0 = not a channel/system message
+_MESSAGE_LENGTH = bytearray(256)
+for _status in range(0x80, 0xF0):
+    _MESSAGE_LENGTH[_status] = 2 if 0xC0 <= _status <= 0xDF else 3
+_MESSAGE_LENGTH[0xF1] = 2
+_MESSAGE_LENGTH[0xF2] = 3
+_MESSAGE_LENGTH[0xF3] = 2
+for _status in (0xF6, 0xF8, 0xF9, 0xFA, 0xFB, 0xFC, 0xFE):
+    # exportMID writes raw bytes, so real-time messages can appear in a take
+    _MESSAGE_LENGTH[_status] = 1
+
+
+class SMFError(ValueError):
+    """Raised when a file is not a readable Standard MIDI File"""
+
+
+def _read_vlq(data, pos):
+    value = 0
+    while True:
+        if pos >= len(data):
+            raise SMFError("Truncated variable-length quantity")
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def _vlq(n):
+    out = [n & 0x7F]
+    n >>= 7
+    while n > 0:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    return bytes(reversed(out))
+
+
+def _sysex_end(data, pos, end):
+    """Offset just past a SysEx event whose status byte is at pos
+
+    Files written by MIDIRecorder.exportMID carry SysEx raw (F0 ... F7, no
+    length), while SMF frames it as F0/F7 <VLQ length> <bytes>. An F0 whose
+    length-framed block is complete and ends in F7 is read as SMF; otherwise
+    it must be a raw message running up to the first F7. An F0 that is
+    neither, or an F7 block past the end of the track, raises SMFError.
+    """
+    status = data[pos]
+    try:
+        length, start = _read_vlq(data, pos + 1)
+    except SMFError:
+        length, start = None, None
+    framed = start is not None and start + length <= end and all(b < 0x80 for b in data[start:start + length - 1])
+
+    if status == 0xF0:
+        if framed and length and data[start + length - 1] == 0xF7:
+            return start + length
+        for i in range(pos + 1, end):
+            if data[i] == 0xF7:
+                return i + 1
+            if data[i] & 0x80:
+                break
+    if framed:
+        return start + length   # SMF packet continued by later F7 events
+    raise SMFError(f"Unterminated SysEx at offset {pos}")
+
+
+def _parse_track(data, pos, end, out, tempos):
+    """Append the events of one MTrk chunk to out as absolute-tick tuples"""
+    tick = 0
+    running = 0
+    while pos < end:
+        delta, pos = _read_vlq(data, pos)
+        tick += delta
+        if pos >= end:
+            raise SMFError("Track ends inside an event")
+        status = data[pos]
+
+        if status == 0xFF:
+            if pos + 2 >= end:
+                raise SMFError("Track ends inside a meta event")
+            meta_type = data[pos + 1]
+            length, pos = _read_vlq(data, pos + 2)
+            if pos + length > end:
+                raise SMFError(f"Meta event 0x{meta_type:02X} runs past the end of the track")
+            if meta_type == 0x51 and length == 3:
+                tempos.append((tick, int.from_bytes(data[pos:pos + 3], 'big')))
+            pos += length
+            if meta_type == 0x2F:
+                break
+            continue
+
+        if status in (0xF0, 0xF7):
+            pos = _sysex_end(data, pos, end)
+            running = 0
+            continue
+
+        if status & 0x80:
+            pos += 1
+            if status < 0xF0:
+                running = status
+        elif running:
+            # Running status: this byte is already data1
+            status = running
+        else:
+            raise SMFError(f"Data byte 0x{status:02X} without running status at offset {pos}")
+
+        length = _MESSAGE_LENGTH[status]
+        if length == 0:
+            raise SMFError(f"Unsupported status 0x{status:02X} at offset {pos}")
+        if pos + length - 1 > end:
+            raise SMFError(f"Message 0x{status:02X} runs past the end of the track")
+        d1 = data[pos] if length > 1 else 0
+        d2 = data[pos + 1] if length > 2 else 0
+        pos += length - 1
+        out.append((tick, status, d1, d2))
+
+
+def parse_smf(data):
+    """Parse SMF bytes into a take dict of numpy columns.
+
+    Returns {'ppq', 'tempos', 'delta', 'status', 'data1', 'data2'}. Format 1
+    files are merged into a single time-ordered stream.
+    """
+    data = memoryview(data).tobytes() if not isinstance(data, bytes) else data
+    if data[:4] != b'MThd':
+        raise SMFError("Missing MThd header")
+    if len(data) < 14:
+        raise SMFError("Truncated MThd header")
+    header_len = struct.unpack('>I', data[4:8])[0]
+    fmt, ntracks, division = struct.unpack('>HHH', data[8:14])
+    if fmt > 1:
+        raise SMFError(f"SMF format {fmt} is not supported")
+    if division & 0x8000:
+        raise SMFError("SMPTE time division is not supported")
+
+    events = []
+    tempos = []
+    pos = 8 + header_len
+    for _ in range(ntracks):
+        if data[pos:pos + 4] != b'MTrk' or pos + 8 > len(data):
+            raise SMFError(f"Missing MTrk chunk at offset {pos}")
+        length = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        if pos + 8 + length > len(data):
+            raise SMFError(f"MTrk chunk at offset {pos} runs past the end of the file")
+        _parse_track(data, pos + 8, pos + 8 + length, events, tempos)
+        pos += 8 + length
+
+    if ntracks > 1:
+        events.sort(key=lambda ev: ev[0])   # stable: keeps per-track order at equal ticks
+        tempos.sort()
+
+    if events:
+        columns = np.array(events, dtype=np.uint32)
+        ticks = columns[:, 0]
+        delta = np.diff(ticks, prepend=np.uint32(0)).astype(np.uint32)
+        status, data1, data2 = (columns[:, i].astype(np.uint8) for i in (1, 2, 3))
+    else:
+        delta = np.zeros(0, dtype=np.uint32)
+        status = data1 = data2 = np.zeros(0, dtype=np.uint8)
+
+    return {
+        'ppq': division,
+        'tempos': tempos or [(0, TEMPO)],
+        'delta': delta,
+        'status': status,
+        'data1': data1,
+        'data2': data2,
+    }
+
+
+def read_smf(path):
+    """Read a .mid file into a take dict (see parse_smf)"""
+    return parse_smf(Path(path).read_bytes())
+
+
+def write_smf(take, tempo=TEMPO):
+    """Serialise take columns to SMF bytes in MIDIRecorder.exportMID layout.
+
+    A take with one tempo at tick 0 (every take exportMID writes) comes out
+    byte-for-byte as exportMID would write it. Later tempo changes are
+    written as tempo meta-events at their ticks, so multi-tempo takes
+    survive a round trip.
+    """
+    tempos = sorted(take.get('tempos') or [(0, tempo)])
+    if tempos[0][0] != 0:
+        tempos.insert(0, (0, tempo))
+    track = bytearray(b'\x00\xFF\x51\x03')
+    track += tempos[0][1].to_bytes(3, 'big')
+    pending = tempos[1:]
+
+    tick = last = 0
+    for delta, status, d1, d2 in zip(take['delta'].tolist(), take['status'].tolist(),
+                                     take['data1'].tolist(), take['data2'].tolist()):
+        tick += delta
+        while pending and pending[0][0] <= tick:
+            change, value = pending.pop(0)
+            track += _vlq(change - last) + b'\xFF\x51\x03' + value.to_bytes(3, 'big')
+            last = change
+        track += _vlq(tick - last)
+        last = tick
+        length = _MESSAGE_LENGTH[status] or 3
+        track.append(status)
+        if length > 1:
+            track.append(d1)
+        if length > 2:
+            track.append(d2)
+
+    for change, value in pending:
+        track += _vlq(change - last) + b'\xFF\x51\x03' + value.to_bytes(3, 'big')
+        last = change
+    track += b'\x00\xFF\x2F\x00'
+
+    header = b'MThd' + struct.pack('>IHHH', 6, 0, 1, take.get('ppq', PPQ))
+    return header + b'MTrk' + struct.pack('>I', len(track)) + bytes(track)
+
+
+def ticks_to_seconds(delta, ppq, tempos):
+    """Absolute event times in seconds from delta ticks and a tempo map"""
+    ticks = np.cumsum(delta, dtype=np.int64)
+    seconds = np.zeros(len(ticks), dtype=np.float64)
+    if not len(ticks):
+        return seconds
+
+    tempo_ticks = np.array([t for t, _ in tempos], dtype=np.int64)
+    tempo_values = np.array([v for _, v in tempos], dtype=np.float64)
+    if tempo_ticks[0] != 0:
+        tempo_ticks = np.insert(tempo_ticks, 0, 0)
+        tempo_values = np.insert(tempo_values, 0, TEMPO)
+
+    # Seconds elapsed at the start of each tempo segment
+    sec_per_tick = tempo_values / 1e6 / ppq
+    segment_start = np.concatenate(([0.0], np.cumsum(np.diff(tempo_ticks) * sec_per_tick[:-1])))
+
+    seg = np.searchsorted(tempo_ticks, ticks, side='right') - 1
+    seconds[:] = segment_start[seg] + (ticks - tempo_ticks[seg]) * sec_per_tick[seg]
+    return seconds
+
+
+def _exported_take(events):
+    """Bytes as MIDIRecorder.exportMID writes them: (delta ticks, raw message bytes) pairs
+
+    A message starting with 0xFF is written as-is, for tempo meta-events.
+    """
+    track = bytearray(b'\x00\xFF\x51\x03') + TEMPO.to_bytes(3, 'big')
+    for delta, message in events:
+        track += _vlq(delta) + bytes(message)
+    track += b'\x00\xFF\x2F\x00'
+    header = b'MThd' + struct.pack('>IHHH', 6, 0, 1, PPQ)
+    return header + b'MTrk' + struct.pack('>I', len(track)) + bytes(track)
+
+
+def _round_trip_check():
+    """Parse exportMID-style takes, write them back and compare the columns"""
+    sysex = [0xF0, 0x7E, 0x7F, 0x06, 0x01, 0xF7]
+    takes = {
+        'notes': [(0, [0x90, 60, 100]), (240, [0x80, 60, 0])],
+        'raw sysex': [(0, [0x90, 60, 100]), (10, sysex), (20, [0x90, 64, 90]),
+                      (240, [0x80, 60, 0]), (0, [0x80, 64, 0])],
+        'smf sysex': [(0, [0x90, 60, 100]), (10, [0xF0, 0x05, 0x7E, 0x7F, 0x06, 0x01, 0xF7]),
+                      (240, [0x80, 60, 0])],
+        'real-time': [(0, [0xF8]), (0, [0x90, 60, 100]), (120, [0xF8]), (120, [0x80, 60, 0])],
+        'tempo map': [(0, [0x90, 60, 100]), (480, [0xFF, 0x51, 0x03, 0x03, 0xD0, 0x90]),
+                      (240, [0x80, 60, 0]), (960, [0xFF, 0x51, 0x03, 0x0F, 0x42, 0x40])],
+    }
+    expected = {'notes': 2, 'raw sysex': 4, 'smf sysex': 2, 'real-time': 4, 'tempo map': 2}
+    for name, events in takes.items():
+        data = _exported_take(events)
+        take = parse_smf(data)
+        again = parse_smf(write_smf(take))
+        assert len(take['status']) == expected[name], f"{name}: {len(take['status'])} events"
+        for column in ('delta', 'status', 'data1', 'data2'):
+            assert np.array_equal(take[column], again[column]), f"{name}: {column} differs after write_smf"
+        assert take['tempos'] == again['tempos'], f"{name}: tempo map differs after write_smf"
+        if name == 'notes':
+            assert write_smf(take) == data, "single-tempo take is not byte-identical to exportMID"
+        print(f"✓ {name}: {len(take['status'])} events, {len(take['tempos'])} tempo(s)")
+
+    assert int(parse_smf(_exported_take(takes['raw sysex']))['delta'][1]) == 30, "SysEx delta not carried over"
+    try:
+        parse_smf(_exported_take([(0, [0x90, 60, 100]), (0, [0xF0, 0x7E, 0x7F]), (10, [0x80, 60, 0])]))
+    except SMFError as e:
+        print(f"✓ unterminated sysex: {e}")
+    else:
+        raise AssertionError("unterminated SysEx was not rejected")
+
+    data = _exported_take(takes['raw sysex'])
+    for cut in range(len(data)):
+        try:
+            parse_smf(data[:cut])
+        except SMFError:
+            continue
+        raise AssertionError(f"take truncated to {cut} bytes was not rejected")
+    print(f"✓ truncated takes: all {len(data)} prefixes rejected")
+
+
+if __name__ == '__main__':
+    _round_trip_check()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "aiohttp>=3.9",
+# ]
+# ///
+"""
+Signaler metrics scraper
+
+Polls the signaler's GET /metrics endpoint and turns the Prometheus
+counters and histograms into a per-interval time series:
+
+  - rooms and peers
+  - messages and bytes per second in each direction
+  - send-buffer drops and write/ping/read errors per interval
+  - p50/p95 send-channel occupancy and p50/p99 broadcast duration,
+    computed from the histogram buckets that changed in the interval
+
+Intervals where the hub looks saturated (drops, send channels close to
+full, slow broadcasts) are flagged so a load test shows where it started
+falling behind without grepping the signaler log.
+
+Usage:
+    uv run scripts/scrape_signaler_metrics.py [--url http://127.0.0.1:8765/metrics] [--interval 1] [--duration 10m]
+
+Example:
+    # In one terminal: a load test (soak_signaler.py, bench_signaler_routing.py, ...)
+    uv run scripts/scrape_signaler_metrics.py --url http://127.0.0.1:18765/metrics --csv metrics.csv
+
+Note:
+    - Runs until Ctrl-C when no --duration is given
+    - MetricsScraper can also be run inside another asyncio load test;
+      soak_signaler.py does this when the signaler under test serves
+      /metrics. bench_signaler_routing.py only uses parse_metrics, to read
+      the drop counter once per trial
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import re
+import sys
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    print("ERROR: aiohttp library not found. Install with: pip install aiohttp")
+    sys.exit(1)
+
+DEFAULT_URL = "http://127.0.0.1:8765/metrics"
+
+# Saturation thresholds for one interval
+QUEUE_P95_LIMIT = 24          # send channel holds 32
+BROADCAST_P99_LIMIT_MS = 1.0
+
+COUNTERS = {
+    'msg_in': 'signaler_messages_received_total',
+    'msg_out': 'signaler_messages_sent_total',
+    'bytes_in': 'signaler_received_bytes_total',
+    'bytes_out': 'signaler_sent_bytes_total',
+    'drops': 'signaler_send_drops_total',
+    'read_errors': 'signaler_read_errors_total',
+    'write_errors': 'signaler_write_errors_total',
+    'ping_errors': 'signaler_ping_errors_total',
+}
+QUEUE_HISTOGRAM = 'signaler_send_queue_length'
+BROADCAST_HISTOGRAM = 'signaler_broadcast_duration_seconds'
+
+LINE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{([^}]*)\})?\s+(\S+)')
+LABEL_RE = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_metrics(text):
+    """Prometheus text format → {name: value} plus {name: [(le, count)]} for histogram buckets"""
+    values, buckets = {}, {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        m = LINE_RE.match(line)
+        if not m:
+            continue
+        name, labels, value = m.group(1), dict(LABEL_RE.findall(m.group(2) or '')), float(m.group(3))
+        if name.endswith('_bucket') and 'le' in labels:
+            buckets.setdefault(name[:-len('_bucket')], []).append((float(labels['le']), value))
+        else:
+            values[name] = value
+    for series in buckets.values():
+        series.sort()
+    return values, buckets
+
+
+def histogram_quantile(q, prev, cur):
+    """Quantile of the observations that arrived between two bucket snapshots
+
+    Linear interpolation inside the bucket, like PromQL's histogram_quantile().
+    Returns None when nothing was observed.
+    """
+    before = dict(prev or [])
+    deltas = [(le, count - before.get(le, 0)) for le, count in cur]
+    total = deltas[-1][1] if deltas else 0
+    if total <= 0:
+        return None
+    rank = q * total
+    lower_le, lower_count = 0.0, 0
+    for le, count in deltas:
+        if count >= rank:
+            if math.isinf(le):
+                return lower_le
+            if count == lower_count:
+                return le
+            return lower_le + (le - lower_le) * (rank - lower_count) / (count - lower_count)
+        lower_le, lower_count = le, count
+    return lower_le
+
+
+class MetricsScraper:
+    """Polls /metrics and keeps one row per interval"""
+
+    def __init__(self, url, interval=1.0):
+        self.url = url
+        self.interval = interval
+        self.rows = []
+        self.errors = 0
+        self._prev = None
+        self._started = None
+
+    async def available(self, session):
+        try:
+            async with session.get(self.url) as resp:
+                return resp.status == 200 and 'signaler_' in await resp.text()
+        except aiohttp.ClientError:
+            return False
+
+    async def scrape(self, session):
+        """Take one snapshot; returns the new row (None for the first snapshot)"""
+        async with session.get(self.url) as resp:
+            resp.raise_for_status()
+            text = await resp.text()
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        values, buckets = parse_metrics(text)
+        snapshot = (now, values, buckets)
+        prev, self._prev = self._prev, snapshot
+        if prev is None:
+            return None
+        row = self.delta(prev, snapshot)
+        self.rows.append(row)
+        return row
+
+    def delta(self, prev, cur):
+        t0, v0, b0 = prev
+        t1, v1, b1 = cur
+        dt = max(t1 - t0, 1e-9)
+        row = {
+            'elapsed': round(t1 - self._started, 3),
+            'rooms': int(v1.get('signaler_rooms', 0)),
+            'peers': int(v1.get('signaler_peers', 0)),
+        }
+        for key, name in COUNTERS.items():
+            diff = v1.get(name, 0) - v0.get(name, 0)
+            if key.startswith(('msg_', 'bytes_')):
+                row[f'{key}_per_s'] = diff / dt
+            else:
+                row[key] = int(diff)   # drops and errors are rare; keep counts
+        q = lambda hist, p: histogram_quantile(p, b0.get(hist), b1.get(hist, []))
+        row['queue_p50'] = q(QUEUE_HISTOGRAM, 0.5)
+        row['queue_p95'] = q(QUEUE_HISTOGRAM, 0.95)
+        p50, p99 = q(BROADCAST_HISTOGRAM, 0.5), q(BROADCAST_HISTOGRAM, 0.99)
+        row['broadcast_p50_ms'] = p50 * 1000 if p50 is not None else None
+        row['broadcast_p99_ms'] = p99 * 1000 if p99 is not None else None
+        row['saturated'] = saturation(row)
+        return row
+
+    async def run(self, session, stop=None, on_row=None):
+        """Scrape every interval until stop is set (or forever)"""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                row = await self.scrape(session)
+                if row and on_row:
+                    on_row(row)
+            except aiohttp.ClientError:
+                self.errors += 1
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def summary(self):
+        """Totals and worst intervals over the whole scrape"""
+        if not self.rows:
+            return {}
+        worst = lambda key: max((r[key] for r in self.rows if r[key] is not None), default=None)
+        return {
+            'intervals': len(self.rows),
+            'peak_peers': max(r['peers'] for r in self.rows),
+            'peak_msg_out_per_s': worst('msg_out_per_s'),
+            'drops': sum(r['drops'] for r in self.rows),
+            'errors': sum(r['read_errors'] + r['write_errors'] + r['ping_errors'] for r in self.rows),
+            'worst_queue_p95': worst('queue_p95'),
+            'worst_broadcast_p99_ms': worst('broadcast_p99_ms'),
+            'saturated_intervals': sum(1 for r in self.rows if r['saturated']),
+        }
+
+
+def saturation(row):
+    """Reasons an interval looks saturated, as a short string ('' when healthy)"""
+    reasons = []
+    if row['drops']:
+        reasons.append(f"{row['drops']:.0f} drops")
+    if row['queue_p95'] is not None and row['queue_p95'] >= QUEUE_P95_LIMIT:
+        reasons.append(f"queue p95 {row['queue_p95']:.0f}")
+    if row['broadcast_p99_ms'] is not None and row['broadcast_p99_ms'] > BROADCAST_P99_LIMIT_MS:
+        reasons.append(f"broadcast p99 {row['broadcast_p99_ms']:.2f}ms")
+    return ', '.join(reasons)
+
+
+def print_row(row):
+    fmt = lambda v, spec: format(v, spec) if v is not None else '-'.rjust(len(format(0, spec)))
+    print(f"[{row['elapsed']:7.1f}s] rooms={row['rooms']:<4} peers={row['peers']:<5} "
+          f"in={row['msg_in_per_s']:8.0f}/s out={row['msg_out_per_s']:8.0f}/s "
+          f"queue p95={fmt(row['queue_p95'], '5.1f')} bcast p99={fmt(row['broadcast_p99_ms'], '7.3f')}ms"
+          + (f"  ⚠ {row['saturated']}" if row['saturated'] else ''))
+
+
+def print_summary(summary):
+    print(f"\n{'='*70}")
+    print("METRICS SUMMARY")
+    print(f"{'='*70}")
+    if not summary:
+        print("  No intervals scraped")
+        return
+    for key, value in summary.items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        print(f"  {key:<26} {value if value is not None else '-'}")
+    if summary['drops'] or summary['saturated_intervals']:
+        print(f"\n⚠ Hub saturated in {summary['saturated_intervals']} interval(s), {summary['drops']:.0f} message(s) dropped")
+    else:
+        print("\n✅ No drops or saturated intervals")
+
+
+def parse_duration(value):
+    m = re.fullmatch(r'(\d+(?:\.\d+)?)([smh]?)', value.strip())
+    if not m:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value}")
+    return float(m.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[m.group(2)]
+
+
+async def scrape_for(scraper, args):
+    stop = asyncio.Event()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+        if not await scraper.available(session):
+            raise RuntimeError(f"no signaler metrics at {scraper.url}")
+        print(f"Scraping {scraper.url} every {scraper.interval:g}s\n")
+        task = asyncio.create_task(scraper.run(session, stop, on_row=None if args.quiet else print_row))
+        try:
+            if args.duration:
+                await asyncio.sleep(args.duration)
+            else:
+                await asyncio.Event().wait()
+        finally:
+            stop.set()
+            await task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn the signaler's /metrics endpoint into a time series")
+    parser.add_argument('--url', default=DEFAULT_URL, help=f"metrics URL [{DEFAULT_URL}]")
+    parser.add_argument('--interval', type=float, default=1.0, help="scrape interval, s [1]")
+    parser.add_argument('--duration', type=parse_duration, default=None, help="e.g. 90s, 10m [until Ctrl-C]")
+    parser.add_argument('--csv', help="write the time series to this CSV file")
+    parser.add_argument('--json', help="write the time series and summary as JSON")
+    parser.add_argument('--quiet', action='store_true', help="don't print a line per interval")
+    args = parser.parse_args()
+
+    scraper = MetricsScraper(args.url, args.interval)
+    try:
+        asyncio.run(scrape_for(scraper, args))
+    except KeyboardInterrupt:
+        print("\n\nScrape stopped by user")
+
+    summary = scraper.summary()
+    print_summary(summary)
+
+    if args.csv and scraper.rows:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(scraper.rows[0]))
+            writer.writeheader()
+            writer.writerows(scraper.rows)
+        print(f"✅ Wrote {len(scraper.rows)} interval(s) to {args.csv}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'url': args.url, 'interval': args.interval, 'summary': summary, 'rows': scraper.rows}, f, indent=2)
+        print(f"✅ Wrote {args.json}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except RuntimeError as e:
+        print(f"\n✗ {e}")
+        sys.exit(1)
@@ -2,9 +2,20 @@
 """
 Setup script for Web MIDI Streamer
 Creates config.php and chimes.json from example files
+
+With --tune (on the server that runs coturn and the signaler) it inspects
+the host and writes tuned coturn, systemd and sysctl files to tuning/:
+
+    uv run scripts/setup.py --tune             # write tuning/ and show how to install it
+    uv run scripts/setup.py --tune --dry-run   # diff against the installed files, write nothing
+    uv run scripts/setup.py --check            # only validate the host (exit 1 on problems)
 """
 
+import argparse
+import difflib
 import os
+import re
+import resource
 import shutil
 import sys
 from pathlib import Path
@@ -159,8 +170,399 @@ def setup_signaling_directory():
     return True
 
 
+# ── Host tuning (coturn + signaler) ────────────────────────────────────────────
+
+MIB = 1024 * 1024
+MIN_SOCKET_BUFFER = 1 * MIB      # below this coturn drops UDP in bursts
+MIN_NETDEV_BACKLOG = 5000
+TURN_PORTS = (49152, 65535)      # relay range from TURN_SETUP.md, unless turnserver.conf sets one
+TURN_SESSION_BPS = 256000        # bytes/s per session: dense MIDI with DTLS/SCTP overhead, not video
+FDS_PER_ALLOCATION = 3           # client socket, relay socket, headroom for TCP/TLS listeners
+DEFAULT_UPLINK_MBPS = 1000
+
+# Generated file → where it is installed
+TUNING_FILES = {
+    "turnserver.conf": "/etc/turnserver.conf",
+    "coturn.service.d/override.conf": "/etc/systemd/system/coturn.service.d/override.conf",
+    "signaler.service.d/override.conf": "/etc/systemd/system/signaler.service.d/override.conf",
+    "99-web-midi-streamer.conf": "/etc/sysctl.d/99-web-midi-streamer.conf",
+}
+
+# Used when the host has no /etc/turnserver.conf yet (same as TURN_SETUP.md)
+TURNSERVER_TEMPLATE = """# Use time-limited credentials
+use-auth-secret
+static-auth-secret=YOUR_GENERATED_SECRET
+
+# Your domain
+realm=your-domain.com
+
+# Ports
+listening-port=3479
+tls-listening-port=5350
+
+# External IP
+external-ip=YOUR_SERVER_PUBLIC_IP
+
+# Security
+lt-cred-mech
+no-multicast-peers
+no-loopback-peers
+"""
+
+
+def read_sysctl(name, default=None):
+    """Read /proc/sys/<name with dots as slashes>, or default if unavailable"""
+    try:
+        return Path("/proc/sys", *name.split(".")).read_text().strip()
+    except OSError:
+        return default
+
+
+def sysctl_int(name, default=0):
+    value = read_sysctl(name)
+    try:
+        return int(value.split()[0]) if value else default
+    except ValueError:
+        return default
+
+
+def default_interface():
+    """Interface of the default route, from /proc/net/route"""
+    try:
+        for line in Path("/proc/net/route").read_text().splitlines()[1:]:
+            fields = line.split()
+            if len(fields) > 1 and fields[1] == "00000000":
+                return fields[0]
+    except OSError:
+        pass
+    return None
+
+
+def inspect_host():
+    """Cores, memory, socket buffer sysctls and fd limits of this host"""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+    memory_mb = None
+    try:
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemTotal:"):
+                memory_mb = int(line.split()[1]) // 1024
+                break
+    except OSError:
+        pass
+
+    iface = default_interface()
+    uplink_mbps = None
+    if iface:
+        try:
+            speed = int(Path(f"/sys/class/net/{iface}/speed").read_text())
+            uplink_mbps = speed if speed > 0 else None   # virtual NICs report -1
+        except (OSError, ValueError):
+            pass
+
+    local_ports = (read_sysctl("net.ipv4.ip_local_port_range") or "32768 60999").split()
+    nofile_soft, nofile_hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return {
+        "cpus": cpus,
+        "memory_mb": memory_mb,
+        "interface": iface,
+        "uplink_mbps": uplink_mbps,
+        "rmem_max": sysctl_int("net.core.rmem_max"),
+        "wmem_max": sysctl_int("net.core.wmem_max"),
+        "netdev_max_backlog": sysctl_int("net.core.netdev_max_backlog"),
+        "local_ports": (int(local_ports[0]), int(local_ports[1])),
+        "reserved_ports": read_sysctl("net.ipv4.ip_local_reserved_ports", ""),
+        "nr_open": sysctl_int("fs.nr_open", 1048576),
+        "file_max": sysctl_int("fs.file-max"),
+        "nofile_soft": nofile_soft,
+        "nofile_hard": nofile_hard,
+    }
+
+
+def read_turnserver_conf(root="/"):
+    """The installed turnserver.conf, or the TURN_SETUP.md template if there is none
+
+    Any other error (usually a root-only file) is raised: tuning the template
+    instead would suggest installing it over the real config.
+    """
+    try:
+        return Path(root, TUNING_FILES["turnserver.conf"].lstrip("/")).read_text()
+    except FileNotFoundError:
+        return TURNSERVER_TEMPLATE
+
+
+def turnserver_ports(conf):
+    """Relay port range set in a turnserver.conf, else TURN_PORTS"""
+    ports = dict(re.findall(r"(?m)^\s*(min-port|max-port)\s*=\s*(\d+)", conf))
+    return int(ports.get("min-port", TURN_PORTS[0])), int(ports.get("max-port", TURN_PORTS[1]))
+
+
+def plan_tuning(host, uplink_mbps=None, ports=TURN_PORTS):
+    """Derive coturn, systemd and sysctl settings from inspect_host()"""
+    cpus = host["cpus"]
+    # On 4+ cores keep a quarter for the signaler so a relay burst in coturn
+    # cannot starve WebSocket pings; below that both share every core.
+    if len(cpus) >= 4:
+        signaler_cpus = cpus[:max(1, len(cpus) // 4)]
+        coturn_cpus = cpus[len(signaler_cpus):]
+    else:
+        signaler_cpus = coturn_cpus = None
+
+    buffer = 8 * MIB if (host["memory_mb"] or 0) >= 2048 else 4 * MIB
+    min_port, max_port = ports
+    ports = max_port - min_port + 1
+    limit_nofile = min(host["nr_open"], max(65536, ports * FDS_PER_ALLOCATION))
+
+    uplink = uplink_mbps or host["uplink_mbps"] or DEFAULT_UPLINK_MBPS
+    return {
+        "relay_threads": len(coturn_cpus or cpus),
+        "min_port": min_port,
+        "max_port": max_port,
+        "total_quota": min(ports, limit_nofile // FDS_PER_ALLOCATION),
+        "bps_capacity": int(uplink * 1_000_000 / 8 * 0.8),   # leave 20% for the signaler and web server
+        "max_bps": TURN_SESSION_BPS,
+        "uplink_mbps": uplink,
+        "uplink_guessed": not (uplink_mbps or host["uplink_mbps"]),
+        "limit_nofile": limit_nofile,
+        "signaler_cpus": signaler_cpus,
+        "coturn_cpus": coturn_cpus,
+        "socket_buffer": max(buffer, host["rmem_max"], host["wmem_max"]),
+        "netdev_max_backlog": max(MIN_NETDEV_BACKLOG, host["netdev_max_backlog"]),
+        # The sysctl replaces the whole list, so keep what the host already reserves
+        "reserved_ports": merge_port_ranges(parse_port_ranges(host["reserved_ports"]) + [(min_port, max_port)]),
+    }
+
+
+def merge_turnserver_conf(existing, settings):
+    """Set each key in a turnserver.conf, keeping every other line as it is
+
+    The first active `key=value` line of a tuned key is replaced and later
+    duplicates are dropped; keys that are not set yet are appended.
+    """
+    lines, seen = [], set()
+    for line in existing.splitlines():
+        m = re.match(r"\s*([a-z0-9-]+)\s*(?:=|\s|$)", line)
+        key = m.group(1) if m and not line.lstrip().startswith("#") else None
+        if key in settings:
+            if key not in seen:
+                lines.append(f"{key}={settings[key]}")
+                seen.add(key)
+            continue
+        lines.append(line)
+    missing = [key for key in settings if key not in seen]
+    if missing:
+        if lines and lines[-1].strip():
+            lines.append("")
+        lines.append("# Tuned by setup.py --tune")
+        lines.extend(f"{key}={settings[key]}" for key in missing)
+    return "\n".join(lines) + "\n"
+
+
+def cpu_list(cpus):
+    return " ".join(str(cpu) for cpu in cpus)
+
+
+def render_tuning(plan, turnserver):
+    """Contents of every file in TUNING_FILES"""
+    files = {
+        "turnserver.conf": merge_turnserver_conf(turnserver, {
+            "relay-threads": plan["relay_threads"],
+            "min-port": plan["min_port"],
+            "max-port": plan["max_port"],
+            "total-quota": plan["total_quota"],
+            "max-bps": plan["max_bps"],
+            "bps-capacity": plan["bps_capacity"],
+        }),
+    }
+
+    for name, cpus in (("coturn", plan["coturn_cpus"]), ("signaler", plan["signaler_cpus"])):
+        unit = ["# Generated by setup.py --tune", "[Service]", f"LimitNOFILE={plan['limit_nofile']}"]
+        if cpus:
+            unit.append(f"CPUAffinity={cpu_list(cpus)}")
+        files[f"{name}.service.d/override.conf"] = "\n".join(unit) + "\n"
+
+    buffer = plan["socket_buffer"]
+    files["99-web-midi-streamer.conf"] = "\n".join([
+        "# Generated by setup.py --tune",
+        "# UDP bursts to coturn are dropped when the receive buffer is full",
+        f"net.core.rmem_max = {buffer}",
+        f"net.core.wmem_max = {buffer}",
+        f"net.core.netdev_max_backlog = {plan['netdev_max_backlog']}",
+        "# Keep ephemeral ports out of coturn's relay range",
+        f"net.ipv4.ip_local_reserved_ports = {plan['reserved_ports']}",
+    ]) + "\n"
+    return files
+
+
+def parse_port_ranges(value):
+    """'49152-65535,8765' → [(49152, 65535), (8765, 8765)]"""
+    ranges = []
+    for part in (value or "").replace(" ", "").split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        ranges.append((int(lo), int(hi or lo)))
+    return ranges
+
+
+def merge_port_ranges(ranges):
+    """[(8765, 8765), (49152, 65535), (49200, 49300)] → '8765,49152-65535'"""
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return ",".join(str(lo) if lo == hi else f"{lo}-{hi}" for lo, hi in merged)
+
+
+def service_nofile(comm):
+    """Soft 'Max open files' of a running process by name, or None"""
+    for proc in Path("/proc").glob("[0-9]*"):
+        try:
+            if (proc / "comm").read_text().strip() != comm:
+                continue
+            for line in (proc / "limits").read_text().splitlines():
+                if line.startswith("Max open files"):
+                    return int(line.split()[3])
+        except (OSError, ValueError, IndexError):
+            continue
+    return None
+
+
+def validate_host(host, plan):
+    """Problems that limit latency under load, as (level, message) with level 'error' or 'warning'"""
+    issues = []
+    for key in ("rmem_max", "wmem_max"):
+        value = host[key]
+        if value < plan["socket_buffer"]:
+            level = "error" if value < MIN_SOCKET_BUFFER else "warning"
+            issues.append((level, f"net.core.{key} is {value // 1024} KiB, undersized for UDP relay bursts "
+                                  f"(want {plan['socket_buffer'] // MIB} MiB)"))
+    if host["netdev_max_backlog"] < MIN_NETDEV_BACKLOG:
+        issues.append(("warning", f"net.core.netdev_max_backlog is {host['netdev_max_backlog']} "
+                                  f"(want ≥ {MIN_NETDEV_BACKLOG})"))
+
+    lo, hi = host["local_ports"]
+    relay = (plan["min_port"], plan["max_port"])
+    overlap = (max(lo, relay[0]), min(hi, relay[1]))
+    reserved = parse_port_ranges(host["reserved_ports"])
+    covered = any(r_lo <= overlap[0] and r_hi >= overlap[1] for r_lo, r_hi in reserved)
+    if overlap[0] <= overlap[1] and not covered:
+        issues.append(("warning", f"ephemeral ports {lo}-{hi} overlap the TURN relay range {relay[0]}-{relay[1]}; "
+                                  "outgoing connections can take ports coturn needs"))
+
+    if host["nr_open"] < plan["limit_nofile"]:
+        issues.append(("error", f"fs.nr_open is {host['nr_open']}, below LimitNOFILE={plan['limit_nofile']}"))
+    if host["file_max"] and host["file_max"] < plan["limit_nofile"] * 2:
+        issues.append(("warning", f"fs.file-max is {host['file_max']}, too low for coturn and the signaler together"))
+    for comm in ("turnserver", "signaler"):
+        nofile = service_nofile(comm)
+        if nofile is not None and nofile < plan["limit_nofile"]:
+            issues.append(("warning", f"running {comm} has an open-file limit of {nofile} "
+                                      f"(want {plan['limit_nofile']}; install the systemd override)"))
+    return issues
+
+
+def print_host(host, plan):
+    print("\n=== Host ===")
+    memory = f"{host['memory_mb']} MB" if host["memory_mb"] else "unknown"
+    uplink = f"{plan['uplink_mbps']} Mbit/s" + (" (assumed; pass --uplink-mbps)" if plan["uplink_guessed"] else "")
+    print(f"  CPUs           : {len(host['cpus'])} ({cpu_list(host['cpus'])})")
+    print(f"  Memory         : {memory}")
+    print(f"  Uplink         : {uplink}{' on ' + host['interface'] if host['interface'] else ''}")
+    print(f"  rmem/wmem max  : {host['rmem_max'] // 1024} / {host['wmem_max'] // 1024} KiB")
+    print(f"  Ephemeral ports: {host['local_ports'][0]}-{host['local_ports'][1]}")
+    print(f"  Open files     : soft {host['nofile_soft']}, hard {host['nofile_hard']}, nr_open {host['nr_open']}")
+
+    print("\n=== Plan ===")
+    print(f"  coturn   : {plan['relay_threads']} relay threads, ports {plan['min_port']}-{plan['max_port']}, "
+          f"≤ {plan['total_quota']} allocations")
+    print(f"             {plan['max_bps'] // 1000} kB/s per session, {plan['bps_capacity'] // 1_000_000} MB/s total")
+    if plan["coturn_cpus"]:
+        print(f"  CPUs     : coturn {cpu_list(plan['coturn_cpus'])}, signaler {cpu_list(plan['signaler_cpus'])}")
+    else:
+        print("  CPUs     : shared (fewer than 4 cores, no pinning)")
+    print(f"  Limits   : LimitNOFILE={plan['limit_nofile']} for both services")
+
+
+def print_issues(issues):
+    print("\n=== Validation ===")
+    if not issues:
+        print("✅ Socket buffers, port ranges and file limits look fine")
+    for level, message in issues:
+        print(f"{'❌' if level == 'error' else '⚠️ '} {message}")
+
+
+def tune_host(args):
+    """Inspect the host, validate it and write (or diff) the tuned configs"""
+    host = inspect_host()
+    try:
+        turnserver = read_turnserver_conf(args.root)
+    except OSError as e:
+        print(f"❌ Error: cannot read {e.filename}: {e.strerror}")
+        print("   Run with sudo, or point --root at a readable copy of the installed files")
+        return False
+    plan = plan_tuning(host, args.uplink_mbps, turnserver_ports(turnserver))
+    print_host(host, plan)
+    issues = validate_host(host, plan)
+    print_issues(issues)
+    if args.check:
+        return not issues
+
+    files = render_tuning(plan, turnserver)
+    if args.dry_run:
+        print("\n=== Changes (dry run, nothing written) ===")
+        for name, content in files.items():
+            installed = Path(args.root, TUNING_FILES[name].lstrip("/"))
+            try:
+                current = installed.read_text()
+            except OSError:
+                current = ""
+            diff = list(difflib.unified_diff(current.splitlines(keepends=True), content.splitlines(keepends=True),
+                                             fromfile=str(installed), tofile=f"{args.out}/{name}"))
+            if diff:
+                sys.stdout.writelines(diff)
+            else:
+                print(f"  {installed} is up to date")
+        return True
+
+    out = Path(args.out)
+    for name, content in files.items():
+        path = out / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        print(f"✅ Wrote {path}")
+    print("\nInstall with:")
+    for name, target in TUNING_FILES.items():
+        print(f"  sudo install -D -m 644 {out / name} {target}")
+    print("  sudo sysctl --system")
+    print("  sudo systemctl daemon-reload && sudo systemctl restart coturn signaler")
+    if "YOUR_GENERATED_SECRET" in files["turnserver.conf"]:
+        print("\n⚠️  No /etc/turnserver.conf found: fill in the secret, realm and external IP first (see TURN_SETUP.md)")
+    return True
+
+
 def main():
     """Main setup function"""
+    parser = argparse.ArgumentParser(description="Set up Web MIDI Streamer")
+    parser.add_argument("--tune", action="store_true",
+                        help="inspect this host and write tuned coturn/systemd/sysctl files")
+    parser.add_argument("--check", action="store_true", help="only validate the host; exit 1 on problems")
+    parser.add_argument("--dry-run", action="store_true", help="with --tune: diff against installed files, write nothing")
+    parser.add_argument("--out", default="tuning", help="directory for generated files [tuning]")
+    parser.add_argument("--uplink-mbps", type=int, help="server uplink for coturn's bandwidth cap [from the NIC, else 1000]")
+    parser.add_argument("--root", default="/", help="filesystem root holding the installed files [/]")
+    args = parser.parse_args()
+
+    if args.tune or args.check:
+        print("=" * 60)
+        print("Web MIDI Streamer - Host Tuning")
+        print("=" * 60)
+        ok = tune_host(args)
+        print()
+        sys.exit(0 if ok else 1)
+
     print("=" * 60)
     print("Web MIDI Streamer - Setup Script")
     print("=" * 60)
@@ -190,6 +592,7 @@ def main():
         print("  2. Customize chimes.json if desired")
         print("  3. Start the server: php -S localhost:8080")
         print("  4. Open http://localhost:8080 in your browser")
+        print("  5. On the server running coturn and the signaler: uv run scripts/setup.py --tune")
     else:
         print("\n⚠️  Setup completed with some warnings.")
         print("Please review the output above.")
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "aiohttp>=3.9",
+# ]
+# ///
+"""
+Signaler soak test
+
+Runs a locally built signaler for hours under randomized churn and looks
+for slow resource leaks in the Hub (room maps, hiddenRooms entries, the
+two goroutines started per client):
+
+  - WebSocket clients join random rooms, send keepalive/sdp/ice messages
+    and leave again after a random lifetime; some drop the TCP connection
+    without a close frame to exercise the read-error path
+  - rooms are hidden and shown via POST /hide-room and /show-room
+  - lobby viewers poll GET /rooms
+
+RSS, open file descriptors and thread count are sampled from /proc, along
+with /rooms and /health latency. At the end all clients are closed and the
+process is sampled again after a settle period; linear trends over the
+run and the drained state versus the idle baseline decide whether a leak
+or latency drift is flagged.
+
+Usage:
+    uv run scripts/soak_signaler.py [--binary signaler/signaler] [--duration 4h] [--report soak.json]
+
+Example:
+    cd signaler && go build -o signaler . && cd ..
+    uv run scripts/soak_signaler.py --duration 2h --clients 200 --churn 20 --report soak.json
+
+Note:
+    - Linux only (reads /proc/<pid>)
+    - Exit code 1 when a leak or latency drift is flagged
+    - When the signaler serves /metrics, it is scraped every sample interval
+      and the time series goes into the report (drops and queue occupancy
+      show hub saturation that the /proc samples cannot)
+    - Latency and resource distributions are appended to the benchmark
+      result store as 'signaler_soak' (see bench_results.py; --no-record to skip)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench_results import SampleReservoir, metric, record
+from scrape_signaler_metrics import MetricsScraper
+
+try:
+    import aiohttp
+except ImportError:
+    print("ERROR: aiohttp library not found. Install with: pip install aiohttp")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BINARY = ROOT / "signaler" / "signaler"
+
+# Leak / drift thresholds (override on the command line)
+RSS_SLOPE_MB_PER_HOUR = 2.0
+FD_RESIDUAL = 8
+THREAD_RESIDUAL = 4
+LATENCY_DRIFT_RATIO = 1.5
+LATENCY_DRIFT_MIN_MS = 1.0
+MIN_R_SQUARED = 0.5
+
+
+def parse_duration(value):
+    """'90', '90s', '15m', '4h' → seconds"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smh]?)', value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value}")
+    return float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(2)]
+
+
+def read_proc(pid):
+    """RSS (MB), open FDs and OS threads of a running process"""
+    rss_kb = threads = 0
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+            elif line.startswith('Threads:'):
+                threads = int(line.split()[1])
+    fds = len(os.listdir(f'/proc/{pid}/fd'))
+    return rss_kb / 1024, fds, threads
+
+
+def linear_trend(xs, ys):
+    """Least-squares slope and R² of ys over xs"""
+    n = len(xs)
+    if n < 3:
+        return 0.0, 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    syy = sum((y - my) ** 2 for y in ys)
+    sxy = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    if sxx == 0:
+        return 0.0, 0.0
+    slope = sxy / sxx
+    r2 = (sxy * sxy) / (sxx * syy) if syy else 0.0
+    return slope, r2
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class SoakTest:
+    """Drives churn against one signaler process and records resource samples"""
+
+    def __init__(self, binary, port, duration, clients, rooms, churn, poll_interval,
+                 sample_interval, abort_ratio, settle, log_path=None):
+        self.binary = binary
+        self.port = port
+        self.base = f"http://127.0.0.1:{port}"
+        self.duration = duration
+        self.max_clients = clients
+        self.room_names = [f"soak-{i}" for i in range(rooms)]
+        self.churn = churn
+        self.poll_interval = poll_interval
+        self.sample_interval = sample_interval
+        self.abort_ratio = abort_ratio
+        self.settle = settle
+        self.log_path = log_path
+
+        self.proc = None
+        self.clients = set()
+        self.samples = []
+        self.baseline = None
+        self.drained = None
+        self.latency = {'rooms': [], 'health': []}   # (elapsed, ms) — trimmed per sample window
+        self.latency_all = {'rooms': SampleReservoir(), 'health': SampleReservoir()}   # whole run, bounded
+        self.counters = {'joins': 0, 'leaves': 0, 'aborts': 0, 'join_errors': 0,
+                         'messages_sent': 0, 'messages_received': 0, 'hide': 0, 'show': 0,
+                         'poll_errors': 0}
+        self.scraper = MetricsScraper(f"{self.base}/metrics", sample_interval)
+        self._started = None
+        self._stop = asyncio.Event()
+
+    # ── Process ────────────────────────────────────────────────────────────────
+
+    async def start_signaler(self):
+        log = open(self.log_path, 'ab') if self.log_path else subprocess.DEVNULL
+        self.proc = subprocess.Popen(
+            [str(self.binary), '-addr', f'127.0.0.1:{self.port}'],
+            stdout=log, stderr=log
+        )
+        async with aiohttp.ClientSession() as session:
+            for _ in range(100):
+                if self.proc.poll() is not None:
+                    raise RuntimeError(f"signaler exited with code {self.proc.returncode}")
+                try:
+                    async with session.get(f"{self.base}/health") as resp:
+                        if resp.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise RuntimeError("signaler did not answer /health within 10s")
+
+    def stop_signaler(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    # ── Load generators ────────────────────────────────────────────────────────
+
+    async def client(self, session, lifetime):
+        room = random.choice(self.room_names)
+        peer = f"soak{random.getrandbits(40):010x}"
+        url = f"ws://127.0.0.1:{self.port}/signal?room={room}&peer={peer}"
+        try:
+            ws = await session.ws_connect(url, heartbeat=None, timeout=aiohttp.ClientWSTimeout(ws_close=2))
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.counters['join_errors'] += 1
+            return
+
+        self.counters['joins'] += 1
+        task = asyncio.current_task()
+        self.clients.add(task)
+
+        async def drain():
+            async for _ in ws:
+                self.counters['messages_received'] += 1
+
+        reader = asyncio.create_task(drain())
+        try:
+            await ws.send_str(json.dumps({'type': 'join', 'from': peer}))
+            self.counters['messages_sent'] += 1
+            deadline = time.monotonic() + lifetime
+            while time.monotonic() < deadline and not self._stop.is_set():
+                await asyncio.sleep(min(random.expovariate(1 / 5), max(deadline - time.monotonic(), 0)))
+                kind = random.choice(('keepalive', 'sdp', 'ice'))
+                msg = {'type': kind, 'from': peer}
+                if kind != 'keepalive':
+                    msg['to'] = f"soak{random.getrandbits(40):010x}"
+                    msg['sdp' if kind == 'sdp' else 'candidate'] = 'x' * random.randint(200, 2000)
+                await ws.send_str(json.dumps(msg))
+                self.counters['messages_sent'] += 1
+
+            if random.random() < self.abort_ratio and not self._stop.is_set():
+                # Drop the TCP connection without a close handshake
+                ws._response.connection.transport.abort()
+                self.counters['aborts'] += 1
+            else:
+                await ws.close()
+            self.counters['leaves'] += 1
+        except (aiohttp.ClientError, ConnectionError, AttributeError):
+            pass
+        finally:
+            reader.cancel()
+            if not ws.closed:
+                await ws.close()
+            self.clients.discard(task)
+
+    async def churn_driver(self, session):
+        mean_lifetime = max(self.max_clients / max(self.churn, 0.01), 1)
+        while not self._stop.is_set():
+            await asyncio.sleep(random.expovariate(self.churn))
+            if len(self.clients) < self.max_clients:
+                asyncio.create_task(self.client(session, random.expovariate(1 / mean_lifetime)))
+
+    async def room_flipper(self, session):
+        while not self._stop.is_set():
+            await asyncio.sleep(random.expovariate(1 / 2))
+            hide = random.random() < 0.5
+            room = random.choice(self.room_names)
+            try:
+                async with session.post(f"{self.base}/{'hide' if hide else 'show'}-room?room={room}") as resp:
+                    await resp.read()
+                self.counters['hide' if hide else 'show'] += 1
+            except aiohttp.ClientError:
+                pass
+
+    async def timed_get(self, session, path):
+        start = time.perf_counter()
+        async with session.get(f"{self.base}{path}") as resp:
+            await resp.read()
+            resp.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    async def poller(self, session, path, key, interval):
+        while not self._stop.is_set():
+            try:
+                ms = await self.timed_get(session, path)
+                self.latency[key].append(ms)
+                self.latency_all[key].add(ms)
+            except aiohttp.ClientError:
+                self.counters['poll_errors'] += 1
+            await asyncio.sleep(interval)
+
+    # ── Sampling ───────────────────────────────────────────────────────────────
+
+    def sample(self, phase='run'):
+        rss, fds, threads = read_proc(self.proc.pid)
+        point = {
+            'elapsed': time.monotonic() - self._started,
+            'phase': phase,
+            'rss_mb': rss,
+            'fds': fds,
+            'threads': threads,
+            'clients': len(self.clients),
+            'rooms_p50_ms': percentile(self.latency['rooms'], 0.5),
+            'rooms_p95_ms': percentile(self.latency['rooms'], 0.95),
+            'health_p50_ms': percentile(self.latency['health'], 0.5),
+            'health_p95_ms': percentile(self.latency['health'], 0.95),
+        }
+        # Latency lists only cover one sample window, so memory stays bounded
+        self.latency = {'rooms': [], 'health': []}
+        self.samples.append(point)
+        return point
+
+    async def sampler(self):
+        next_report = 0
+        while not self._stop.is_set():
+            await asyncio.sleep(self.sample_interval)
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"signaler exited with code {self.proc.returncode}")
+            p = self.sample()
+            if p['elapsed'] >= next_report:
+                next_report = p['elapsed'] + 60
+                drops = f" drops={sum(r['drops'] for r in self.scraper.rows)}" if self.scraper.rows else ''
+                print(f"[{p['elapsed'] / 60:6.1f} min] clients={p['clients']:4d} rss={p['rss_mb']:6.1f}MB "
+                      f"fds={p['fds']:4d} threads={p['threads']:3d} "
+                      f"/rooms p95={p['rooms_p95_ms'] or 0:6.2f}ms joins={self.counters['joins']}{drops}")
+
+    # ── Run ────────────────────────────────────────────────────────────────────
+
+    async def run(self):
+        await self.start_signaler()
+        self._started = time.monotonic()
+        await asyncio.sleep(1)
+        self.baseline = self.sample('baseline')
+        print(f"Baseline: rss={self.baseline['rss_mb']:.1f}MB fds={self.baseline['fds']} "
+              f"threads={self.baseline['threads']}")
+
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = [
+                asyncio.create_task(self.churn_driver(session)),
+                asyncio.create_task(self.room_flipper(session)),
+                asyncio.create_task(self.poller(session, '/rooms', 'rooms', self.poll_interval)),
+                asyncio.create_task(self.poller(session, '/health', 'health', 1.0)),
+                asyncio.create_task(self.sampler()),
+            ]
+            if await self.scraper.available(session):
+                tasks.append(asyncio.create_task(self.scraper.run(session, self._stop)))
+            done, _ = await asyncio.wait(tasks, timeout=self.duration, return_when=asyncio.FIRST_EXCEPTION)
+            for t in done:
+                t.result()   # surface a crashed signaler
+
+            print(f"Draining {len(self.clients)} client(s)...")
+            self._stop.set()
+            for t in tasks:
+                t.cancel()
+            clients = list(self.clients)
+            await asyncio.gather(*clients, return_exceptions=True)
+
+        await asyncio.sleep(self.settle)
+        self.drained = self.sample('drained')
+
+    def analyze(self, warmup):
+        """Trend and residual checks; returns (findings, stats)"""
+        run = [s for s in self.samples if s['phase'] == 'run' and s['elapsed'] >= warmup]
+        findings, stats = [], {}
+        if len(run) < 3:
+            return ["not enough samples after warm-up for trend analysis"], stats
+
+        hours = [s['elapsed'] / 3600 for s in run]
+        for key in ('rss_mb', 'fds', 'threads'):
+            slope, r2 = linear_trend(hours, [s[key] for s in run])
+            stats[f'{key}_slope_per_hour'] = slope
+            stats[f'{key}_r2'] = r2
+        if stats['rss_mb_slope_per_hour'] > RSS_SLOPE_MB_PER_HOUR and stats['rss_mb_r2'] >= MIN_R_SQUARED:
+            findings.append(f"RSS grows {stats['rss_mb_slope_per_hour']:.2f} MB/h (R²={stats['rss_mb_r2']:.2f})")
+
+        fd_residual = self.drained['fds'] - self.baseline['fds']
+        thread_residual = self.drained['threads'] - self.baseline['threads']
+        stats['fd_residual'] = fd_residual
+        stats['thread_residual'] = thread_residual
+        stats['rss_residual_mb'] = self.drained['rss_mb'] - self.baseline['rss_mb']
+        if fd_residual > FD_RESIDUAL:
+            findings.append(f"{fd_residual} file descriptors still open after all clients left")
+        if thread_residual > THREAD_RESIDUAL:
+            findings.append(f"{thread_residual} extra OS threads after all clients left")
+
+        window = max(len(run) // 5, 1)
+        for key in ('rooms_p95_ms', 'health_p95_ms'):
+            head = [s[key] for s in run[:window] if s[key] is not None]
+            tail = [s[key] for s in run[-window:] if s[key] is not None]
+            if not head or not tail:
+                continue
+            first, last = sorted(head)[len(head) // 2], sorted(tail)[len(tail) // 2]
+            stats[f'{key}_first'] = first
+            stats[f'{key}_last'] = last
+            if last > first * LATENCY_DRIFT_RATIO and last - first > LATENCY_DRIFT_MIN_MS:
+                findings.append(f"{key.split('_')[0]} latency p95 drifted {first:.2f} → {last:.2f} ms")
+
+        return findings, stats
+
+    def record_results(self, warmup):
+        """Append latency and resource distributions to the benchmark result store"""
+        run = [s for s in self.samples if s['phase'] == 'run' and s['elapsed'] >= warmup]
+        metrics = {
+            'rooms_latency': metric(self.latency_all['rooms']),
+            'health_latency': metric(self.latency_all['health']),
+            'rss': metric([s['rss_mb'] for s in run], unit='MB'),
+            'fds': metric([s['fds'] for s in run], unit='fds'),
+            'threads': metric([s['threads'] for s in run], unit='threads'),
+        }
+        params = {'duration': self.duration, 'clients': self.max_clients, 'rooms': len(self.room_names),
+                  'churn': self.churn, 'abort_ratio': self.abort_ratio}
+        return record('signaler_soak', metrics, params=params)
+
+
+def main():
+    global RSS_SLOPE_MB_PER_HOUR, FD_RESIDUAL, LATENCY_DRIFT_RATIO
+
+    parser = argparse.ArgumentParser(description="Soak-test the signaler under randomized churn")
+    parser.add_argument('--binary', default=str(DEFAULT_BINARY), help="signaler binary [signaler/signaler]")
+    parser.add_argument('--port', type=int, default=18765)
+    parser.add_argument('--duration', type=parse_duration, default=parse_duration('1h'), help="e.g. 30m, 4h [1h]")
+    parser.add_argument('--warmup', type=parse_duration, default=None, help="excluded from trends [10%% of duration]")
+    parser.add_argument('--clients', type=int, default=100, help="max concurrent clients [100]")
+    parser.add_argument('--rooms', type=int, default=20, help="number of room names [20]")
+    parser.add_argument('--churn', type=float, default=10.0, help="client joins per second [10]")
+    parser.add_argument('--abort-ratio', type=float, default=0.1, help="clients that drop TCP without close [0.1]")
+    parser.add_argument('--poll-interval', type=float, default=0.2, help="/rooms poll interval, s [0.2]")
+    parser.add_argument('--sample-interval', type=float, default=5.0, help="resource sample interval, s [5]")
+    parser.add_argument('--settle', type=float, default=10.0, help="wait after draining before the final sample [10]")
+    parser.add_argument('--rss-slope', type=float, default=RSS_SLOPE_MB_PER_HOUR, help="flag RSS growth above MB/h")
+    parser.add_argument('--fd-residual', type=int, default=FD_RESIDUAL, help="flag more leftover FDs than this")
+    parser.add_argument('--drift-ratio', type=float, default=LATENCY_DRIFT_RATIO, help="flag p95 latency growth ratio")
+    parser.add_argument('--signaler-log', help="keep the signaler's log output in this file")
+    parser.add_argument('--report', help="write samples and verdict as JSON")
+    parser.add_argument('--no-record', action='store_true', help="don't append to the benchmark result store")
+    args = parser.parse_args()
+
+    RSS_SLOPE_MB_PER_HOUR, FD_RESIDUAL, LATENCY_DRIFT_RATIO = args.rss_slope, args.fd_residual, args.drift_ratio
+
+    if not Path(args.binary).is_file():
+        print(f"ERROR: signaler binary not found: {args.binary}")
+        print("Build it with: cd signaler && go build -o signaler .")
+        sys.exit(1)
+    if not Path('/proc/self/status').exists():
+        print("ERROR: /proc not available — the soak test runs on Linux only")
+        sys.exit(1)
+
+    soak = SoakTest(args.binary, args.port, args.duration, args.clients, args.rooms, args.churn,
+                    args.poll_interval, args.sample_interval, args.abort_ratio, args.settle,
+                    args.signaler_log)
+    warmup = args.warmup if args.warmup is not None else args.duration * 0.1
+
+    print(f"Soaking {args.binary} on port {args.port} for {args.duration / 60:.1f} min")
+    try:
+        asyncio.run(soak.run())
+    finally:
+        soak.stop_signaler()
+
+    findings, stats = soak.analyze(warmup)
+
+    print(f"\n{'='*70}")
+    print(f"SOAK SUMMARY")
+    print(f"{'='*70}")
+    for key, value in soak.counters.items():
+        print(f"  {key:<18} {value}")
+    for key, value in stats.items():
+        print(f"  {key:<26} {value:.3f}" if isinstance(value, float) else f"  {key:<26} {value}")
+    for key, value in soak.scraper.summary().items():
+        print(f"  {key:<26} {value:.3f}" if isinstance(value, float) else f"  {key:<26} {value}")
+    print()
+    if findings:
+        for f in findings:
+            print(f"⚠ {f}")
+    else:
+        print("✓ No leaks or latency drift detected")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'counters': soak.counters, 'stats': stats, 'findings': findings,
+                       'baseline': soak.baseline, 'drained': soak.drained, 'samples': soak.samples,
+                       'metrics': soak.scraper.rows}, f, indent=2)
+        print(f"✅ Wrote {args.report}")
+    if not args.no_record:
+        run = soak.record_results(warmup)
+        print(f"✅ Recorded signaler_soak run {run['id']} (compare with: bench_results.py compare signaler_soak)")
+
+    sys.exit(1 if findings else 0)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nSoak test interrupted by user")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"\n✗ {e}")
+        sys.exit(1)
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = [
+#   "numpy>=1.24",
+# ]
+# ///
+"""
+Columnar archive for recorded takes
+
+Stores thousands of takes in one directory instead of thousands of .mid
+files. Events of all takes are appended to four struct-of-arrays column
+files that are memory-mapped on read:
+
+    delta.u32  status.u8  data1.u8  data2.u8
+
+Tempo maps go to two more columns (tempo_tick.u32, tempo_value.u32), so
+takes with tempo changes keep their timing. A per-take index (index.npy:
+event and tempo offsets, duration, note count, notes/sec, peer, timestamp,
+...) answers metadata queries without touching the event columns, and
+loading one take is a slice of each column. An
+optional pitch index (pitch_index.npy) lists every note-on sorted by pitch
+so "which takes play pitch P around time T" is a binary search.
+
+Usage:
+    uv run scripts/take_archive.py import <archive> <file_or_dir>... [--peer NAME]
+    uv run scripts/take_archive.py list   <archive> [--min-nps X] [--peer NAME] [--since ISO] [--until ISO]
+    uv run scripts/take_archive.py export <archive> <take_id> <out.mid>
+    uv run scripts/take_archive.py index  <archive>
+    uv run scripts/take_archive.py pitch  <archive> <midi_note> [--start S] [--end S]
+    uv run scripts/take_archive.py check                # import round trip in a temporary archive
+
+Example:
+    uv run scripts/take_archive.py import ~/takes.arc ~/Downloads --peer deniz
+    uv run scripts/take_archive.py list ~/takes.arc --min-nps 8
+
+Note:
+    - Imported files keep their timestamp from the midi-take-<ms>.mid name
+      written by the app, falling back to the file modification time
+    - export writes the same SMF layout as MIDIRecorder.exportMID
+    - Peer names are stored in 32 bytes; longer names are rejected on import
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from midi_file import SMFError, read_smf, ticks_to_seconds, write_smf
+
+FORMAT_VERSION = 1
+
+COLUMNS = {
+    'delta': np.uint32,
+    'status': np.uint8,
+    'data1': np.uint8,
+    'data2': np.uint8,
+}
+
+TEMPO_COLUMNS = {
+    'tempo_tick': np.uint32,      # tick of the tempo change
+    'tempo_value': np.uint32,     # µs per quarter note from that tick on
+}
+
+PEER_BYTES = 32
+
+INDEX_DTYPE = np.dtype([
+    ('offset', np.uint64),        # first event row in the column files
+    ('count', np.uint32),         # number of events
+    ('duration', np.float64),     # seconds
+    ('note_count', np.uint32),
+    ('notes_per_sec', np.float32),
+    ('timestamp', np.float64),    # unix seconds the take was recorded
+    ('ppq', np.uint16),
+    ('tempo_offset', np.uint64),  # first row in the tempo column files
+    ('tempo_count', np.uint32),   # tempo changes, including the one at tick 0
+    ('peer', f'S{PEER_BYTES}'),
+    ('source', 'S128'),           # original file name
+])
+
+PITCH_INDEX_DTYPE = np.dtype([
+    ('pitch', np.uint8),
+    ('take', np.uint32),
+    ('time', np.float32),         # seconds from the start of the take
+    ('velocity', np.uint8),
+])
+
+_TAKE_NAME = re.compile(r'midi-take-(\d{10,})')
+
+
+class TakeArchive:
+    """Append-only columnar store of MIDI takes"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self.path / 'archive.json'
+        self._index = None
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported archive version: {meta.get('version')}")
+        else:
+            for name in {**COLUMNS, **TEMPO_COLUMNS}:
+                (self.path / self._column_file(name)).touch()
+            np.save(self.path / 'index.npy', np.zeros(0, dtype=INDEX_DTYPE))
+            meta_path.write_text(json.dumps({'version': FORMAT_VERSION, 'columns': list(COLUMNS),
+                                             'tempo_columns': list(TEMPO_COLUMNS)}))
+
+    @staticmethod
+    def _column_file(name):
+        dtype = {**COLUMNS, **TEMPO_COLUMNS}[name]
+        return f"{name}.{np.dtype(dtype).name.replace('int', '')}"
+
+    # ── Index ──────────────────────────────────────────────────────────────────
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = np.load(self.path / 'index.npy', mmap_mode='r')
+        return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def _write_index(self, index):
+        tmp = self.path / 'index.tmp.npy'
+        np.save(tmp, index)
+        os.replace(tmp, self.path / 'index.npy')
+        self._index = None
+
+    def _column(self, name):
+        """Memory-map one full event or tempo column (empty array if no rows yet)"""
+        dtype = {**COLUMNS, **TEMPO_COLUMNS}[name]
+        path = self.path / self._column_file(name)
+        if path.stat().st_size == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    def _tempos(self, row):
+        """Tempo map of one index row as [(tick, µs per quarter note)]"""
+        start, end = int(row['tempo_offset']), int(row['tempo_offset'] + row['tempo_count'])
+        ticks, values = self._column('tempo_tick')[start:end], self._column('tempo_value')[start:end]
+        return list(zip(ticks.tolist(), values.tolist()))
+
+    # ── Writing ────────────────────────────────────────────────────────────────
+
+    def add_takes(self, takes):
+        """Append takes; each item is (take_columns, peer, timestamp, source).
+
+        Column files are appended first and the index is replaced atomically
+        afterwards, so an interrupted import never exposes partial takes.
+        """
+        takes = list(takes)
+        for _, peer, _, source in takes:
+            if len(peer.encode()) > PEER_BYTES:
+                raise ValueError(f"Peer name {peer!r} is longer than {PEER_BYTES} bytes ({source})")
+
+        index = np.array(self.index)
+        offset = int(index['offset'][-1] + index['count'][-1]) if len(index) else 0
+        tempo_offset = int(index['tempo_offset'][-1] + index['tempo_count'][-1]) if len(index) else 0
+        rows = []
+
+        handles = {name: open(self.path / self._column_file(name), 'ab') for name in COLUMNS}
+        tempo_handles = {name: open(self.path / self._column_file(name), 'ab') for name in TEMPO_COLUMNS}
+        try:
+            # Truncate to the indexed length, dropping rows from an interrupted import
+            for name, fh in handles.items():
+                fh.truncate(offset * np.dtype(COLUMNS[name]).itemsize)
+            for name, fh in tempo_handles.items():
+                fh.truncate(tempo_offset * np.dtype(TEMPO_COLUMNS[name]).itemsize)
+            for take, peer, timestamp, source in takes:
+                count = len(take['status'])
+                for name, fh in handles.items():
+                    fh.write(np.ascontiguousarray(take[name], dtype=COLUMNS[name]).tobytes())
+                tempos = np.array(take['tempos'], dtype=np.uint32).reshape(-1, 2)
+                tempo_handles['tempo_tick'].write(tempos[:, 0].tobytes())
+                tempo_handles['tempo_value'].write(tempos[:, 1].tobytes())
+
+                times = ticks_to_seconds(take['delta'], take['ppq'], take['tempos'])
+                duration = float(times[-1]) if count else 0.0
+                notes = int(np.count_nonzero(((take['status'] & 0xF0) == 0x90) & (take['data2'] > 0)))
+                rows.append((offset, count, duration, notes,
+                             notes / duration if duration > 0 else 0.0,
+                             timestamp, take['ppq'], tempo_offset, len(tempos),
+                             peer.encode(), source.encode()[:128].decode('utf-8', 'ignore').encode()))
+                offset += count
+                tempo_offset += len(tempos)
+        finally:
+            for fh in (*handles.values(), *tempo_handles.values()):
+                fh.close()
+
+        first_id = len(index)
+        self._write_index(np.concatenate([index, np.array(rows, dtype=INDEX_DTYPE)]))
+        # Appended takes are not covered by an existing pitch index
+        (self.path / 'pitch_index.npy').unlink(missing_ok=True)
+        return list(range(first_id, first_id + len(rows)))
+
+    def import_smf(self, paths, peer=''):
+        """Import .mid files; returns (take ids, [(path, error)])"""
+        takes, errors = [], []
+        for path in paths:
+            path = Path(path)
+            try:
+                take = read_smf(path)
+            except (OSError, SMFError) as e:
+                errors.append((path, str(e)))
+                continue
+            match = _TAKE_NAME.search(path.name)
+            timestamp = int(match.group(1)) / 1000 if match else path.stat().st_mtime
+            takes.append((take, peer, timestamp, path.name))
+        return self.add_takes(takes), errors
+
+    # ── Reading ────────────────────────────────────────────────────────────────
+
+    def load_take(self, take_id):
+        """Return one take as a dict of column views (no full-column copy)"""
+        row = self.index[take_id]
+        start, end = int(row['offset']), int(row['offset'] + row['count'])
+        take = {name: self._column(name)[start:end] for name in COLUMNS}
+        take['ppq'] = int(row['ppq'])
+        take['tempos'] = self._tempos(row)
+        return take
+
+    def export_smf(self, take_id, out_path):
+        Path(out_path).write_bytes(write_smf(self.load_take(take_id)))
+
+    def query(self, min_notes_per_sec=None, min_duration=None, peer=None, since=None, until=None):
+        """Take ids matching all given criteria; only the index is read"""
+        index = self.index
+        keep = np.ones(len(index), dtype=bool)
+        if min_notes_per_sec is not None:
+            keep &= index['notes_per_sec'] > min_notes_per_sec
+        if min_duration is not None:
+            keep &= index['duration'] >= min_duration
+        if peer is not None:
+            keep &= index['peer'] == peer.encode()
+        if since is not None:
+            keep &= index['timestamp'] >= since
+        if until is not None:
+            keep &= index['timestamp'] < until
+        return np.flatnonzero(keep)
+
+    # ── Pitch/time index ───────────────────────────────────────────────────────
+
+    def build_pitch_index(self):
+        """Index every note-on by (pitch, take, time)"""
+        index = self.index
+        status, data1, data2 = self._column('status'), self._column('data1'), self._column('data2')
+        delta = self._column('delta')
+        parts = []
+        for take_id, row in enumerate(index):
+            start, end = int(row['offset']), int(row['offset'] + row['count'])
+            s, d1, d2 = status[start:end], data1[start:end], data2[start:end]
+            on = ((s & 0xF0) == 0x90) & (d2 > 0)
+            if not on.any():
+                continue
+            times = ticks_to_seconds(delta[start:end], int(row['ppq']), self._tempos(row))
+            part = np.zeros(int(on.sum()), dtype=PITCH_INDEX_DTYPE)
+            part['pitch'], part['take'] = d1[on], take_id
+            part['time'], part['velocity'] = times[on], d2[on]
+            parts.append(part)
+
+        notes = np.concatenate(parts) if parts else np.zeros(0, dtype=PITCH_INDEX_DTYPE)
+        notes = notes[np.lexsort((notes['time'], notes['take'], notes['pitch']))]
+        np.save(self.path / 'pitch_index.npy', notes)
+        return len(notes)
+
+    def notes_with_pitch(self, pitch, start=None, end=None):
+        """Note-ons of one pitch, optionally limited to [start, end) seconds into each take"""
+        path = self.path / 'pitch_index.npy'
+        if not path.exists():
+            raise FileNotFoundError("No pitch index — run the 'index' command first")
+        notes = np.load(path, mmap_mode='r')
+        lo, hi = np.searchsorted(notes['pitch'], [pitch, pitch + 1])
+        hits = notes[lo:hi]
+        if start is not None:
+            hits = hits[hits['time'] >= start]
+        if end is not None:
+            hits = hits[hits['time'] < end]
+        return hits
+
+
+def _collect_files(inputs):
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob('*') if p.suffix.lower() in ('.mid', '.midi'))
+        else:
+            yield path
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() if value else None
+
+
+def _import_check():
+    """Import a take and a truncated copy; only the truncated one must fail"""
+    take = {
+        'ppq': 480,
+        'tempos': [(0, 500000), (480, 250000)],
+        'delta': np.array([0, 240, 480], dtype=np.uint32),
+        'status': np.array([0x90, 0x90, 0x80], dtype=np.uint8),
+        'data1': np.array([60, 64, 60], dtype=np.uint8),
+        'data2': np.array([100, 90, 0], dtype=np.uint8),
+    }
+    data = write_smf(take)
+    with tempfile.TemporaryDirectory() as tmp:
+        good, cut = Path(tmp, 'midi-take-1700000000000.mid'), Path(tmp, 'truncated.mid')
+        good.write_bytes(data)
+        cut.write_bytes(data[:30])
+        archive = TakeArchive(Path(tmp, 'archive'))
+        ids, errors = archive.import_smf([cut, good])
+        assert ids == [0], f"imported {ids}"
+        assert [path for path, _ in errors] == [cut], f"errors: {errors}"
+        print(f"✓ truncated file reported: {errors[0][1]}")
+
+        archive.export_smf(0, Path(tmp, 'out.mid'))
+        assert Path(tmp, 'out.mid').read_bytes() == data, "exported take differs from the imported file"
+        assert archive.index[0]['timestamp'] == 1700000000.0, "timestamp not taken from the file name"
+        print(f"✓ take round trip: {archive.index[0]['count']} events, {archive.index[0]['tempo_count']} tempo(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar archive for recorded MIDI takes")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('import', help="import .mid files or directories")
+    p.add_argument('archive')
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('--peer', default='', help="peer name to record for these takes")
+
+    p = sub.add_parser('list', help="list takes matching a query")
+    p.add_argument('archive')
+    p.add_argument('--min-nps', type=float, help="notes per second greater than")
+    p.add_argument('--min-duration', type=float, help="duration in seconds at least")
+    p.add_argument('--peer')
+    p.add_argument('--since', help="ISO date/time (UTC)")
+    p.add_argument('--until', help="ISO date/time (UTC)")
+
+    p = sub.add_parser('export', help="export one take as .mid")
+    p.add_argument('archive')
+    p.add_argument('take_id', type=int)
+    p.add_argument('output')
+
+    p = sub.add_parser('index', help="build the pitch/time index")
+    p.add_argument('archive')
+
+    p = sub.add_parser('pitch', help="find note-ons of one MIDI note")
+    p.add_argument('archive')
+    p.add_argument('pitch', type=int)
+    p.add_argument('--start', type=float)
+    p.add_argument('--end', type=float)
+
+    sub.add_parser('check', help="import round trip in a temporary archive")
+
+    args = parser.parse_args()
+    if args.command == 'check':
+        _import_check()
+        return
+    archive = TakeArchive(args.archive)
+
+    if args.command == 'import':
+        ids, errors = archive.import_smf(_collect_files(args.inputs), peer=args.peer)
+        print(f"✅ Imported {len(ids)} take(s); archive now holds {len(archive)}")
+        for path, error in errors:
+            print(f"  ✗ {path}: {error}")
+
+    elif args.command == 'list':
+        ids = archive.query(min_notes_per_sec=args.min_nps, min_duration=args.min_duration,
+                            peer=args.peer, since=_parse_time(args.since), until=_parse_time(args.until))
+        print(f"{'id':>6}  {'recorded (UTC)':19}  {'dur s':>8}  {'events':>7}  {'notes/s':>7}  peer / source")
+        for take_id in ids:
+            row = archive.index[take_id]
+            when = datetime.fromtimestamp(float(row['timestamp']), timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{take_id:>6}  {when}  {row['duration']:>8.1f}  {row['count']:>7}  "
+                  f"{row['notes_per_sec']:>7.2f}  {row['peer'].decode() or '-'} / {row['source'].decode()}")
+        print(f"\n{len(ids)} of {len(archive)} take(s)")
+
+    elif args.command == 'export':
+        if not 0 <= args.take_id < len(archive):
+            print(f"ERROR: No take {args.take_id} (archive holds {len(archive)})")
+            sys.exit(1)
+        archive.export_smf(args.take_id, args.output)
+        print(f"✅ Wrote take {args.take_id} to {args.output}")
+
+    elif args.command == 'index':
+        print(f"✅ Indexed {archive.build_pitch_index()} note-on(s)")
+
+    elif args.command == 'pitch':
+        hits = archive.notes_with_pitch(args.pitch, args.start, args.end)
+        takes = np.unique(hits['take'])
+        print(f"{len(hits)} note-on(s) of MIDI note {args.pitch} in {len(takes)} take(s)")
+        for take_id in takes[:50]:
+            times = hits['time'][hits['take'] == take_id]
+            print(f"  take {take_id}: {len(times)} hit(s), first at {times[0]:.2f}s")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (ValueError, FileNotFoundError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
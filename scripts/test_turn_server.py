@@ -13,8 +13,37 @@ This script tests the TURN server by:
 2. Testing connectivity to the TURN server using those credentials
 3. Validating that the TURN server is properly configured
 
+Every stun:, turn: and turns: URL is probed over its own transport (UDP, TCP
+or TLS) with a real STUN Binding and TURN Allocate, and the time spent in
+each phase (DNS, TCP connect, TLS handshake, first STUN response, Allocate)
+is reported per URL.
+
+All A and AAAA records of each server are probed in parallel, with
+per-family round-trip times and a verdict on whether enabling the app's
+IPv6 option would reduce latency for this server set.
+
+With aiortc installed, ICE gathering is profiled per server: time to the
+first host/srflx/relay candidate and to completion, over repeated trials,
+and again relay-only for TURN URLs (as with ?forceTurn=true).
+
+With --rank it instead measures every candidate server (the endpoint's
+list, DEFAULT_ICE_SERVERS from src/webrtc.js and any --candidate URLs)
+several times, drops unreachable and slow ones and writes a ranked
+ice-servers.json consumed by get-turn-credentials.php and the frontend.
+
+With --daemon it runs continuously: every server is probed on a schedule,
+credentials are reused until shortly before their TTL runs out, failing
+servers are retried with exponential backoff, and rolling latency
+histograms are served in Prometheus text format on /metrics (default
+127.0.0.1:9479). Memory use is fixed by the number of servers.
+
+One-shot and --rank runs are appended to the benchmark result store
+(benchmarks 'turn_server' and 'ice_ranking'); compare them across coturn
+changes with bench_results.py compare. Pass --no-record to skip.
+
 Usage:
-    uv run test_turn_server.py <credentials_url>
+    uv run test_turn_server.py <credentials_url> [--rank [-o ice-servers.json] [--rounds N]]
+    uv run test_turn_server.py <credentials_url> --daemon [--interval 30] [--metrics-port 9479]
     
 Example:
     uv run test_turn_server.py https://denizsincar.ru/midi/get-turn-credentials.php
@@ -26,6 +55,7 @@ Note:
 
 import sys
 import json
+import argparse
 import socket
 import struct
 import hashlib
@@ -33,9 +63,20 @@ import hmac
 import asyncio
 import time
 import os
-from urllib.parse import urlparse
+import ssl
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from statistics import median
+from urllib.parse import urlparse, parse_qs
 from typing import Dict, List, Optional, Tuple
 
+from bench_results import ResultStore, metric, record
+
 try:
     import requests
 except ImportError:
@@ -44,8 +85,9 @@ except ImportError:
 
 # Optional dependency for advanced WebRTC testing
 try:
-    import aiortc
-    from aiortc import RTCPeerConnection, RTCConfiguration, RTCIceServer
+    import aioice
+    from aiortc import RTCIceServer
+    from aiortc.rtcicetransport import connection_kwargs
     AIORTC_AVAILABLE = True
 except ImportError:
     AIORTC_AVAILABLE = False
@@ -54,18 +96,667 @@ except ImportError:
     print()
 
 
+# ── STUN/TURN wire protocol ────────────────────────────────────────────────────
+#
+# Just enough of RFC 5389 (STUN) and RFC 5766 (TURN) to time a Binding and an
+# Allocate transaction over UDP, TCP and TLS.
+
+STUN_MAGIC_COOKIE = 0x2112A442
+
+STUN_BINDING_REQUEST = 0x0001
+STUN_BINDING_SUCCESS = 0x0101
+TURN_ALLOCATE_REQUEST = 0x0003
+TURN_ALLOCATE_SUCCESS = 0x0103
+TURN_ALLOCATE_ERROR = 0x0113
+TURN_REFRESH_REQUEST = 0x0004
+
+ATTR_MAPPED_ADDRESS = 0x0001
+ATTR_USERNAME = 0x0006
+ATTR_MESSAGE_INTEGRITY = 0x0008
+ATTR_ERROR_CODE = 0x0009
+ATTR_LIFETIME = 0x000D
+ATTR_REALM = 0x0014
+ATTR_NONCE = 0x0015
+ATTR_XOR_RELAYED_ADDRESS = 0x0016
+ATTR_REQUESTED_TRANSPORT = 0x0019
+ATTR_XOR_MAPPED_ADDRESS = 0x0020
+
+DEFAULT_PORTS = {'stun': 3479, 'turn': 3479, 'stuns': 5349, 'turns': 5349}
+
+PHASES = ('dns', 'connect', 'tls', 'stun', 'allocate')
+
+
+def parse_ice_url(url: str) -> Optional[Dict]:
+    """Split a stun:/stuns:/turn:/turns: URL into scheme, host, port and transport.
+
+    The transport comes from the ?transport= parameter; turns:/stuns: run over
+    TLS and default to TCP, plain schemes default to UDP.
+    """
+    scheme, sep, rest = url.partition(':')
+    scheme = scheme.lower()
+    if not sep or scheme not in DEFAULT_PORTS:
+        return None
+
+    rest, _, query = rest.partition('?')
+    params = parse_qs(query)
+    secure = scheme.endswith('s')
+    transport = params.get('transport', ['tcp' if secure else 'udp'])[0].lower()
+
+    # host, host:port, [v6], [v6]:port
+    if rest.startswith('['):
+        host, _, port_part = rest[1:].partition(']')
+        port_str = port_part[1:] if port_part.startswith(':') else ''
+    elif rest.count(':') == 1:
+        host, port_str = rest.split(':')
+    else:
+        host, port_str = rest, ''
+    try:
+        port = int(port_str) if port_str else DEFAULT_PORTS[scheme]
+    except ValueError:
+        port = DEFAULT_PORTS[scheme]
+
+    return {
+        'scheme': scheme,
+        'host': host,
+        'port': port,
+        'transport': transport,
+        'secure': secure,
+        'is_turn': scheme.startswith('turn'),
+    }
+
+
+def _stun_attr(attr_type: int, value: bytes) -> bytes:
+    padding = (4 - len(value) % 4) % 4
+    return struct.pack('!HH', attr_type, len(value)) + value + b'\x00' * padding
+
+
+def build_stun_message(msg_type: int, transaction_id: bytes, attrs: bytes = b'',
+                       integrity_key: Optional[bytes] = None) -> bytes:
+    """Encode a STUN message, optionally signed with MESSAGE-INTEGRITY"""
+    if integrity_key is None:
+        return struct.pack('!HHI', msg_type, len(attrs), STUN_MAGIC_COOKIE) + transaction_id + attrs
+
+    # MESSAGE-INTEGRITY covers the header with its length already including the 24-byte attribute
+    header = struct.pack('!HHI', msg_type, len(attrs) + 24, STUN_MAGIC_COOKIE) + transaction_id
+    digest = hmac.new(integrity_key, header + attrs, hashlib.sha1).digest()
+    return header + attrs + _stun_attr(ATTR_MESSAGE_INTEGRITY, digest)
+
+
+def parse_stun_message(data: bytes) -> Optional[Dict]:
+    """Decode a STUN message header and attributes (raw values)"""
+    if len(data) < 20:
+        return None
+    msg_type, length, cookie = struct.unpack('!HHI', data[:8])
+    if cookie != STUN_MAGIC_COOKIE:
+        return None
+    attrs = {}
+    pos = 20
+    while pos + 4 <= min(len(data), 20 + length):
+        attr_type, attr_len = struct.unpack('!HH', data[pos:pos + 4])
+        attrs.setdefault(attr_type, data[pos + 4:pos + 4 + attr_len])
+        pos += 4 + attr_len + (4 - attr_len % 4) % 4
+    return {'type': msg_type, 'transaction_id': data[8:20], 'attrs': attrs}
+
+
+def decode_xor_address(value: bytes, transaction_id: bytes) -> Optional[str]:
+    """XOR-MAPPED-ADDRESS / XOR-RELAYED-ADDRESS → 'ip:port'"""
+    if len(value) < 8:
+        return None
+    family = value[1]
+    port = struct.unpack('!H', value[2:4])[0] ^ (STUN_MAGIC_COOKIE >> 16)
+    if family == 0x01:
+        addr = struct.unpack('!I', value[4:8])[0] ^ STUN_MAGIC_COOKIE
+        return f"{socket.inet_ntoa(struct.pack('!I', addr))}:{port}"
+    if family == 0x02 and len(value) >= 20:
+        key = struct.pack('!I', STUN_MAGIC_COOKIE) + transaction_id
+        addr = bytes(a ^ b for a, b in zip(value[4:20], key))
+        return f"[{socket.inet_ntop(socket.AF_INET6, addr)}]:{port}"
+    return None
+
+
+def stun_error_code(msg: Dict) -> Optional[int]:
+    value = msg['attrs'].get(ATTR_ERROR_CODE)
+    if not value or len(value) < 4:
+        return None
+    return (value[2] & 0x07) * 100 + value[3]
+
+
+class StunChannel:
+    """One STUN transport (UDP datagrams or a TCP/TLS stream) to a server"""
+
+    def __init__(self, sock: socket.socket, address, stream: bool):
+        self.sock = sock
+        self.address = address
+        self.stream = stream
+
+    def transact(self, message: bytes) -> Dict:
+        """Send a request and wait for the response with the same transaction ID"""
+        transaction_id = message[8:20]
+        if self.stream:
+            self.sock.sendall(message)
+        else:
+            self.sock.sendto(message, self.address)
+        while True:
+            data = self._read_stream_message() if self.stream else self.sock.recvfrom(2048)[0]
+            msg = parse_stun_message(data)
+            if msg and msg['transaction_id'] == transaction_id:
+                return msg
+
+    def _read_exact(self, n: int) -> bytes:
+        buf = b''
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("connection closed by server")
+            buf += chunk
+        return buf
+
+    def _read_stream_message(self) -> bytes:
+        header = self._read_exact(20)
+        length = struct.unpack('!H', header[2:4])[0]
+        return header + self._read_exact(length)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def probe_ice_url(url: str, username: Optional[str] = None, credential: Optional[str] = None,
+                  timeout: float = 5.0, family: int = socket.AF_UNSPEC,
+                  address: Optional[str] = None) -> Dict:
+    """Probe one STUN/TURN URL over its own transport and time each phase.
+
+    Phases (milliseconds, None when not applicable or not reached):
+      dns       name resolution (skipped when address is given)
+      connect   TCP connect (TCP/TLS only)
+      tls       TLS handshake (turns:/stuns: only)
+      stun      Binding request → first response
+      allocate  TURN Allocate incl. the 401 challenge round trip (turn:/turns: with credentials)
+
+    Returns a dict with 'success', 'error', 'timeline', the resolved address
+    and the mapped/relayed addresses reported by the server.
+    """
+    info = parse_ice_url(url)
+    result = {
+        'url': url,
+        'success': False,
+        'error': None,
+        'transport': None,
+        'address': None,
+        'family': None,
+        'mapped_address': None,
+        'relayed_address': None,
+        'timeline': dict.fromkeys(PHASES),
+    }
+    if info is None:
+        result['error'] = 'unsupported URL scheme'
+        return result
+
+    transport = info['transport']
+    result['transport'] = ('tls' if info['secure'] else transport)
+    timeline = result['timeline']
+    if info['secure'] and transport != 'tcp':
+        result['error'] = f"{info['scheme']} over {transport} (DTLS) is not supported by this tester"
+        return result
+
+    socktype = socket.SOCK_STREAM if transport == 'tcp' else socket.SOCK_DGRAM
+    started = time.perf_counter()
+    channel = None
+    phase = 'dns'
+
+    try:
+        # DNS
+        t0 = time.perf_counter()
+        if address is None:
+            addrinfo = socket.getaddrinfo(info['host'], info['port'], family, socktype)
+            timeline['dns'] = _elapsed_ms(t0)
+            af, _, _, _, sockaddr = addrinfo[0]
+        else:
+            af = socket.AF_INET6 if ':' in address else socket.AF_INET
+            sockaddr = (address, info['port'], 0, 0) if af == socket.AF_INET6 else (address, info['port'])
+        result['address'] = sockaddr[0]
+        result['family'] = 'IPv6' if af == socket.AF_INET6 else 'IPv4'
+
+        sock = socket.socket(af, socktype)
+        sock.settimeout(timeout)
+        channel = StunChannel(sock, sockaddr, stream=(transport == 'tcp'))
+
+        if transport == 'tcp':
+            # STUN requests are tiny; don't let Nagle hold them back
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            phase = 'connect'
+            t0 = time.perf_counter()
+            sock.connect(sockaddr)
+            timeline['connect'] = _elapsed_ms(t0)
+
+            if info['secure']:
+                phase = 'tls'
+                context = ssl.create_default_context()
+                tls_sock = context.wrap_socket(sock, server_hostname=info['host'],
+                                               do_handshake_on_connect=False)
+                t0 = time.perf_counter()
+                tls_sock.do_handshake()
+                timeline['tls'] = _elapsed_ms(t0)
+                channel.sock = tls_sock
+
+        # First STUN response
+        phase = 'stun'
+        t0 = time.perf_counter()
+        response = channel.transact(build_stun_message(STUN_BINDING_REQUEST, os.urandom(12)))
+        timeline['stun'] = _elapsed_ms(t0)
+        if response['type'] == STUN_BINDING_SUCCESS:
+            mapped = response['attrs'].get(ATTR_XOR_MAPPED_ADDRESS)
+            if mapped:
+                result['mapped_address'] = decode_xor_address(mapped, response['transaction_id'])
+
+        # TURN Allocate
+        if info['is_turn'] and username and credential:
+            phase = 'allocate'
+            result['relayed_address'] = _turn_allocate(channel, username, credential, timeline)
+
+        result['success'] = True
+
+    except socket.gaierror as e:
+        result['error'] = f"DNS resolution failed: {e}"
+    except socket.timeout:
+        result['error'] = f"timeout during {phase}"
+    except ssl.SSLError as e:
+        result['error'] = f"TLS error: {e}"
+    except (OSError, ConnectionError, ValueError) as e:
+        result['error'] = f"{phase} failed: {e}"
+    finally:
+        if channel:
+            channel.close()
+
+    result['total_ms'] = _elapsed_ms(started)
+    return result
+
+
+def _turn_allocate(channel: StunChannel, username: str, credential: str, timeline: Dict) -> Optional[str]:
+    """Run the two-step long-term-credential Allocate; returns the relayed address"""
+    requested_transport = _stun_attr(ATTR_REQUESTED_TRANSPORT, struct.pack('!B3x', 17))   # UDP relay
+
+    t0 = time.perf_counter()
+    challenge = channel.transact(build_stun_message(TURN_ALLOCATE_REQUEST, os.urandom(12), requested_transport))
+    if challenge['type'] != TURN_ALLOCATE_ERROR or stun_error_code(challenge) != 401:
+        raise ValueError(f"expected 401 challenge, got 0x{challenge['type']:04X} "
+                         f"(error {stun_error_code(challenge)})")
+
+    realm = challenge['attrs'].get(ATTR_REALM, b'')
+    nonce = challenge['attrs'].get(ATTR_NONCE, b'')
+    key = hashlib.md5(username.encode() + b':' + realm + b':' + credential.encode()).digest()
+    auth_attrs = (_stun_attr(ATTR_USERNAME, username.encode())
+                  + _stun_attr(ATTR_REALM, realm)
+                  + _stun_attr(ATTR_NONCE, nonce))
+
+    response = channel.transact(build_stun_message(
+        TURN_ALLOCATE_REQUEST, os.urandom(12), requested_transport + auth_attrs, key))
+    timeline['allocate'] = _elapsed_ms(t0)
+
+    if response['type'] != TURN_ALLOCATE_SUCCESS:
+        raise ValueError(f"Allocate rejected (error {stun_error_code(response)}) — check static-auth-secret")
+
+    relayed = response['attrs'].get(ATTR_XOR_RELAYED_ADDRESS)
+
+    # Release the allocation right away (Refresh with LIFETIME 0); not timed
+    try:
+        channel.transact(build_stun_message(
+            TURN_REFRESH_REQUEST, os.urandom(12),
+            _stun_attr(ATTR_LIFETIME, struct.pack('!I', 0)) + auth_attrs, key))
+    except (OSError, ConnectionError):
+        pass
+
+    return decode_xor_address(relayed, response['transaction_id']) if relayed else None
+
+
+FAMILIES = {socket.AF_INET: 'IPv4', socket.AF_INET6: 'IPv6'}
+MAX_ADDRESSES_PER_FAMILY = 4
+
+# IPv6 must beat IPv4 by this much (median over servers) to recommend enabling it
+IPV6_GAIN_MIN_MS = 1.0
+IPV6_GAIN_MIN_RATIO = 0.10
+
+
+def resolve_all(host: str, port: int, socktype: int) -> Tuple[float, Dict[str, List[str]]]:
+    """Resolve every A and AAAA record; returns (ms, {'IPv4': [...], 'IPv6': [...]})"""
+    t0 = time.perf_counter()
+    infos = socket.getaddrinfo(host, port, socket.AF_UNSPEC, socktype)
+    elapsed = _elapsed_ms(t0)
+
+    addresses = {'IPv4': [], 'IPv6': []}
+    for af, _, _, _, sockaddr in infos:
+        family = FAMILIES.get(af)
+        if family and sockaddr[0] not in addresses[family]:
+            addresses[family].append(sockaddr[0])
+    return elapsed, addresses
+
+
+def probe_dual_stack(url: str, username: Optional[str] = None, credential: Optional[str] = None,
+                     timeout: float = 5.0) -> Dict:
+    """Probe every resolved IPv4 and IPv6 address of a URL in parallel.
+
+    Returns {'url', 'dns_ms', 'error', 'families': {'IPv4': {...}, 'IPv6': {...}}}
+    where each family holds its per-address probes, whether any succeeded and
+    the best STUN round trip / total setup time among the successful ones.
+    """
+    info = parse_ice_url(url)
+    result = {'url': url, 'dns_ms': None, 'error': None, 'families': {}}
+    if info is None:
+        result['error'] = 'unsupported URL scheme'
+        return result
+
+    socktype = socket.SOCK_STREAM if info['transport'] == 'tcp' else socket.SOCK_DGRAM
+    try:
+        result['dns_ms'], addresses = resolve_all(info['host'], info['port'], socktype)
+    except socket.gaierror as e:
+        result['error'] = f"DNS resolution failed: {e}"
+        return result
+
+    jobs = [(family, addr) for family, addrs in addresses.items() for addr in addrs[:MAX_ADDRESSES_PER_FAMILY]]
+    with ThreadPoolExecutor(max_workers=max(len(jobs), 1)) as pool:
+        probes = list(pool.map(
+            lambda job: probe_ice_url(url, username, credential, timeout=timeout, address=job[1]), jobs))
+
+    for (family, _), probe in zip(jobs, probes):
+        probe['timeline']['dns'] = result['dns_ms']
+        entry = result['families'].setdefault(family, {'probes': [], 'success': False,
+                                                       'rtt_ms': None, 'setup_ms': None})
+        entry['probes'].append(probe)
+        if probe['success']:
+            entry['success'] = True
+            rtt = probe['timeline']['stun']
+            if entry['rtt_ms'] is None or rtt < entry['rtt_ms']:
+                entry['rtt_ms'] = rtt
+            if entry['setup_ms'] is None or probe['total_ms'] < entry['setup_ms']:
+                entry['setup_ms'] = probe['total_ms']
+    return result
+
+
+def dual_stack_success(result: Dict) -> bool:
+    return any(f['success'] for f in result['families'].values())
+
+
+def ipv6_verdict(results: List[Dict]) -> Tuple[str, str]:
+    """Decide whether enabling IPv6 would cut latency for a set of servers.
+
+    Returns (verdict, explanation) where verdict is one of
+    'enable', 'keep-disabled', 'no-difference' or 'no-ipv6'.
+    """
+    with_v6 = [r for r in results if r['families'].get('IPv6')]
+    if not with_v6:
+        return 'no-ipv6', "No server publishes AAAA records — IPv6 would not change anything"
+
+    reachable_v6 = [r for r in with_v6 if r['families']['IPv6']['success']]
+    if not reachable_v6:
+        return 'keep-disabled', (f"{len(with_v6)} server(s) publish AAAA records but none answered over IPv6 "
+                                 f"from this network")
+
+    pairs = [(r['families']['IPv4']['rtt_ms'], r['families']['IPv6']['rtt_ms'])
+             for r in reachable_v6 if r['families'].get('IPv4', {}).get('success')]
+    v6_only = len(reachable_v6) - len(pairs)
+    if not pairs:
+        return 'enable', f"{v6_only} server(s) are reachable only over IPv6"
+
+    gain = median(v4 - v6 for v4, v6 in pairs)
+    base = median(v4 for v4, _ in pairs)
+    threshold = max(IPV6_GAIN_MIN_MS, base * IPV6_GAIN_MIN_RATIO)
+    summary = f"median IPv4−IPv6 STUN RTT difference {gain:+.1f} ms over {len(pairs)} dual-stack server(s)"
+    if gain > threshold:
+        return 'enable', f"IPv6 is faster: {summary}"
+    if gain < -threshold:
+        return 'keep-disabled', f"IPv6 is slower: {summary}"
+    return 'no-difference', f"No significant difference: {summary}"
+
+
+def format_timeline(timeline: Dict) -> str:
+    """'dns 3.1 → connect 20.4 → tls 45.0 → stun 19.8 → allocate 41.2 ms'"""
+    parts = [f"{phase} {timeline[phase]:.1f}" for phase in PHASES if timeline.get(phase) is not None]
+    return ' → '.join(parts) + ' ms' if parts else 'no phases completed'
+
+
+# ── ICE server ranking ─────────────────────────────────────────────────────────
+
+ROOT = Path(__file__).resolve().parent.parent
+WEBRTC_JS_PATH = ROOT / "src" / "webrtc.js"
+ICE_SERVERS_PATH = ROOT / "ice-servers.json"
+
+RANK_ROUNDS = 5
+RANK_MAX_LOSS = 0.2          # drop servers that miss more than this share of rounds
+RANK_MAX_MS = 250.0          # drop servers whose median setup time exceeds this
+RANK_SLOW_FACTOR = 3.0       # ... or that are this many times slower than the best of their kind
+RANK_SLOW_MARGIN_MS = 20.0   # ... by at least this much (keeps sub-ms LAN results from thrashing)
+RANK_MAX_STUN = 2            # browsers gather from every server; one or two STUN are enough
+RANK_MAX_TURN = 1            # per transport: UDP, TCP and TLS are fallbacks for different firewalls
+
+
+def default_ice_urls(path: Path = WEBRTC_JS_PATH) -> List[str]:
+    """URLs of DEFAULT_ICE_SERVERS in src/webrtc.js, in declared order"""
+    try:
+        source = path.read_text(encoding='utf-8')
+    except OSError:
+        return []
+    block = re.search(r'const DEFAULT_ICE_SERVERS = \[(.*?)\];', source, re.S)
+    return re.findall(r"urls:\s*'([^']+)'", block.group(1)) if block else []
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def measure_ice_server(url: str, username: Optional[str] = None, credential: Optional[str] = None,
+                       rounds: int = RANK_ROUNDS, timeout: float = 3.0) -> Dict:
+    """Probe a server `rounds` times; each round keeps the faster address family.
+
+    The per-round figure is the connection setup time (connect, TLS, Binding
+    and Allocate) without DNS, which the browser resolves once and caches.
+    """
+    samples = []
+    errors = []
+    for _ in range(rounds):
+        result = probe_dual_stack(url, username, credential, timeout=timeout)
+        setups = [f['setup_ms'] for f in result['families'].values() if f['success']]
+        if setups:
+            samples.append(min(setups))
+        else:
+            failed = [p['error'] for f in result['families'].values() for p in f['probes']]
+            errors.append(result['error'] or (failed[0] if failed else 'no addresses'))
+
+    info = parse_ice_url(url)
+    return {
+        'url': url,
+        'kind': 'turn' if info and info['is_turn'] else 'stun',
+        'transport': ('tls' if info['secure'] else info['transport']) if info else None,
+        'rounds': rounds,
+        'loss': len(errors) / rounds,
+        'median_ms': median(samples) if samples else None,
+        'p90_ms': _percentile(samples, 0.9) if samples else None,
+        'samples_ms': samples,
+        'errors': errors,
+    }
+
+
+def rank_ice_servers(measurements: List[Dict], max_loss: float = RANK_MAX_LOSS,
+                     max_ms: float = RANK_MAX_MS, max_stun: int = RANK_MAX_STUN,
+                     max_turn: int = RANK_MAX_TURN) -> List[Dict]:
+    """Order measurements fastest first and mark each one kept or dropped.
+
+    Adds 'kept' and 'reason' to every measurement. Servers are dropped when
+    they miss too many rounds, exceed max_ms, are far slower than the best
+    comparable server, or fall beyond the limit for their group. TURN URLs
+    are only compared with, and counted against, others of the same
+    transport: TCP and TLS relays are the fallback for networks that block
+    UDP, so being slower than UDP is expected and they must not be crowded
+    out by faster UDP entries.
+    """
+    def peer_group(m):
+        return m['kind'] if m['kind'] == 'stun' else f"turn/{m['transport']}"
+
+    ranked = sorted(measurements, key=lambda m: (m['median_ms'] is None, m['median_ms'] or 0, m['p90_ms'] or 0))
+    best = {}
+    for m in ranked:
+        if m['median_ms'] is not None and m['loss'] <= max_loss:
+            best.setdefault(peer_group(m), m['median_ms'])
+
+    kept = Counter()
+    for m in ranked:
+        group = peer_group(m)
+        limit = max_stun if group == 'stun' else max_turn
+        fastest = best.get(group)
+        if m['median_ms'] is None:
+            m['reason'] = f"unreachable ({m['errors'][0]})"
+        elif m['loss'] > max_loss:
+            m['reason'] = f"lost {m['loss']:.0%} of rounds"
+        elif m['median_ms'] > max_ms:
+            m['reason'] = f"median {m['median_ms']:.1f} ms > {max_ms:.0f} ms"
+        elif m['median_ms'] > max(fastest * RANK_SLOW_FACTOR, fastest + RANK_SLOW_MARGIN_MS):
+            m['reason'] = f"{m['median_ms'] / fastest:.1f}× slower than the best comparable server"
+        elif kept[group] >= limit:
+            m['reason'] = f"beyond the {limit} fastest {group.upper()} server(s)"
+        else:
+            m['reason'] = None
+        m['kept'] = m['reason'] is None
+        kept[group] += m['kept']
+    return ranked
+
+
+def ranked_ice_config(ranked: List[Dict]) -> Dict:
+    """iceServers document for get-turn-credentials.php and the frontend.
+
+    TURN entries carry no username/credential: those are minted per request
+    by the credential endpoint, which fills them in.
+    """
+    return {
+        'iceServers': [{'urls': m['url']} for m in ranked if m['kept']],
+        'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'ranking': [
+            {
+                'url': m['url'], 'kept': m['kept'], 'reason': m['reason'], 'loss': m['loss'],
+                'median_ms': round(m['median_ms'], 2) if m['median_ms'] is not None else None,
+                'p90_ms': round(m['p90_ms'], 2) if m['p90_ms'] is not None else None,
+            }
+            for m in ranked
+        ],
+    }
+
+
+# ── ICE gathering profiler ─────────────────────────────────────────────────────
+
+CANDIDATE_TYPES = ('host', 'srflx', 'relay')   # same split as analyseCandidate() in src/webrtc.js
+GATHER_TRIALS = 5
+GATHER_TIMEOUT = 10.0
+
+
+class _CandidateClock:
+    """Timestamps candidates as aioice produces them.
+
+    aiortc gathers in one batch inside setLocalDescription() and does not
+    trickle, so the per-type arrival times are taken by wrapping aioice's
+    server-reflexive and relayed candidate coroutines for the duration of a
+    trial. Host candidates exist as soon as the first of those starts (or
+    when gathering returns, if there is none).
+    """
+
+    def __init__(self):
+        self.start = None
+        self.first = {}
+        self.errors = {}
+        self._saved = None
+
+    def _stamp(self, kind):
+        self.first.setdefault(kind, _elapsed_ms(self.start))
+
+    def _wrap(self, func, kind):
+        async def timed(*args, **kwargs):
+            self._stamp('host')
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                # aioice drops failed candidates silently; keep the reason
+                self.errors.setdefault(kind, f"{kind}: {type(e).__name__} {e}".strip())
+                raise
+            self._stamp(kind)
+            return result
+        return timed
+
+    def __enter__(self):
+        ice = aioice.ice
+        self._saved = (ice.server_reflexive_candidate, ice.relayed_candidate)
+        ice.server_reflexive_candidate = self._wrap(self._saved[0], 'srflx')
+        ice.relayed_candidate = self._wrap(self._saved[1], 'relay')
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        aioice.ice.server_reflexive_candidate, aioice.ice.relayed_candidate = self._saved
+
+
+async def gather_trial(server, relay_only: bool = False, timeout: float = GATHER_TIMEOUT) -> Dict:
+    """Gather candidates once with a single ICE server.
+
+    Returns {'complete_ms', 'first_ms': {type: ms}, 'counts': {type: n}, 'error'}.
+    Only types that were actually gathered appear in first_ms; 'error' also
+    carries srflx/relay failures that aioice itself ignores.
+    """
+    policy = aioice.TransportPolicy.RELAY if relay_only else aioice.TransportPolicy.ALL
+    kwargs = connection_kwargs([server]) if server else {}
+    connection = aioice.Connection(ice_controlling=True, transport_policy=policy, **kwargs)
+    trial = {'complete_ms': None, 'first_ms': {}, 'counts': {}, 'error': None}
+    try:
+        with _CandidateClock() as clock:
+            await asyncio.wait_for(connection.gather_candidates(), timeout)
+            trial['complete_ms'] = _elapsed_ms(clock.start)
+        for candidate in connection.local_candidates:
+            trial['counts'][candidate.type] = trial['counts'].get(candidate.type, 0) + 1
+        trial['first_ms'] = {kind: ms for kind, ms in clock.first.items() if kind in trial['counts']}
+        if clock.errors:
+            trial['error'] = '; '.join(clock.errors.values())
+        if 'host' in trial['counts'] and 'host' not in trial['first_ms']:
+            trial['first_ms']['host'] = trial['complete_ms']
+    except asyncio.TimeoutError:
+        trial['error'] = f"gathering did not complete within {timeout:.0f}s"
+    except (OSError, ValueError) as e:
+        trial['error'] = str(e)
+    finally:
+        await connection.close()
+    return trial
+
+
+def distribution(values: List[float]) -> Optional[Dict]:
+    if not values:
+        return None
+    return {
+        'n': len(values),
+        'min': min(values),
+        'p50': _percentile(values, 0.5),
+        'p90': _percentile(values, 0.9),
+        'max': max(values),
+    }
+
+
 class TURNServerTester:
     """Tests TURN server connectivity and credential generation"""
     
     def __init__(self, credentials_url: str):
         self.credentials_url = credentials_url
         self.credentials = None
+        self.session = requests.Session()   # keep-alive across re-fetches
         self.test_results = {
             'credentials_fetch': False,
             'credentials_valid': False,
             'turn_servers': [],
             'stun_servers': [],
-            'connectivity_tests': []
+            'connectivity_tests': [],
+            'probes': {}
         }
     
     def fetch_credentials(self) -> bool:
@@ -76,7 +767,7 @@ class TURNServerTester:
         print(f"URL: {self.credentials_url}")
         
         try:
-            response = requests.get(self.credentials_url, timeout=10)
+            response = self.session.get(self.credentials_url, timeout=10)
             print(f"Status Code: {response.status_code}")
             
             if response.status_code != 200:
@@ -131,14 +822,14 @@ class TURNServerTester:
             urls = server['urls'] if isinstance(server['urls'], list) else [server['urls']]
             
             for url in urls:
-                if url.startswith('stun:'):
+                if url.startswith(('stun:', 'stuns:')):
                     self.test_results['stun_servers'].append({
                         'url': url,
                         'index': i
                     })
                     print(f"  [{i}] STUN server: {url}")
                     
-                elif url.startswith('turn:'):
+                elif url.startswith(('turn:', 'turns:')):
                     turn_info = {
                         'url': url,
                         'index': i,
@@ -160,191 +851,144 @@ class TURNServerTester:
         return True
     
     def test_turn_server_basic(self, turn_url: str, username: str, credential: str) -> bool:
-        """Basic connectivity test to TURN server"""
+        """Probe a TURN server over the URL's own transport (UDP, TCP or TLS)"""
         print(f"\n{'='*70}")
         print(f"Step 3: Testing TURN server connectivity")
         print(f"{'='*70}")
         print(f"TURN URL: {turn_url}")
         
-        # Parse TURN URL (manually because urlparse doesn't handle turn: scheme well)
-        # Format: turn:host:port or turn:host:port?transport=tcp
-        if not turn_url.startswith('turn:'):
+        info = parse_ice_url(turn_url)
+        if info is None or not info['is_turn']:
             print(f"ERROR: Invalid TURN URL scheme")
             return False
         
-        # Remove 'turn:' prefix
-        url_part = turn_url[5:]
-        
-        # Check for query parameters
-        transport = 'udp'
-        if '?' in url_part:
-            url_part, query = url_part.split('?', 1)
-            if 'transport=tcp' in query:
-                transport = 'tcp'
-        
-        # Parse host:port
-        if ':' in url_part:
-            host, port_str = url_part.rsplit(':', 1)
-            try:
-                port = int(port_str)
-            except ValueError:
-                port = 3479
-        else:
-            host = url_part
-            port = 3479
-        
-        print(f"Host: {host}")
-        print(f"Port: {port}")
-        print(f"Transport: {transport}")
+        print(f"Host: {info['host']}")
+        print(f"Port: {info['port']}")
+        print(f"Transport: {'tls' if info['secure'] else info['transport']}")
         print(f"Username: {username}")
         
-        # Test basic connectivity
-        print(f"\nTesting basic TCP connectivity to {host}:{port}...")
-        
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            
-            if result == 0:
-                print(f"✓ TCP connection successful to {host}:{port}")
-                return True
-            else:
-                print(f"✗ TCP connection failed to {host}:{port} (error code: {result})")
-                return False
-                
-        except socket.gaierror as e:
-            print(f"✗ DNS resolution failed for {host}: {e}")
-            return False
-        except socket.timeout:
-            print(f"✗ Connection timeout to {host}:{port}")
-            return False
-        except Exception as e:
-            print(f"✗ Connection error: {e}")
-            return False
+        print(f"\nRunning Binding + Allocate over {'TLS' if info['secure'] else info['transport'].upper()} "
+              f"on every IPv4/IPv6 address...")
+        result = probe_dual_stack(turn_url, username, credential)
+        self.test_results['probes'][turn_url] = result
+        self.print_dual_stack(result)
+        return dual_stack_success(result)
     
     def test_stun_server(self, stun_url: str) -> bool:
         """Test STUN server connectivity"""
         print(f"\nTesting STUN server: {stun_url}")
         
-        # Parse STUN URL (manually because urlparse doesn't handle stun: scheme well)
-        # Format: stun:host:port
-        if not stun_url.startswith('stun:'):
+        if parse_ice_url(stun_url) is None:
             print(f"ERROR: Invalid STUN URL scheme")
             return False
         
-        # Remove 'stun:' prefix
-        url_part = stun_url[5:]
-        
-        # Parse host:port
-        if ':' in url_part:
-            host, port_str = url_part.rsplit(':', 1)
-            try:
-                port = int(port_str)
-            except ValueError:
-                port = 3479
-        else:
-            host = url_part
-            port = 3479
+        result = probe_dual_stack(stun_url)
+        self.test_results['probes'][stun_url] = result
+        self.print_dual_stack(result)
+        return dual_stack_success(result)
+    
+    def print_dual_stack(self, result: Dict):
+        """Per-address outcome of one dual-stack probe"""
+        if result['error']:
+            print(f"✗ {result['url']}: {result['error']}")
+            return
         
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock.settimeout(3)
-            
-            # STUN Binding Request
-            # Message Type: Binding Request (0x0001)
-            # Message Length: 0 (no attributes)
-            # Magic Cookie: 0x2112A442
-            # Transaction ID: 96-bit random value
-            transaction_id = os.urandom(12)
-            
-            # Build STUN message
-            msg = struct.pack('!HH', 0x0001, 0)  # Type and Length
-            msg += struct.pack('!I', 0x2112A442)  # Magic Cookie
-            msg += transaction_id  # Transaction ID
-            
-            sock.sendto(msg, (host, port))
-            
-            try:
-                data, addr = sock.recvfrom(1024)
-                print(f"✓ STUN server {host}:{port} responded")
-                sock.close()
-                return True
-            except socket.timeout:
-                print(f"✗ STUN server {host}:{port} timeout")
-                sock.close()
-                return False
-                
-        except Exception as e:
-            print(f"✗ STUN test error: {e}")
-            return False
+        for family in ('IPv4', 'IPv6'):
+            entry = result['families'].get(family)
+            if not entry:
+                print(f"  - {family}: no {'A' if family == 'IPv4' else 'AAAA'} records")
+                continue
+            for probe in entry['probes']:
+                if probe['success']:
+                    print(f"  ✓ {family} {probe['address']}: {format_timeline(probe['timeline'])}")
+                    if probe['mapped_address']:
+                        print(f"      Mapped address: {probe['mapped_address']}")
+                    if probe['relayed_address']:
+                        print(f"      Relayed address: {probe['relayed_address']}")
+                else:
+                    print(f"  ✗ {family} {probe['address']}: {probe['error']}")
     
-    async def test_webrtc_connection(self) -> bool:
-        """Test actual WebRTC connection with TURN server (requires aiortc)"""
+    async def test_webrtc_connection(self, trials: int = GATHER_TRIALS) -> bool:
+        """Profile ICE gathering per server and candidate type (requires aiortc)"""
         if not AIORTC_AVAILABLE:
             print("\n⚠ Skipping WebRTC test (aiortc not installed)")
             return False
         
         print(f"\n{'='*70}")
-        print(f"Step 4: Testing WebRTC connection with TURN server")
+        print(f"Step 4: Profiling ICE gathering ({trials} trials per server and policy)")
         print(f"{'='*70}")
+        print("Each URL is gathered on its own: aiortc uses only the first STUN and")
+        print("the first TURN URL of a configuration, and gathers them in parallel.")
         
-        try:
-            # Create RTCConfiguration with ICE servers
-            ice_servers = []
-            for server in self.credentials['iceServers']:
-                urls = server['urls'] if isinstance(server['urls'], list) else [server['urls']]
-                ice_server = RTCIceServer(
-                    urls=urls,
-                    username=server.get('username'),
-                    credential=server.get('credential')
-                )
-                ice_servers.append(ice_server)
-            
-            config = RTCConfiguration(iceServers=ice_servers)
-            pc = RTCPeerConnection(configuration=config)
-            
-            # Track ICE gathering state
-            print("\nGathering ICE candidates...")
-            
-            @pc.on("icegatheringstatechange")
-            async def on_ice_gathering_state_change():
-                print(f"ICE Gathering State: {pc.iceGatheringState}")
-            
-            @pc.on("icecandidate")
-            async def on_ice_candidate(candidate):
-                if candidate:
-                    print(f"Found ICE candidate: {candidate.candidate[:80]}...")
-            
-            # Create a data channel to trigger ICE gathering
-            channel = pc.createDataChannel("test")
-            
-            # Create offer
-            offer = await pc.createOffer()
-            await pc.setLocalDescription(offer)
-            
-            # Wait for ICE gathering to complete
-            timeout = 10
-            start_time = time.time()
-            while pc.iceGatheringState != "complete":
-                if time.time() - start_time > timeout:
-                    print(f"⚠ ICE gathering timeout after {timeout}s")
-                    break
-                await asyncio.sleep(0.1)
+        # Host-only baseline, then every URL with the default policy, and TURN
+        # URLs again relay-only (what ?forceTurn=true does in the app)
+        runs = [('host only', None, False)]
+        for server in self.credentials['iceServers']:
+            urls = server['urls'] if isinstance(server['urls'], list) else [server['urls']]
+            for url in urls:
+                ice_server = RTCIceServer(urls=url, username=server.get('username'),
+                                          credential=server.get('credential'))
+                runs.append((url, ice_server, False))
+                if url.startswith(('turn:', 'turns:')):
+                    runs.append((url, ice_server, True))
+        
+        profiles = []
+        for label, ice_server, relay_only in runs:
+            policy = 'relay' if relay_only else 'all'
+            print(f"\n{label} [{policy}]")
             
-            print(f"\n✓ WebRTC peer connection created successfully")
-            print(f"ICE Gathering State: {pc.iceGatheringState}")
+            results = []
+            for _ in range(trials):
+                results.append(await gather_trial(ice_server, relay_only=relay_only))
             
-            # Close connection
-            await pc.close()
-            return True
+            profile = {
+                'url': label,
+                'policy': policy,
+                'trials': trials,
+                'errors': [r['error'] for r in results if r['error']],
+                'complete_ms': distribution([r['complete_ms'] for r in results if r['complete_ms'] is not None]),
+                'first_ms': {},
+                'samples': {'complete': [r['complete_ms'] for r in results if r['complete_ms'] is not None]},
+            }
+            for kind in CANDIDATE_TYPES:
+                values = [r['first_ms'][kind] for r in results if kind in r['first_ms']]
+                if values:
+                    profile['first_ms'][kind] = distribution(values)
+                    profile['samples'][kind] = values
+            profiles.append(profile)
             
-        except Exception as e:
-            print(f"✗ WebRTC test failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            for kind, dist in profile['first_ms'].items():
+                print(f"  first {kind:<5}  p50 {dist['p50']:8.1f}  p90 {dist['p90']:8.1f}  max {dist['max']:8.1f} ms  "
+                      f"({dist['n']}/{trials})")
+            if profile['complete_ms']:
+                dist = profile['complete_ms']
+                print(f"  complete     p50 {dist['p50']:8.1f}  p90 {dist['p90']:8.1f}  max {dist['max']:8.1f} ms")
+            expected = 'relay' if ice_server and ice_server.urls.startswith('turn') else (
+                'srflx' if ice_server else 'host')
+            if expected not in profile['first_ms']:
+                print(f"  ✗ no {expected} candidate in any trial")
+            for error in sorted(set(profile['errors'])):
+                print(f"  ✗ {error}")
+        
+        self.test_results['gathering'] = profiles
+        self.print_gathering_profile()
+        return all(p['complete_ms'] and not p['errors'] for p in profiles)
+    
+    def print_gathering_profile(self):
+        """Servers ordered by how long they hold up gathering"""
+        profiles = [p for p in self.test_results.get('gathering', []) if p['complete_ms']]
+        if not profiles:
+            return
+        
+        print(f"\nICE gathering, slowest first (p50 / p90 ms):")
+        print(f"  {'URL':<40} {'policy':<6} " + ' '.join(f"{k:>15}" for k in CANDIDATE_TYPES) + f" {'complete':>15}")
+        for p in sorted(profiles, key=lambda p: p['complete_ms']['p50'], reverse=True):
+            cells = []
+            for kind in CANDIDATE_TYPES:
+                dist = p['first_ms'].get(kind)
+                cells.append(f"{dist['p50']:>7.1f}/{dist['p90']:<7.1f}" if dist else f"{'-':>15}")
+            done = p['complete_ms']
+            print(f"  {p['url'][:40]:<40} {p['policy']:<6} {' '.join(cells)} {done['p50']:>7.1f}/{done['p90']:<7.1f}")
     
     def print_summary(self):
         """Print test results summary"""
@@ -365,6 +1009,9 @@ class TURNServerTester:
             for test in self.test_results['connectivity_tests']:
                 status = "✓" if test['success'] else "✗"
                 print(f"  {status} {test['type']}: {test['url']}")
+            
+            self.print_timelines()
+            self.print_dual_stack_summary()
         
         print(f"\n{'='*70}")
         
@@ -373,14 +1020,140 @@ class TURNServerTester:
             print("\n⚠ RECOMMENDATION: No TURN servers configured")
             print("   Your application will only work on local networks or with friendly NATs")
             print("   Consider setting up a TURN server for global connectivity")
-        elif not any(t['success'] for t in self.test_results['connectivity_tests'] if 'turn:' in t['url']):
+        elif not any(t['success'] for t in self.test_results['connectivity_tests'] if t['type'] == 'TURN'):
             print("\n⚠ RECOMMENDATION: TURN server connectivity issues detected")
             print("   Check your TURN server configuration:")
             print("   - Verify firewall allows ports 3479, 5350, and 49152-65535")
             print("   - Check coturn service is running: sudo systemctl status coturn")
             print("   - Verify static-auth-secret matches config.php")
     
-    async def run_all_tests(self):
+    def print_timelines(self):
+        """Per-URL, per-address connection-setup breakdown, one column per phase"""
+        probes = self.test_results['probes']
+        if not probes:
+            return
+        
+        print(f"\nConnection setup timeline (ms):")
+        print(f"  {'URL':<40} {'fam':<4} {'via':<4} " + ' '.join(f"{p:>8}" for p in PHASES) + f" {'total':>8}")
+        for url, result in probes.items():
+            if result['error']:
+                print(f"  {url[:40]:<40} ✗ {result['error']}")
+                continue
+            for family, entry in result['families'].items():
+                for probe in entry['probes']:
+                    cells = ' '.join(
+                        f"{probe['timeline'][p]:>8.1f}" if probe['timeline'].get(p) is not None else f"{'-':>8}"
+                        for p in PHASES
+                    )
+                    total = f"{probe['total_ms']:>8.1f}" if probe.get('total_ms') is not None else f"{'-':>8}"
+                    print(f"  {url[:40]:<40} {family[2:]:<4} {probe['transport'] or '?':<4} {cells} {total}")
+                    if not probe['success']:
+                        print(f"  {'':<40} ✗ {probe['address']}: {probe['error']}")
+    
+    def print_dual_stack_summary(self):
+        """Per-family RTT and success, plus the IPv6 recommendation"""
+        results = list(self.test_results['probes'].values())
+        if not results:
+            return
+        
+        print(f"\nIPv4 / IPv6 comparison (best STUN RTT, ms):")
+        print(f"  {'URL':<44} {'IPv4':>10} {'IPv6':>10}")
+        for result in results:
+            cells = []
+            for family in ('IPv4', 'IPv6'):
+                entry = result['families'].get(family)
+                if not entry:
+                    cells.append(f"{'n/a':>10}")
+                elif entry['success']:
+                    cells.append(f"{entry['rtt_ms']:>10.1f}")
+                else:
+                    cells.append(f"{'fail':>10}")
+            print(f"  {result['url'][:44]:<44} {' '.join(cells)}")
+        
+        verdict, explanation = ipv6_verdict(results)
+        self.test_results['ipv6_verdict'] = {'verdict': verdict, 'explanation': explanation}
+        label = {
+            'enable': "✓ Enabling IPv6 would cut latency",
+            'keep-disabled': "✗ Keep IPv6 disabled",
+            'no-difference': "= IPv6 makes no difference",
+            'no-ipv6': "- IPv6 not available",
+        }[verdict]
+        print(f"\n  {label}: {explanation}")
+    
+    def rank_servers(self, extra_urls: List[str], output: Path, rounds: int = RANK_ROUNDS,
+                     max_ms: float = RANK_MAX_MS, max_stun: int = RANK_MAX_STUN,
+                     max_turn: int = RANK_MAX_TURN) -> bool:
+        """Measure every candidate server and write a ranked, trimmed iceServers file"""
+        print(f"\n{'='*70}")
+        print(f"Step 3: Ranking ICE servers ({rounds} rounds each)")
+        print(f"{'='*70}")
+        
+        # Endpoint servers first, then the frontend defaults and any extras
+        candidates = {}
+        for server in self.credentials['iceServers']:
+            urls = server['urls'] if isinstance(server['urls'], list) else [server['urls']]
+            for url in urls:
+                candidates.setdefault(url, (server.get('username'), server.get('credential')))
+        for url in default_ice_urls() + extra_urls:
+            candidates.setdefault(url, (None, None))
+        
+        measurements = []
+        for url, (username, credential) in candidates.items():
+            m = measure_ice_server(url, username, credential, rounds=rounds)
+            measurements.append(m)
+            if m['median_ms'] is None:
+                print(f"  ✗ {url}: {m['errors'][0]}")
+            else:
+                print(f"  ✓ {url}: median {m['median_ms']:.1f} ms, p90 {m['p90_ms']:.1f} ms, "
+                      f"loss {m['loss']:.0%}")
+        
+        ranked = rank_ice_servers(measurements, max_ms=max_ms, max_stun=max_stun, max_turn=max_turn)
+        config = ranked_ice_config(ranked)
+        self.test_results['ranking'] = ranked
+        
+        print(f"\nRanking:")
+        for i, m in enumerate(ranked, 1):
+            median_ms = f"{m['median_ms']:8.1f}" if m['median_ms'] is not None else f"{'-':>8}"
+            verdict = "keep" if m['kept'] else f"drop: {m['reason']}"
+            print(f"  {i:2}. {m['url'][:44]:<44} {median_ms} ms  {verdict}")
+        
+        if not config['iceServers']:
+            print(f"\n✗ No server passed — {output} not written")
+            return False
+        
+        output.write_text(json.dumps(config, indent=2) + '\n', encoding='utf-8')
+        kept = len(config['iceServers'])
+        print(f"\n✅ Wrote {kept} of {len(ranked)} server(s) to {output}")
+        return True
+    
+    def record_results(self, benchmark: str, store: Optional[ResultStore] = None) -> Dict:
+        """Store probe, gathering and ranking timings as one benchmark run"""
+        metrics = {}
+        for url, result in self.test_results['probes'].items():
+            for family, entry in result['families'].items():
+                samples = {}
+                for probe in entry['probes']:
+                    if not probe['success']:
+                        continue
+                    for phase, ms in dict(probe['timeline'], total=probe['total_ms']).items():
+                        if ms is not None:
+                            samples.setdefault(phase, []).append(ms)
+                for phase, values in samples.items():
+                    metrics[f"probe/{url}/{family}/{phase}"] = metric(values)
+        
+        for profile in self.test_results.get('gathering', []):
+            for kind, values in profile['samples'].items():
+                metrics[f"gather/{profile['url']}/{profile['policy']}/{kind}"] = metric(values)
+        
+        for m in self.test_results.get('ranking', []):
+            if m['samples_ms']:
+                metrics[f"setup/{m['url']}"] = metric(m['samples_ms'])
+        
+        run = record(benchmark, metrics, params={'credentials_url': self.credentials_url}, store=store)
+        print(f"\n✓ Recorded {len(metrics)} metric(s) as {benchmark} run {run['id']}")
+        return run
+    
+    async def run_all_tests(self, gather_trials: int = GATHER_TRIALS):
         """Run all tests in sequence"""
         print(f"\n{'*'*70}")
         print(f"TURN SERVER TESTING SUITE")
@@ -427,7 +1200,7 @@ class TURNServerTester:
         
         # Test 4: WebRTC test (if aiortc available)
         if AIORTC_AVAILABLE:
-            await self.test_webrtc_connection()
+            await self.test_webrtc_connection(gather_trials)
         
         # Print summary
         self.print_summary()
@@ -435,22 +1208,386 @@ class TURNServerTester:
         return True
 
 
+# ── Monitoring daemon ──────────────────────────────────────────────────────────
+
+MONITOR_INTERVAL = 30.0          # seconds between probes of a healthy URL
+MONITOR_MAX_BACKOFF = 900.0      # cap for the exponential backoff of failing URLs / credential fetches
+MONITOR_WINDOW = 900.0           # rolling window for the quantile gauges
+MONITOR_WINDOW_SLOTS = 15
+MONITOR_PORT = 9479
+MONITOR_QUANTILES = (0.5, 0.9, 0.99)
+
+# Histogram bucket upper bounds in seconds (Prometheus convention)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RollingHistogram:
+    """Fixed-bucket latency histogram with a lifetime total and a rolling window.
+
+    The lifetime buckets are exported as a Prometheus histogram (counters that
+    only grow, so rate() works over any range). The window is a ring of
+    per-slot bucket counts used for the quantile gauges. Memory is constant:
+    one bucket array per slot, whatever the uptime or probe rate.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window: float = MONITOR_WINDOW, slots: int = MONITOR_WINDOW_SLOTS):
+        self.buckets = buckets
+        self.slot_seconds = window / slots
+        self.counts = [0] * (len(buckets) + 1)      # last entry is +Inf
+        self.sum = 0.0
+        self.ring = [[0] * (len(buckets) + 1) for _ in range(slots)]
+        self.ring_epoch = [-1] * slots
+
+    def _bucket(self, value: float) -> int:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                return i
+        return len(self.buckets)
+
+    def observe(self, value: float, now: float):
+        i = self._bucket(value)
+        self.counts[i] += 1
+        self.sum += value
+
+        epoch = int(now // self.slot_seconds)
+        slot = epoch % len(self.ring)
+        if self.ring_epoch[slot] != epoch:
+            self.ring[slot] = [0] * len(self.counts)
+            self.ring_epoch[slot] = epoch
+        self.ring[slot][i] += 1
+
+    def window_counts(self, now: float) -> List[int]:
+        oldest = int(now // self.slot_seconds) - len(self.ring) + 1
+        totals = [0] * len(self.counts)
+        for epoch, counts in zip(self.ring_epoch, self.ring):
+            if epoch >= oldest:
+                totals = [a + b for a, b in zip(totals, counts)]
+        return totals
+
+    def quantile(self, q: float, now: float) -> Optional[float]:
+        """Quantile over the window, interpolated linearly inside its bucket"""
+        counts = self.window_counts(now)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+def credentials_expiry(credentials: Dict, fetched_at: float) -> float:
+    """Unix time the credentials stop working.
+
+    The REST-API username is '<expiry>:<user>'; the 'ttl' field is the
+    fallback for endpoints that use another username scheme.
+    """
+    for server in credentials.get('iceServers', []):
+        prefix = str(server.get('username', '')).split(':', 1)[0]
+        if prefix.isdigit():
+            return float(prefix)
+    return fetched_at + float(credentials.get('ttl', 3600))
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TURNMonitor:
+    """Probes every ICE server on a schedule and serves Prometheus metrics"""
+
+    def __init__(self, credentials_url: str, interval: float = MONITOR_INTERVAL,
+                 max_backoff: float = MONITOR_MAX_BACKOFF, timeout: float = 5.0):
+        self.credentials_url = credentials_url
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        
+        self.credentials = None
+        self.credentials_expiry = 0.0
+        self.credentials_failures = 0
+        self.credentials_next_fetch = 0.0
+        self.credentials_fetches = {'success': 0, 'failure': 0}
+        
+        # Per URL: schedule, backoff and last outcome; bounded by the server list
+        self.targets: Dict[str, Dict] = {}
+        # Per (url, family, phase)
+        self.histograms: Dict[Tuple[str, str, str], RollingHistogram] = {}
+    
+    def log(self, message: str):
+        print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  {message}", flush=True)
+    
+    def _backoff(self, failures: int) -> float:
+        return min(self.interval * 2 ** failures, self.max_backoff)
+    
+    def refresh_credentials(self, now: float):
+        """Re-fetch credentials only when they are about to expire (or after a backoff)"""
+        if self.credentials:
+            ttl = float(self.credentials.get('ttl', 3600))
+            if now < self.credentials_expiry - max(60.0, ttl * 0.1):
+                return
+        if now < self.credentials_next_fetch:
+            return
+        
+        try:
+            response = self.session.get(self.credentials_url, timeout=10)
+            response.raise_for_status()
+            credentials = response.json()
+            if not isinstance(credentials.get('iceServers'), list):
+                raise ValueError("missing 'iceServers' array")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.credentials_failures += 1
+            delay = self._backoff(self.credentials_failures)
+            self.credentials_next_fetch = now + delay
+            with self.lock:
+                self.credentials_fetches['failure'] += 1
+            self.log(f"✗ credential fetch failed ({e}); retrying in {delay:.0f}s")
+            return
+        
+        self.credentials = credentials
+        self.credentials_expiry = credentials_expiry(credentials, now)
+        self.credentials_failures = 0
+        with self.lock:
+            self.credentials_fetches['success'] += 1
+            self._sync_targets(now)
+        self.log(f"✓ credentials fetched, valid until "
+                 f"{datetime.fromtimestamp(self.credentials_expiry).strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    def _sync_targets(self, now: float):
+        """Track the endpoint's current URLs; forget series of URLs it dropped"""
+        current = {}
+        for server in self.credentials['iceServers']:
+            urls = server.get('urls', [])
+            for url in urls if isinstance(urls, list) else [urls]:
+                current[url] = (server.get('username'), server.get('credential'))
+        
+        for url in list(self.targets):
+            if url not in current:
+                del self.targets[url]
+        for key in [k for k in self.histograms if k[0] not in current]:
+            del self.histograms[key]
+        
+        for url, (username, credential) in current.items():
+            target = self.targets.setdefault(url, {
+                'next_due': now, 'failures': 0, 'up': None, 'last_error': None,
+                'probes': {'success': 0, 'failure': 0}, 'last_probe': None,
+            })
+            target['username'], target['credential'] = username, credential
+    
+    def probe(self, url: str) -> Dict:
+        target = self.targets[url]
+        return probe_dual_stack(url, target['username'], target['credential'], timeout=self.timeout)
+    
+    def record(self, url: str, result: Dict, now: float):
+        with self.lock:
+            target = self.targets.get(url)
+            if target is None:
+                return  # URL disappeared from the endpoint while probing
+            
+            success = dual_stack_success(result)
+            target['up'] = success
+            target['last_probe'] = time.time()
+            target['probes']['success' if success else 'failure'] += 1
+            
+            for family, entry in result['families'].items():
+                probe = next((p for p in entry['probes'] if p['success']), None)
+                if probe is None:
+                    continue
+                observations = dict(probe['timeline'], total=probe['total_ms'])
+                for phase, ms in observations.items():
+                    if ms is None:
+                        continue
+                    key = (url, family, phase)
+                    if key not in self.histograms:
+                        self.histograms[key] = RollingHistogram()
+                    self.histograms[key].observe(ms / 1000, now)
+            
+            if success:
+                if target['failures']:
+                    self.log(f"✓ {url} recovered after {target['failures']} failure(s)")
+                target['failures'] = 0
+                target['last_error'] = None
+                target['next_due'] = now + self.interval
+            else:
+                errors = [p['error'] for e in result['families'].values() for p in e['probes']]
+                target['last_error'] = result['error'] or (errors[0] if errors else 'no addresses')
+                target['failures'] += 1
+                delay = self._backoff(target['failures'])
+                target['next_due'] = now + delay
+                self.log(f"✗ {url}: {target['last_error']} (failure {target['failures']}, next try in {delay:.0f}s)")
+    
+    def render_metrics(self) -> str:
+        """Current state in Prometheus text exposition format"""
+        now = time.time()
+        lines = []
+        
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+        
+        with self.lock:
+            family('turn_probe_up', 'gauge', "1 if the last probe of the URL succeeded on any address family")
+            for url, t in self.targets.items():
+                if t['up'] is not None:
+                    lines.append(f'turn_probe_up{{url="{_label(url)}"}} {int(t["up"])}')
+            
+            family('turn_probe_total', 'counter', "Probes run, by outcome")
+            for url, t in self.targets.items():
+                for outcome, n in t['probes'].items():
+                    lines.append(f'turn_probe_total{{url="{_label(url)}",result="{outcome}"}} {n}')
+            
+            family('turn_probe_consecutive_failures', 'gauge', "Failed probes since the last success")
+            for url, t in self.targets.items():
+                lines.append(f'turn_probe_consecutive_failures{{url="{_label(url)}"}} {t["failures"]}')
+            
+            family('turn_probe_backoff_seconds', 'gauge', "Current delay before the next probe of the URL")
+            for url, t in self.targets.items():
+                delay = self._backoff(t['failures']) if t['failures'] else self.interval
+                lines.append(f'turn_probe_backoff_seconds{{url="{_label(url)}"}} {delay:g}')
+            
+            family('turn_probe_last_timestamp_seconds', 'gauge', "Unix time of the last completed probe")
+            for url, t in self.targets.items():
+                if t['last_probe']:
+                    lines.append(f'turn_probe_last_timestamp_seconds{{url="{_label(url)}"}} {t["last_probe"]:.3f}')
+            
+            family('turn_probe_phase_seconds', 'histogram',
+                   "Connection setup time per phase (dns, connect, tls, stun, allocate, total)")
+            for (url, fam, phase), h in sorted(self.histograms.items()):
+                labels = f'url="{_label(url)}",family="{fam}",phase="{phase}"'
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'turn_probe_phase_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                cumulative += h.counts[-1]
+                lines.append(f'turn_probe_phase_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f'turn_probe_phase_seconds_sum{{{labels}}} {h.sum:.6f}')
+                lines.append(f'turn_probe_phase_seconds_count{{{labels}}} {cumulative}')
+            
+            window = int(MONITOR_WINDOW // 60)
+            family('turn_probe_phase_seconds_window', 'gauge',
+                   f"Quantiles of the setup time per phase over the last {window} minutes")
+            for (url, fam, phase), h in sorted(self.histograms.items()):
+                labels = f'url="{_label(url)}",family="{fam}",phase="{phase}"'
+                for q in MONITOR_QUANTILES:
+                    value = h.quantile(q, now)
+                    if value is not None:
+                        lines.append(f'turn_probe_phase_seconds_window{{{labels},quantile="{q:g}"}} {value:.6f}')
+            
+            family('turn_credentials_fetch_total', 'counter', "Credential endpoint requests, by outcome")
+            for outcome, n in self.credentials_fetches.items():
+                lines.append(f'turn_credentials_fetch_total{{result="{outcome}"}} {n}')
+            family('turn_credentials_expiry_timestamp_seconds', 'gauge', "Unix time the cached credentials expire")
+            lines.append(f'turn_credentials_expiry_timestamp_seconds {self.credentials_expiry:.0f}')
+            family('turn_monitor_start_time_seconds', 'gauge', "Unix time the monitor started")
+            lines.append(f'turn_monitor_start_time_seconds {self.started:.0f}')
+        
+        return '\n'.join(lines) + '\n'
+    
+    def serve_metrics(self, host: str, port: int) -> ThreadingHTTPServer:
+        monitor = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = monitor.render_metrics().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would drown the probe log
+        
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    
+    def run(self, host: str = '127.0.0.1', port: int = MONITOR_PORT):
+        """Probe forever; each URL is probed when due, in parallel with the others"""
+        self.serve_metrics(host, port)
+        self.log(f"Monitoring {self.credentials_url} every {self.interval:.0f}s; "
+                 f"metrics on http://{host}:{port}/metrics")
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            while True:
+                now = time.time()
+                self.refresh_credentials(now)
+                
+                with self.lock:
+                    due = [url for url, t in self.targets.items() if t['next_due'] <= now]
+                for url, result in zip(due, pool.map(self.probe, due)):
+                    self.record(url, result, time.time())
+                
+                with self.lock:
+                    next_due = min((t['next_due'] for t in self.targets.values()), default=now + self.interval)
+                if not self.credentials:
+                    next_due = min(next_due, self.credentials_next_fetch)
+                time.sleep(min(max(next_due - time.time(), 0.1), self.interval))
+
+
 def main():
     """Main entry point"""
-    if len(sys.argv) < 2:
-        print("Usage: uv run test_turn_server.py <credentials_url>")
-        print("\nExample:")
-        print("  uv run test_turn_server.py https://denizsincar.ru/midi/get-turn-credentials.php")
-        print("\nAlternatively with python:")
-        print("  python test_turn_server.py https://denizsincar.ru/midi/get-turn-credentials.php")
-        print("\nThis script will:")
-        print("  1. Fetch credentials from the endpoint")
-        print("  2. Validate the credential structure")
-        print("  3. Test connectivity to STUN/TURN servers")
-        print("  4. Test WebRTC connection (if aiortc is installed)")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Test STUN/TURN servers returned by the credential endpoint",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""This script will:
+  1. Fetch credentials from the endpoint
+  2. Validate the credential structure
+  3. Test connectivity to STUN/TURN servers
+  4. Profile ICE gathering per server and candidate type (if aiortc is installed)
+
+With --rank, step 3 instead measures every candidate server repeatedly and
+writes a ranked, trimmed iceServers file for get-turn-credentials.php and
+the frontend.
+
+With --daemon, servers are probed on a schedule (failing ones with
+exponential backoff) and metrics are served in Prometheus text format.
+
+Example:
+  uv run test_turn_server.py https://denizsincar.ru/midi/get-turn-credentials.php
+  uv run test_turn_server.py https://denizsincar.ru/midi/get-turn-credentials.php --daemon --interval 60
+  uv run test_turn_server.py https://denizsincar.ru/midi/get-turn-credentials.php --rank""")
+    parser.add_argument('credentials_url', help="URL of get-turn-credentials.php")
+    parser.add_argument('--rank', action='store_true',
+                        help="rank servers by setup latency and write an iceServers file")
+    parser.add_argument('--daemon', action='store_true',
+                        help="probe continuously and serve Prometheus metrics")
+    parser.add_argument('--interval', type=float, default=MONITOR_INTERVAL,
+                        help=f"daemon: seconds between probes of a healthy server [{MONITOR_INTERVAL:.0f}]")
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                        help="daemon: address for the /metrics endpoint [127.0.0.1]")
+    parser.add_argument('--metrics-port', type=int, default=MONITOR_PORT,
+                        help=f"daemon: port for the /metrics endpoint [{MONITOR_PORT}]")
+    parser.add_argument('--no-record', action='store_true',
+                        help="don't append this run to the benchmark result store (see bench_results.py)")
+    parser.add_argument('-o', '--output', type=Path, default=ICE_SERVERS_PATH,
+                        help=f"ranked iceServers file [{ICE_SERVERS_PATH.name} in the repo root]")
+    parser.add_argument('--candidate', action='append', default=[], metavar='URL',
+                        help="extra stun:/turn: URL to consider (repeatable)")
+    parser.add_argument('--rounds', type=int, default=RANK_ROUNDS,
+                        help=f"probes per server when ranking [{RANK_ROUNDS}]")
+    parser.add_argument('--trials', type=int, default=GATHER_TRIALS,
+                        help=f"ICE gathering trials per server and policy (aiortc) [{GATHER_TRIALS}]")
+    parser.add_argument('--max-ms', type=float, default=RANK_MAX_MS,
+                        help=f"drop servers with a slower median setup time [{RANK_MAX_MS:.0f}]")
+    parser.add_argument('--max-stun', type=int, default=RANK_MAX_STUN,
+                        help=f"STUN servers to keep [{RANK_MAX_STUN}]")
+    parser.add_argument('--max-turn', type=int, default=RANK_MAX_TURN,
+                        help=f"TURN URLs to keep per transport (udp/tcp/tls) [{RANK_MAX_TURN}]")
+    args = parser.parse_args()
     
-    credentials_url = sys.argv[1]
+    credentials_url = args.credentials_url
     
     # Validate URL
     try:
@@ -465,9 +1602,30 @@ def main():
     # Run tests
     tester = TURNServerTester(credentials_url)
     
+    if args.daemon:
+        try:
+            TURNMonitor(credentials_url, interval=args.interval).run(args.metrics_host, args.metrics_port)
+        except KeyboardInterrupt:
+            print("\n\nMonitor stopped")
+        sys.exit(0)
+    
+    if args.rank:
+        try:
+            ok = (tester.fetch_credentials() and tester.validate_credentials()
+                  and tester.rank_servers(args.candidate, args.output, rounds=args.rounds, max_ms=args.max_ms,
+                                          max_stun=args.max_stun, max_turn=args.max_turn))
+            if tester.test_results.get('ranking') and not args.no_record:
+                tester.record_results('ice_ranking')
+        except KeyboardInterrupt:
+            print("\n\nRanking interrupted by user")
+            sys.exit(1)
+        sys.exit(0 if ok else 1)
+    
     # Use asyncio to run async tests
     try:
-        asyncio.run(tester.run_all_tests())
+        asyncio.run(tester.run_all_tests(args.trials))
+        if tester.test_results['probes'] and not args.no_record:
+            tester.record_results('turn_server')
     except KeyboardInterrupt:
         print("\n\nTest interrupted by user")
         sys.exit(1)
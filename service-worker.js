@@ -5,7 +5,7 @@
 //   - JS / CSS / fonts / icons: CACHE FIRST → network (fast, versioned by cache name)
 //   - /rooms, /signal, API: BYPASS (always network)
 
-const CACHE_NAME = 'midi-streamer-v1.7.1';  // fix: ?name= URL param, force re-cache of i18n/utils
+const CACHE_NAME = 'midi-streamer-v1.7.5';  // versioned /rooms long-poll
 
 const getBasePath = () => {
   const swPath = self.location.pathname;
@@ -27,6 +27,7 @@ const STATIC_ASSETS = [
   basePath + 'src/config.js',
   basePath + 'src/i18n.js',
   basePath + 'src/chord-utils.js',
+  basePath + 'src/chord-table.js',
   basePath + 'src/rooms.js',
   basePath + 'src/recorder.js',
   basePath + 'src/participants.js',
@@ -83,7 +84,8 @@ self.addEventListener('fetch', (event) => {
     url.pathname.endsWith('/health') ||
     url.pathname.endsWith('/hide-room') ||
     url.pathname.endsWith('/show-room') ||
-    url.pathname.includes('get-turn-credentials')
+    url.pathname.includes('get-turn-credentials') ||
+    url.pathname.endsWith('/ice-servers.json')
   ) {
     return; // let browser handle it natively
   }
@@ -21,8 +21,8 @@ mkdir -p "$INSTALL_DIR"
 chown "$SERVICE_USER:$SERVICE_GROUP" "$INSTALL_DIR"
 
 echo "==> Copying source…"
-cp main.go go.mod go.sum "$INSTALL_DIR/"
-chown "$SERVICE_USER:$SERVICE_GROUP" "$INSTALL_DIR"/{main.go,go.mod,go.sum}
+cp *.go go.mod go.sum "$INSTALL_DIR/"
+chown "$SERVICE_USER:$SERVICE_GROUP" "$INSTALL_DIR"/*.go "$INSTALL_DIR"/{go.mod,go.sum}
 
 echo "==> Building binary…"
 cd "$INSTALL_DIR"
@@ -3,6 +3,17 @@
 // Build:   go build -o signaler .
 // Run:     ./signaler -addr :8765
 // Protocol: ws://your-host:8765/signal?room=ROOMNAME&peer=PEERID
+// Routing:  messages with a "to" field (sdp, ice) go to that peer only;
+//           everything else (join, keepalive) is broadcast to the room
+//
+// Relay:    ws://your-host:8765/relay?room=ROOMNAME&peer=PEERID carries binary
+//           MIDI packets; each is fanned out to the room's other subscribers
+//           (see relay.go)
+// Metrics: GET /metrics  → Prometheus text format (see metrics.go)
+//
+// Rooms:   GET /rooms  → visible rooms with an ETag; If-None-Match gives 304,
+//          ?wait=N long-polls for a change, &delta=1 returns only what changed
+//          (see rooms.go)
 //
 // Extra:  POST /hide-room?room=NAME  → marks room as hidden (not in /rooms listing)
 //         POST /show-room?room=NAME  → un-hides a room
@@ -12,6 +23,7 @@ package main
 import (
 	"encoding/json"
 	"flag"
+	"hash/fnv"
 	"log"
 	"net/http"
 	"sync"
@@ -31,54 +43,130 @@ const (
 	writeWait  = 10 * time.Second
 	pongWait   = 120 * time.Second  // generous: client heartbeats every 25 s
 	pingPeriod = 30 * time.Second   // server pings every 30 s as a backstop
+	sendBuffer = 32                 // queued messages per client before drops
 )
 
+// hubShards is the number of independently locked room maps. A room always
+// hashes to the same shard, so joins, leaves and broadcasts in different
+// rooms rarely contend for a lock.
+const hubShards = 64
+
+type room struct {
+	peers  map[string]*Client
+	hidden bool
+}
+
+type shard struct {
+	mu    sync.RWMutex
+	rooms map[string]*room
+}
+
 type Hub struct {
-	mu          sync.RWMutex
-	rooms       map[string]map[string]*Client
-	hiddenRooms map[string]bool
+	shards  [hubShards]shard
+	listing *roomFeed
 }
 
 func newHub() *Hub {
-	return &Hub{
-		rooms:       make(map[string]map[string]*Client),
-		hiddenRooms: make(map[string]bool),
+	h := &Hub{listing: newRoomFeed()}
+	for i := range h.shards {
+		h.shards[i].rooms = make(map[string]*room)
 	}
+	return h
+}
+
+func shardIndex(name string) uint32 {
+	f := fnv.New32a()
+	f.Write([]byte(name))
+	return f.Sum32() % hubShards
+}
+
+func (h *Hub) shard(name string) *shard {
+	return &h.shards[shardIndex(name)]
 }
 
 func (h *Hub) join(c *Client) {
-	h.mu.Lock()
-	defer h.mu.Unlock()
-	if h.rooms[c.room] == nil {
-		h.rooms[c.room] = make(map[string]*Client)
+	s := h.shard(c.room)
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	r := s.rooms[c.room]
+	if r == nil {
+		r = &room{peers: make(map[string]*Client)}
+		s.rooms[c.room] = r
+	}
+	r.peers[c.id] = c
+	log.Printf("join  room=%-20s peer=%s  peers_now=%d", c.room, c.id, len(r.peers))
+	if !r.hidden {
+		h.listing.bump()
 	}
-	h.rooms[c.room][c.id] = c
-	log.Printf("join  room=%-20s peer=%s  peers_now=%d", c.room, c.id, len(h.rooms[c.room]))
 }
 
 func (h *Hub) leave(c *Client) {
-	h.mu.Lock()
-	defer h.mu.Unlock()
-	if peers, ok := h.rooms[c.room]; ok {
-		delete(peers, c.id)
-		log.Printf("leave room=%-20s peer=%s  peers_now=%d", c.room, c.id, len(peers))
-		if len(peers) == 0 {
-			delete(h.rooms, c.room)
-			delete(h.hiddenRooms, c.room) // auto-clean hidden flag
+	s := h.shard(c.room)
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	if r, ok := s.rooms[c.room]; ok {
+		if r.peers[c.id] != c {
+			return // peer already rejoined on a new connection
+		}
+		delete(r.peers, c.id)
+		log.Printf("leave room=%-20s peer=%s  peers_now=%d", c.room, c.id, len(r.peers))
+		if len(r.peers) == 0 {
+			delete(s.rooms, c.room) // hidden flag goes with the room
+		}
+		if !r.hidden {
+			h.listing.bump()
 		}
 	}
 }
 
+// envelope is the part of a signaling message the hub routes on.
+type envelope struct {
+	Type string `json:"type"`
+	To   string `json:"to"`
+}
+
+// route delivers an addressed message (sdp, ice, ...) only to its recipient
+// and broadcasts everything else (join, keepalive) to the room. Without this,
+// mesh setup sends O(N²) messages per join and fills the send buffers.
+func (h *Hub) route(sender *Client, msg []byte) {
+	var env envelope
+	if err := json.Unmarshal(msg, &env); err != nil || env.To == "" {
+		h.broadcast(sender, msg)
+		return
+	}
+	h.sendTo(sender, env.To, msg)
+}
+
+func (h *Hub) sendTo(sender *Client, to string, msg []byte) {
+	s := h.shard(sender.room)
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+	r := s.rooms[sender.room]
+	if r == nil {
+		return
+	}
+	c, ok := r.peers[to]
+	if !ok || to == sender.id {
+		return // recipient left; the sender learns from the missing answer
+	}
+	if !enqueue(c, msg) {
+		log.Printf("drop  peer=%s (send buffer full)", to)
+	}
+}
+
 func (h *Hub) broadcast(sender *Client, msg []byte) {
-	h.mu.RLock()
-	defer h.mu.RUnlock()
-	for id, c := range h.rooms[sender.room] {
+	s := h.shard(sender.room)
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+	r := s.rooms[sender.room]
+	if r == nil {
+		return
+	}
+	for id, c := range r.peers {
 		if id == sender.id {
 			continue
 		}
-		select {
-		case c.send <- msg:
-		default:
+		if !enqueue(c, msg) {
 			log.Printf("drop  peer=%s (send buffer full)", id)
 		}
 	}
@@ -91,30 +179,34 @@ type RoomInfo struct {
 }
 
 func (h *Hub) listRooms() []RoomInfo {
-	h.mu.RLock()
-	defer h.mu.RUnlock()
-	rooms := make([]RoomInfo, 0, len(h.rooms))
-	for name, peers := range h.rooms {
-		if h.hiddenRooms[name] {
-			continue // skip hidden rooms
+	rooms := make([]RoomInfo, 0)
+	for i := range h.shards {
+		s := &h.shards[i]
+		s.mu.RLock()
+		for name, r := range s.rooms {
+			if r.hidden {
+				continue // skip hidden rooms
+			}
+			rooms = append(rooms, RoomInfo{Name: name, PeerCount: len(r.peers)})
 		}
-		rooms = append(rooms, RoomInfo{Name: name, PeerCount: len(peers)})
+		s.mu.RUnlock()
 	}
 	return rooms
 }
 
-func (h *Hub) setHidden(room string, hidden bool) bool {
-	h.mu.Lock()
-	defer h.mu.Unlock()
-	if _, exists := h.rooms[room]; !exists {
+func (h *Hub) setHidden(name string, hidden bool) bool {
+	s := h.shard(name)
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	r, exists := s.rooms[name]
+	if !exists {
 		return false // room doesn't exist
 	}
-	if hidden {
-		h.hiddenRooms[room] = true
-	} else {
-		delete(h.hiddenRooms, room)
+	if r.hidden != hidden {
+		r.hidden = hidden
+		h.listing.bump()
 	}
-	log.Printf("room=%-20s hidden=%v", room, hidden)
+	log.Printf("room=%-20s hidden=%v", name, hidden)
 	return true
 }
 
@@ -136,12 +228,16 @@ func (h *Hub) writePump(c *Client) {
 				return
 			}
 			if err := c.conn.WriteMessage(websocket.TextMessage, msg); err != nil {
+				stats.writeErrors.Add(1)
 				log.Printf("write err peer=%s: %v", c.id, err)
 				return
 			}
+			stats.messagesOut.Add(1)
+			stats.bytesOut.Add(uint64(len(msg)))
 		case <-ticker.C:
 			c.conn.SetWriteDeadline(time.Now().Add(writeWait))
 			if err := c.conn.WriteMessage(websocket.PingMessage, nil); err != nil {
+				stats.pingErrors.Add(1)
 				log.Printf("ping err peer=%s: %v", c.id, err)
 				return
 			}
@@ -160,11 +256,16 @@ func (h *Hub) readPump(c *Client) {
 		_, msg, err := c.conn.ReadMessage()
 		if err != nil {
 			if websocket.IsUnexpectedCloseError(err, websocket.CloseGoingAway, websocket.CloseNormalClosure) {
+				stats.readErrors.Add(1)
 				log.Printf("read err peer=%s: %v", c.id, err)
 			}
 			return
 		}
-		h.broadcast(c, msg)
+		stats.messagesIn.Add(1)
+		stats.bytesIn.Add(uint64(len(msg)))
+		start := time.Now()
+		h.route(c, msg)
+		stats.broadcast.observe(since(start))
 	}
 }
 
@@ -180,7 +281,7 @@ func (h *Hub) serveWS(w http.ResponseWriter, r *http.Request) {
 		log.Printf("upgrade err: %v", err)
 		return
 	}
-	c := &Client{id: peer, room: room, conn: conn, send: make(chan []byte, 32)}
+	c := &Client{id: peer, room: room, conn: conn, send: make(chan []byte, sendBuffer)}
 	h.join(c)
 	go h.writePump(c)
 	h.readPump(c)
@@ -197,18 +298,19 @@ func main() {
 	flag.Parse()
 
 	hub := newHub()
+	relay := newRelay()
 	mux := http.NewServeMux()
 
 	mux.HandleFunc("/signal", hub.serveWS)
+	mux.HandleFunc("/relay", relay.serveWS)
 
 	mux.HandleFunc("/health", func(w http.ResponseWriter, r *http.Request) {
 		w.Write([]byte("ok"))
 	})
 
-	mux.HandleFunc("/rooms", func(w http.ResponseWriter, r *http.Request) {
-		corsJSON(w)
-		json.NewEncoder(w).Encode(hub.listRooms())
-	})
+	mux.HandleFunc("/metrics", serveMetrics(hub, relay))
+
+	mux.HandleFunc("/rooms", hub.serveRooms)
 
 	// POST /hide-room?room=NAME  or  POST /show-room?room=NAME
 	mux.HandleFunc("/hide-room", func(w http.ResponseWriter, r *http.Request) {
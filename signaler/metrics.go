@@ -0,0 +1,154 @@
+package main
+
+// Prometheus text-format metrics for GET /metrics. Hand-rolled on atomics to
+// keep the signaler's only dependency gorilla/websocket.
+
+import (
+	"fmt"
+	"io"
+	"net/http"
+	"sync/atomic"
+	"time"
+)
+
+// histogram counts integer observations into fixed cumulative buckets.
+// scale converts the stored unit to the exported one (1e9 for ns → s).
+type histogram struct {
+	bounds []uint64
+	counts []atomic.Uint64 // len(bounds)+1, last is +Inf
+	sum    atomic.Uint64
+	scale  float64
+}
+
+func newHistogram(scale float64, bounds ...uint64) *histogram {
+	return &histogram{bounds: bounds, counts: make([]atomic.Uint64, len(bounds)+1), scale: scale}
+}
+
+func (h *histogram) observe(v uint64) {
+	i := 0
+	for i < len(h.bounds) && v > h.bounds[i] {
+		i++
+	}
+	h.counts[i].Add(1)
+	h.sum.Add(v)
+}
+
+func (h *histogram) write(w io.Writer, name, help string) {
+	fmt.Fprintf(w, "# HELP %s %s\n# TYPE %s histogram\n", name, help, name)
+	var cum uint64
+	for i, b := range h.bounds {
+		cum += h.counts[i].Load()
+		fmt.Fprintf(w, "%s_bucket{le=\"%g\"} %d\n", name, float64(b)/h.scale, cum)
+	}
+	cum += h.counts[len(h.bounds)].Load()
+	fmt.Fprintf(w, "%s_bucket{le=\"+Inf\"} %d\n", name, cum)
+	fmt.Fprintf(w, "%s_sum %g\n%s_count %d\n", name, float64(h.sum.Load())/h.scale, name, cum)
+}
+
+type metrics struct {
+	messagesIn  atomic.Uint64
+	messagesOut atomic.Uint64
+	bytesIn     atomic.Uint64
+	bytesOut    atomic.Uint64
+	drops       atomic.Uint64
+	readErrors  atomic.Uint64
+	writeErrors atomic.Uint64
+	pingErrors  atomic.Uint64
+
+	relayPacketsIn  atomic.Uint64
+	relayPacketsOut atomic.Uint64
+	relayBytesIn    atomic.Uint64
+	relayBytesOut   atomic.Uint64
+	relayDrops      atomic.Uint64
+	relayReadErrs   atomic.Uint64
+	relayWriteErrs  atomic.Uint64
+	relayPingErrs   atomic.Uint64
+
+	roomsRequests    atomic.Uint64
+	roomsNotModified atomic.Uint64
+	roomsBuilds      atomic.Uint64
+
+	// Send-channel length seen by each enqueue; mass near sendBuffer means
+	// a reader is falling behind and drops are next.
+	sendQueue *histogram
+	// Time to hand one incoming message to its recipients' send channels.
+	broadcast *histogram
+}
+
+var stats = metrics{
+	sendQueue: newHistogram(1, 0, 1, 2, 4, 8, 16, 24, 31),
+	broadcast: newHistogram(1e9,
+		1e3, 5e3, 10e3, 25e3, 50e3, 100e3, 250e3, 500e3, 1e6, 5e6, 10e6),
+}
+
+// enqueue is a non-blocking send that records occupancy and drops.
+func enqueue(c *Client, msg []byte) bool {
+	stats.sendQueue.observe(uint64(len(c.send)))
+	select {
+	case c.send <- msg:
+		return true
+	default:
+		stats.drops.Add(1)
+		return false
+	}
+}
+
+func (h *Hub) counts() (rooms, peers int) {
+	for i := range h.shards {
+		s := &h.shards[i]
+		s.mu.RLock()
+		rooms += len(s.rooms)
+		for _, r := range s.rooms {
+			peers += len(r.peers)
+		}
+		s.mu.RUnlock()
+	}
+	return rooms, peers
+}
+
+func since(start time.Time) uint64 {
+	return uint64(time.Since(start))
+}
+
+func serveMetrics(h *Hub, relay *Relay) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		writeMetrics(w, h, relay)
+	}
+}
+
+func writeMetrics(w http.ResponseWriter, h *Hub, relay *Relay) {
+	w.Header().Set("Content-Type", "text/plain; version=0.0.4")
+	w.Header().Set("Cache-Control", "no-store")
+	rooms, peers := h.counts()
+	gauge := func(name, help string, v int) {
+		fmt.Fprintf(w, "# HELP %s %s\n# TYPE %s gauge\n%s %d\n", name, help, name, name, v)
+	}
+	counter := func(name, help string, v *atomic.Uint64) {
+		fmt.Fprintf(w, "# HELP %s %s\n# TYPE %s counter\n%s %d\n", name, help, name, name, v.Load())
+	}
+	gauge("signaler_rooms", "Rooms with at least one peer.", rooms)
+	gauge("signaler_peers", "Connected peers.", peers)
+	counter("signaler_messages_received_total", "Messages read from clients.", &stats.messagesIn)
+	counter("signaler_messages_sent_total", "Messages written to clients.", &stats.messagesOut)
+	counter("signaler_received_bytes_total", "Payload bytes read from clients.", &stats.bytesIn)
+	counter("signaler_sent_bytes_total", "Payload bytes written to clients.", &stats.bytesOut)
+	counter("signaler_send_drops_total", "Messages dropped because a send buffer was full.", &stats.drops)
+	counter("signaler_read_errors_total", "Connections closed by an unexpected read error.", &stats.readErrors)
+	counter("signaler_write_errors_total", "Connections closed by a failed write.", &stats.writeErrors)
+	counter("signaler_ping_errors_total", "Connections closed by a failed ping.", &stats.pingErrors)
+	counter("signaler_rooms_requests_total", "GET /rooms requests.", &stats.roomsRequests)
+	counter("signaler_rooms_not_modified_total", "GET /rooms answered 304 Not Modified.", &stats.roomsNotModified)
+	counter("signaler_rooms_encodes_total", "Room listings built and JSON-encoded.", &stats.roomsBuilds)
+	gauge("signaler_rooms_waiters", "GET /rooms long-polls waiting for a change.", int(h.listing.waiters.Load()))
+	gauge("signaler_relay_subscribers", "Connected MIDI relay subscribers.", relay.subscribers())
+	counter("signaler_relay_packets_received_total", "MIDI packets received by the relay.", &stats.relayPacketsIn)
+	counter("signaler_relay_packets_sent_total", "Relay frames written to subscribers.", &stats.relayPacketsOut)
+	counter("signaler_relay_received_bytes_total", "MIDI packet bytes received by the relay.", &stats.relayBytesIn)
+	counter("signaler_relay_sent_bytes_total", "Relay frame bytes written to subscribers.", &stats.relayBytesOut)
+	counter("signaler_relay_drops_total", "Relay frames discarded from a full subscriber queue.", &stats.relayDrops)
+	counter("signaler_relay_read_errors_total", "Relay connections closed by an unexpected read error.", &stats.relayReadErrs)
+	counter("signaler_relay_write_errors_total", "Relay connections closed by a failed write.", &stats.relayWriteErrs)
+	counter("signaler_relay_ping_errors_total", "Relay connections closed by a failed ping.", &stats.relayPingErrs)
+	stats.sendQueue.write(w, "signaler_send_queue_length", fmt.Sprintf("Send-channel length at enqueue (capacity %d).", sendBuffer))
+	stats.broadcast.write(w, "signaler_broadcast_duration_seconds", "Time to route one message to its recipients' send channels.")
+}
@@ -0,0 +1,264 @@
+package main
+
+// MIDI relay for rooms too large for a full WebRTC mesh.
+//
+// A client opens ws://host/relay?room=NAME&peer=ID next to its /signal
+// socket and sends the binary packets built by midi-worker.js. The relay
+// forwards each packet once to every other subscriber in the room, so a
+// player uploads a note once instead of N−1 times. Outgoing frames carry
+// the sender's peer id:
+//
+//	[1 byte id length][peer id][packet from midi-worker.js]
+//
+// Whenever the room's subscriber set changes, every subscriber gets a text
+// frame {"type":"subscribers","peers":[...]} so clients keep sending over
+// the mesh to peers that are not on the relay.
+//
+// Each subscriber has a bounded queue. When a slow reader fills it the
+// oldest packet is discarded: a late note is worse than a lost one, and
+// the client's stuck-note timer covers a lost Note Off. Subscriber lists
+// never go through that queue: each subscriber has a one-slot mailbox
+// holding the latest list, written before any queued packet, so a busy
+// room cannot leave a client routing by a stale list.
+
+import (
+	"encoding/json"
+	"log"
+	"net/http"
+	"sort"
+	"sync"
+	"time"
+
+	"github.com/gorilla/websocket"
+)
+
+const relayQueue = 64 // packets per subscriber; ~64 ms of dense playing
+
+type subscriber struct {
+	id      string
+	room    string
+	conn    *websocket.Conn
+	queue   chan []byte // MIDI frames, drop-oldest
+	control chan []byte // latest subscriber list, capacity 1
+}
+
+type relayShard struct {
+	mu    sync.RWMutex
+	rooms map[string]map[string]*subscriber
+}
+
+type Relay struct {
+	shards [hubShards]relayShard
+}
+
+func newRelay() *Relay {
+	r := &Relay{}
+	for i := range r.shards {
+		r.shards[i].rooms = make(map[string]map[string]*subscriber)
+	}
+	return r
+}
+
+func (r *Relay) shard(name string) *relayShard {
+	return &r.shards[shardIndex(name)]
+}
+
+func (r *Relay) join(s *subscriber) {
+	sh := r.shard(s.room)
+	sh.mu.Lock()
+	defer sh.mu.Unlock()
+	subs := sh.rooms[s.room]
+	if subs == nil {
+		subs = make(map[string]*subscriber)
+		sh.rooms[s.room] = subs
+	}
+	if old := subs[s.id]; old != nil {
+		old.conn.Close() // same peer reconnected; its readPump cleans up
+	}
+	subs[s.id] = s
+	log.Printf("relay join  room=%-20s peer=%s  subscribers_now=%d", s.room, s.id, len(subs))
+	announce(subs)
+}
+
+func (r *Relay) leave(s *subscriber) {
+	sh := r.shard(s.room)
+	sh.mu.Lock()
+	defer sh.mu.Unlock()
+	subs := sh.rooms[s.room]
+	if subs[s.id] != s {
+		return
+	}
+	delete(subs, s.id)
+	log.Printf("relay leave room=%-20s peer=%s  subscribers_now=%d", s.room, s.id, len(subs))
+	if len(subs) == 0 {
+		delete(sh.rooms, s.room)
+		return
+	}
+	announce(subs)
+}
+
+// announce sends the current subscriber list to everyone in the room.
+// Caller holds the shard lock.
+func announce(subs map[string]*subscriber) {
+	ids := make([]string, 0, len(subs))
+	for id := range subs {
+		ids = append(ids, id)
+	}
+	sort.Strings(ids)
+	msg, _ := json.Marshal(map[string]interface{}{"type": "subscribers", "peers": ids})
+	for _, s := range subs {
+		s.announce(msg)
+	}
+}
+
+// announce replaces any unsent subscriber list with msg. A newer list
+// supersedes an older one, so nothing is lost by replacing it.
+// Caller holds the shard lock, which serialises announcements per room.
+func (s *subscriber) announce(msg []byte) {
+	select {
+	case <-s.control:
+	default:
+	}
+	s.control <- msg
+}
+
+// offer queues a frame, discarding the oldest queued frame when full.
+func (s *subscriber) offer(frame []byte) {
+	for {
+		select {
+		case s.queue <- frame:
+			return
+		default:
+		}
+		select {
+		case <-s.queue:
+			stats.relayDrops.Add(1)
+		default:
+		}
+	}
+}
+
+func (r *Relay) forward(from *subscriber, packet []byte) {
+	frame := make([]byte, 1+len(from.id)+len(packet))
+	frame[0] = byte(len(from.id))
+	copy(frame[1:], from.id)
+	copy(frame[1+len(from.id):], packet)
+
+	sh := r.shard(from.room)
+	sh.mu.RLock()
+	defer sh.mu.RUnlock()
+	for id, s := range sh.rooms[from.room] {
+		if id != from.id {
+			s.offer(frame)
+		}
+	}
+}
+
+func (r *Relay) writePump(s *subscriber, done <-chan struct{}) {
+	ticker := time.NewTicker(pingPeriod)
+	defer func() { ticker.Stop(); s.conn.Close() }()
+	write := func(kind int, data []byte) bool {
+		s.conn.SetWriteDeadline(time.Now().Add(writeWait))
+		if err := s.conn.WriteMessage(kind, data); err != nil {
+			stats.relayWriteErrs.Add(1)
+			log.Printf("relay write err peer=%s: %v", s.id, err)
+			return false
+		}
+		return true
+	}
+	for {
+		// The subscriber list goes out before any packet queued behind it
+		select {
+		case msg := <-s.control:
+			if !write(websocket.TextMessage, msg) {
+				return
+			}
+			continue
+		default:
+		}
+		select {
+		case msg := <-s.control:
+			if !write(websocket.TextMessage, msg) {
+				return
+			}
+		case frame := <-s.queue:
+			if !write(websocket.BinaryMessage, frame) {
+				return
+			}
+			stats.relayPacketsOut.Add(1)
+			stats.relayBytesOut.Add(uint64(len(frame)))
+		case <-ticker.C:
+			s.conn.SetWriteDeadline(time.Now().Add(writeWait))
+			if err := s.conn.WriteMessage(websocket.PingMessage, nil); err != nil {
+				stats.relayPingErrs.Add(1)
+				log.Printf("relay ping err peer=%s: %v", s.id, err)
+				return
+			}
+		case <-done:
+			_ = s.conn.WriteMessage(websocket.CloseMessage, []byte{})
+			return
+		}
+	}
+}
+
+func (r *Relay) readPump(s *subscriber) {
+	s.conn.SetReadLimit(64 * 1024)
+	s.conn.SetReadDeadline(time.Now().Add(pongWait))
+	s.conn.SetPongHandler(func(string) error {
+		return s.conn.SetReadDeadline(time.Now().Add(pongWait))
+	})
+	for {
+		kind, msg, err := s.conn.ReadMessage()
+		if err != nil {
+			if websocket.IsUnexpectedCloseError(err, websocket.CloseGoingAway, websocket.CloseNormalClosure) {
+				stats.relayReadErrs.Add(1)
+				log.Printf("relay read err peer=%s: %v", s.id, err)
+			}
+			return
+		}
+		if kind != websocket.BinaryMessage || len(msg) == 0 {
+			continue
+		}
+		stats.relayPacketsIn.Add(1)
+		stats.relayBytesIn.Add(uint64(len(msg)))
+		r.forward(s, msg)
+	}
+}
+
+func (r *Relay) serveWS(w http.ResponseWriter, req *http.Request) {
+	room := req.URL.Query().Get("room")
+	peer := req.URL.Query().Get("peer")
+	if room == "" || peer == "" {
+		http.Error(w, "missing ?room= or ?peer=", http.StatusBadRequest)
+		return
+	}
+	if len(peer) > 255 {
+		http.Error(w, "peer id too long", http.StatusBadRequest)
+		return
+	}
+	conn, err := upgrader.Upgrade(w, req, nil)
+	if err != nil {
+		log.Printf("relay upgrade err: %v", err)
+		return
+	}
+	s := &subscriber{id: peer, room: room, conn: conn,
+		queue: make(chan []byte, relayQueue), control: make(chan []byte, 1)}
+	done := make(chan struct{})
+	r.join(s)
+	go r.writePump(s, done)
+	r.readPump(s)
+	r.leave(s)
+	close(done)
+}
+
+func (r *Relay) subscribers() (n int) {
+	for i := range r.shards {
+		sh := &r.shards[i]
+		sh.mu.RLock()
+		for _, subs := range sh.rooms {
+			n += len(subs)
+		}
+		sh.mu.RUnlock()
+	}
+	return n
+}
@@ -0,0 +1,234 @@
+package main
+
+// Versioned GET /rooms.
+//
+// Every change to the visible listing (join or leave in a visible room,
+// hide, show) bumps a version. The JSON body for a version is encoded once
+// and shared by every request, and carries an ETag of "<boot>-<version>":
+//
+//	GET /rooms                        → 200 [..rooms..]  ETag: "k3x9-42"
+//	GET /rooms   If-None-Match: "k3x9-42"                 → 304 while unchanged
+//	GET /rooms?wait=25  If-None-Match: "k3x9-42"          → held until the
+//	    listing changes (200) or 25 s pass (304); a long-poll. Changes in
+//	    the second after the first one are folded into the same answer, so a
+//	    burst of joins costs each viewer one request
+//	GET /rooms?wait=25&delta=1  If-None-Match: "k3x9-42"  → 200 with only
+//	    {"version","changed":[..],"removed":[..]} relative to version 42,
+//	    or {"version","full":true,"rooms":[..]} if 42 is too old
+//
+// ?since=<etag> may be used instead of If-None-Match.
+
+import (
+	"encoding/json"
+	"net/http"
+	"sort"
+	"strconv"
+	"strings"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+const (
+	roomsMaxWait = 30 * time.Second
+	roomsSettle  = time.Second // batch changes before answering a long-poll
+	roomsHistory = 64          // listings kept for deltas
+)
+
+type listing struct {
+	version uint64
+	etag    string
+	body    []byte         // JSON array, as served without ?delta=1
+	rooms   []RoomInfo     // sorted by name
+	counts  map[string]int // name → peerCount
+
+	mu     sync.Mutex
+	deltas map[uint64][]byte // encoded delta from an older version
+}
+
+type roomFeed struct {
+	boot    string
+	version atomic.Uint64
+	waiters atomic.Int64
+
+	mu      sync.Mutex // guards changed and recent; never held while taking a shard lock
+	changed chan struct{}
+	recent  []*listing // oldest first
+
+	build sync.Mutex // one encode per version when a wake-up releases many long-polls
+}
+
+func newRoomFeed() *roomFeed {
+	return &roomFeed{
+		boot:    strconv.FormatInt(time.Now().UnixNano(), 36),
+		changed: make(chan struct{}),
+	}
+}
+
+// bump records a change to the visible listing and wakes long-pollers.
+func (f *roomFeed) bump() {
+	f.version.Add(1)
+	f.mu.Lock()
+	close(f.changed)
+	f.changed = make(chan struct{})
+	f.mu.Unlock()
+}
+
+func (f *roomFeed) wait() <-chan struct{} {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	return f.changed
+}
+
+// current returns the listing for the current version, encoding it only if
+// no request has done so yet.
+func (f *roomFeed) current(h *Hub) *listing {
+	v := f.version.Load()
+	if l := f.latest(v); l != nil {
+		return l
+	}
+	f.build.Lock()
+	defer f.build.Unlock()
+	if l := f.latest(v); l != nil {
+		return l // built while we waited for the lock
+	}
+
+	rooms := h.listRooms()
+	sort.Slice(rooms, func(i, j int) bool { return rooms[i].Name < rooms[j].Name })
+	body, _ := json.Marshal(rooms)
+	counts := make(map[string]int, len(rooms))
+	for _, r := range rooms {
+		counts[r.Name] = r.PeerCount
+	}
+	l := &listing{
+		version: v,
+		etag:    `"` + f.boot + "-" + strconv.FormatUint(v, 10) + `"`,
+		body:    append(body, '\n'),
+		rooms:   rooms,
+		counts:  counts,
+		deltas:  make(map[uint64][]byte),
+	}
+	stats.roomsBuilds.Add(1)
+
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	f.recent = append(f.recent, l)
+	if len(f.recent) > roomsHistory {
+		f.recent = f.recent[1:]
+	}
+	return l
+}
+
+// latest returns the newest kept listing if it is at least version v.
+func (f *roomFeed) latest(v uint64) *listing {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	if n := len(f.recent); n > 0 && f.recent[n-1].version >= v {
+		return f.recent[n-1]
+	}
+	return nil
+}
+
+// find returns the kept listing an ETag refers to, or nil.
+func (f *roomFeed) find(etag string) *listing {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	for _, l := range f.recent {
+		if l.etag == etag {
+			return l
+		}
+	}
+	return nil
+}
+
+// delta encodes the change from old to l; a full listing when old is nil.
+func (l *listing) delta(old *listing) []byte {
+	key := ^uint64(0) // full listing
+	if old != nil {
+		key = old.version
+	}
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	if body, ok := l.deltas[key]; ok {
+		return body
+	}
+	if old == nil {
+		body, _ := json.Marshal(map[string]interface{}{"version": l.etag, "full": true, "rooms": l.rooms})
+		l.deltas[key] = append(body, '\n')
+		return l.deltas[key]
+	}
+	changed := make([]RoomInfo, 0)
+	removed := make([]string, 0)
+	for _, r := range l.rooms {
+		if n, ok := old.counts[r.Name]; !ok || n != r.PeerCount {
+			changed = append(changed, r)
+		}
+	}
+	for _, r := range old.rooms {
+		if _, ok := l.counts[r.Name]; !ok {
+			removed = append(removed, r.Name)
+		}
+	}
+	body, _ := json.Marshal(map[string]interface{}{"version": l.etag, "changed": changed, "removed": removed})
+	l.deltas[key] = append(body, '\n')
+	return l.deltas[key]
+}
+
+func (h *Hub) serveRooms(w http.ResponseWriter, r *http.Request) {
+	corsJSON(w)
+	w.Header().Set("Access-Control-Allow-Headers", "If-None-Match")
+	w.Header().Set("Access-Control-Expose-Headers", "ETag")
+	if r.Method == http.MethodOptions {
+		return
+	}
+	stats.roomsRequests.Add(1)
+
+	q := r.URL.Query()
+	since := q.Get("since")
+	if since == "" {
+		since = strings.TrimPrefix(r.Header.Get("If-None-Match"), "W/")
+	}
+	feed := h.listing
+	cur := feed.current(h)
+
+	if since == cur.etag && q.Get("wait") != "" {
+		wait, _ := strconv.Atoi(q.Get("wait"))
+		timeout := time.Duration(wait) * time.Second
+		if timeout > roomsMaxWait {
+			timeout = roomsMaxWait
+		}
+		changed := feed.wait()
+		if feed.version.Load() == cur.version && timeout > 0 {
+			feed.waiters.Add(1)
+			timer := time.NewTimer(timeout)
+			select {
+			case <-changed:
+				timer.Reset(roomsSettle)
+				select {
+				case <-timer.C:
+				case <-r.Context().Done():
+				}
+			case <-timer.C:
+			case <-r.Context().Done():
+			}
+			timer.Stop()
+			feed.waiters.Add(-1)
+			if r.Context().Err() != nil {
+				return
+			}
+		}
+		cur = feed.current(h)
+	}
+
+	w.Header().Set("ETag", cur.etag)
+	if since == cur.etag {
+		stats.roomsNotModified.Add(1)
+		w.WriteHeader(http.StatusNotModified)
+		return
+	}
+	if q.Get("delta") != "" {
+		w.Write(cur.delta(feed.find(since)))
+		return
+	}
+	w.Write(cur.body)
+}
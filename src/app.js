@@ -18,6 +18,7 @@ export class MIDIStreamer {
             midiEchoEnabled: false,
             ipv6Enabled: true,
             lowLatencyMode: false,
+            relayMode: false,
         };
         this.isUpdatingFromRemote = false;
         this.MAX_TIMESTAMP_DELAY_MS = 10000;
@@ -323,6 +324,19 @@ export class MIDIStreamer {
             });
         }
 
+        // Server-side MIDI relay toggle
+        const relayToggle = document.getElementById('relayMode');
+        if (relayToggle) {
+            relayToggle.addEventListener('change', (e) => {
+                this.settings.relayMode = e.target.checked;
+                if (this.webrtc) this.webrtc.relayMode = e.target.checked;
+                this.ui.addMessage(
+                    e.target.checked ? t('settings.relayOn') : t('settings.relayOff'),
+                    'info'
+                );
+            });
+        }
+
         // Emergency All Notes Off
         const emergencyBtn = document.getElementById('emergencyAllNotesOff');
         if (emergencyBtn) {
@@ -409,38 +423,48 @@ export class MIDIStreamer {
         }
 
         try {
-            const rooms = await this.roomManager.fetchRooms();
-            const visibleRooms = rooms.filter((room) => room.name !== this.currentRoomName);
-            this.roomManager.displayRooms(visibleRooms, (roomName) => {
-                const roomNameInput = document.getElementById('roomNameInput');
-                if (roomNameInput) {
-                    roomNameInput.value = roomName;
-                }
-                this.connect();
-            }, {
-                excludedRoomName: this.currentRoomName,
-                announceRoom: (roomName, peerCount) => {
-                    const countText = peerCount === 1 ? t('rooms.peerCount_singular') : t('rooms.peerCount_plural').replace('{n}', peerCount);
-                    this.ui.announceStatus(t('rooms.newRoomAvailable').replace('{room}', roomName).replace('{count}', countText));
-                }
-            });
-            this.setRoomsVisibility(true);
+            this.showAvailableRooms(await this.roomManager.fetchRooms());
         } catch (err) {
             console.error('Failed to refresh rooms:', err);
             this.ui.addMessage(t('rooms.refreshFailed'), 'error');
         }
     }
 
-    startRoomAutoRefresh(intervalMs = 5000) {
-        if (this.roomRefreshIntervalId) {
-            clearInterval(this.roomRefreshIntervalId);
-            this.roomRefreshIntervalId = null;
+    showAvailableRooms(rooms) {
+        if (this.webrtc.isConnected()) {
+            this.setRoomsVisibility(false);
+            return;
         }
+        const visibleRooms = rooms.filter((room) => room.name !== this.currentRoomName);
+        this.roomManager.displayRooms(visibleRooms, (roomName) => {
+            const roomNameInput = document.getElementById('roomNameInput');
+            if (roomNameInput) {
+                roomNameInput.value = roomName;
+            }
+            this.connect();
+        }, {
+            excludedRoomName: this.currentRoomName,
+            announceRoom: (roomName, peerCount) => {
+                const countText = peerCount === 1 ? t('rooms.peerCount_singular') : t('rooms.peerCount_plural').replace('{n}', peerCount);
+                this.ui.announceStatus(t('rooms.newRoomAvailable').replace('{room}', roomName).replace('{count}', countText));
+            }
+        });
+        this.setRoomsVisibility(true);
+    }
+
+    async startRoomAutoRefresh(intervalMs = 5000) {
+        this.stopRoomAutoRefresh();
 
         if (this.webrtc.isConnected()) {
             return;
         }
 
+        // Versioned signaler: long-poll for changes instead of re-fetching
+        const watching = await this.roomManager.watchRooms((rooms) => this.showAvailableRooms(rooms));
+        if (watching || this.webrtc.isConnected() || this.roomRefreshIntervalId) {
+            return;
+        }
+
         this.refreshAvailableRooms();
         this.roomRefreshIntervalId = setInterval(() => {
             if (!this.webrtc.isConnected()) {
@@ -476,6 +500,7 @@ export class MIDIStreamer {
     }
 
     stopRoomAutoRefresh() {
+        this.roomManager.stopWatching();
         if (!this.roomRefreshIntervalId) return;
         clearInterval(this.roomRefreshIntervalId);
         this.roomRefreshIntervalId = null;
@@ -0,0 +1,150 @@
+/**
+ * Chord lookup table — GENERATED by scripts/generate_chord_table.py, do not edit.
+ *
+ * CHORD_TABLE is indexed by a 12-bit interval mask relative to the bass note
+ * (bit n set = pitch class n semitones above the bass is sounding) and holds
+ * an index into CHORD_TYPES. Regenerate after changing detectChordByRules().
+ */
+
+export const CHORD_TYPES = [
+    '',
+    'Custom',
+    'm',
+    'm(b9)',
+    '(b9)',
+    '(#9)',
+    'sus2',
+    'sus4',
+    'm(#11)',
+    'm(b9,#11)',
+    '(#11)',
+    '(b9,#11)',
+    '(#9,#11)',
+    'm6',
+    'm6/9',
+    '6',
+    '6/9',
+    'm7',
+    'm7(b9)',
+    '7',
+    '7(b9)',
+    '9',
+    '7(#9)',
+    '7sus2',
+    '7sus4',
+    '7sus4(b9)',
+    'm7(#11)',
+    'm7(b9,#11)',
+    '7(#11)',
+    '7(b9,#11)',
+    '7(9,#11)',
+    '7(#9,#11)',
+    '7(b13)',
+    '7(b9,b13)',
+    '7(9,b13)',
+    '7(#9,b13)',
+    '7(#11,b13)',
+    '7(b9,#11,b13)',
+    '7(9,#11,b13)',
+    '7(#9,#11,b13)',
+    'm7(13)',
+    'm7(b9,13)',
+    '13',
+    '13(b9)',
+    '13(#9)',
+    'm7(#11,13)',
+    'm7(b9,#11,13)',
+    '13(#11)',
+    '13(b9,#11)',
+    '13(9,#11)',
+    '13(#9,#11)',
+    'mM7',
+    'mM7(b9)',
+    'maj7',
+    'maj7(b9)',
+    'maj7(9)',
+    'maj7(#9)',
+    'mM7(#11)',
+    'mM7(b9,#11)',
+    'maj7(#11)',
+    'maj7(b9,#11)',
+    'maj7(9,#11)',
+    'maj7(#9,#11)',
+    'maj7(b13)',
+    'maj7(b9,b13)',
+    'maj7(9,b13)',
+    'maj7(#9,b13)',
+    'maj7(#11,b13)',
+    'maj7(b9,#11,b13)',
+    'maj7(9,#11,b13)',
+    'maj7(#9,#11,b13)',
+    'maj7(13)',
+    'maj7(b9,13)',
+    'maj7(9,13)',
+    'maj7(#9,13)',
+    'maj7(#11,13)',
+    'maj7(b9,#11,13)',
+    'maj7(9,#11,13)',
+    'maj7(#9,#11,13)',
+];
+
+const ENCODED =
+    'AAEAAQABAAEAAgADAAIAAwAAAAQAAAAEAAUABAAFAAQAAQABAAEAAQACAAMAAgADAAAABAAAAAQABQAEAAUABAABAAEAAQAB' +
+    'AAIAAwACAAMAAAAEAAAABAAFAAQABQAEAAEAAQABAAEAAgADAAIAAwAAAAQAAAAEAAUABAAFAAQAAQABAAYABgACAAMAAgAD' +
+    'AAAABAAAAAQABQAEAAUABAAHAAcABwAHAAIAAwACAAMAAAAEAAAABAAFAAQABQAEAAEAAQAGAAYACAAJAAgACQAKAAsACgAL' +
+    'AAwACwAMAAsABwAHAAcABwAIAAkACAAJAAoACwAKAAsADAALAAwACwABAAEAAQABAAIAAwACAAMAAAAEAAAABAAFAAQABQAE' +
+    'AAEAAQABAAEAAgADAAIAAwAAAAQAAAAEAAUABAAFAAQAAQABAAEAAQACAAMAAgADAAAABAAAAAQABQAEAAUABAABAAEAAQAB' +
+    'AAIAAwACAAMAAAAEAAAABAAFAAQABQAEAAEAAQAGAAYAAgADAAIAAwAAAAQAAAAEAAUABAAFAAQABwAHAAcABwACAAMAAgAD' +
+    'AAAABAAAAAQABQAEAAUABAABAAEABgAGAAgACQAIAAkACgALAAoACwAMAAsADAALAAcABwAHAAcACAAJAAgACQAKAAsACgAL' +
+    'AAwACwAMAAsAAQABAAEAAQANAA0ADgAOAA8ADwAQABAADwAPABAAEAABAAEAAQABAA0ADQAOAA4ADwAPABAAEAAPAA8AEAAQ' +
+    'AAEAAQABAAEADQANAA4ADgAPAA8AEAAQAA8ADwAQABAAAQABAAEAAQANAA0ADgAOAA8ADwAQABAADwAPABAAEAABAAEABgAG' +
+    'AA0ADQAOAA4ADwAPABAAEAAPAA8AEAAQAAcABwAHAAcADQANAA4ADgAPAA8AEAAQAA8ADwAQABAAAQABAAYABgANAA0ADgAO' +
+    'AA8ADwAQABAADwAPABAAEAAHAAcABwAHAA0ADQAOAA4ADwAPABAAEAAPAA8AEAAQAAEAAQABAAEADQANAA4ADgAPAA8AEAAQ' +
+    'AA8ADwAQABAAAQABAAEAAQANAA0ADgAOAA8ADwAQABAADwAPABAAEAABAAEAAQABAA0ADQAOAA4ADwAPABAAEAAPAA8AEAAQ' +
+    'AAEAAQABAAEADQANAA4ADgAPAA8AEAAQAA8ADwAQABAAAQABAAYABgANAA0ADgAOAA8ADwAQABAADwAPABAAEAAHAAcABwAH' +
+    'AA0ADQAOAA4ADwAPABAAEAAPAA8AEAAQAAEAAQAGAAYADQANAA4ADgAPAA8AEAAQAA8ADwAQABAABwAHAAcABwANAA0ADgAO' +
+    'AA8ADwAQABAADwAPABAAEAABAAEAAQABABEAEgARABIAEwAUABUAFAAWABQAFgAUAAEAAQABAAEAEQASABEAEgATABQAFQAU' +
+    'ABYAFAAWABQAAQABAAEAAQARABIAEQASABMAFAAVABQAFgAUABYAFAABAAEAAQABABEAEgARABIAEwAUABUAFAAWABQAFgAU' +
+    'AAEAAQAXABcAEQASABEAEgATABQAFQAUABYAFAAWABQAGAAZABgAGQARABIAEQASABMAFAAVABQAFgAUABYAFAABAAEAFwAX' +
+    'ABoAGwAaABsAHAAdAB4AHQAfAB0AHwAdABgAGQAYABkAGgAbABoAGwAcAB0AHgAdAB8AHQAfAB0AAQABAAEAAQARABIAEQAS' +
+    'ACAAIQAiACEAIwAhACMAIQABAAEAAQABABEAEgARABIAIAAhACIAIQAjACEAIwAhAAEAAQABAAEAEQASABEAEgAgACEAIgAh' +
+    'ACMAIQAjACEAAQABAAEAAQARABIAEQASACAAIQAiACEAIwAhACMAIQABAAEAFwAXABEAEgARABIAIAAhACIAIQAjACEAIwAh' +
+    'ABgAGQAYABkAEQASABEAEgAgACEAIgAhACMAIQAjACEAAQABABcAFwAaABsAGgAbACQAJQAmACUAJwAlACcAJQAYABkAGAAZ' +
+    'ABoAGwAaABsAJAAlACYAJQAnACUAJwAlAAEAAQABAAEAKAApACgAKQAqACsAKgArACwAKwAsACsAAQABAAEAAQAoACkAKAAp' +
+    'ACoAKwAqACsALAArACwAKwABAAEAAQABACgAKQAoACkAKgArACoAKwAsACsALAArAAEAAQABAAEAKAApACgAKQAqACsAKgAr' +
+    'ACwAKwAsACsAAQABABcAFwAoACkAKAApACoAKwAqACsALAArACwAKwAYABkAGAAZACgAKQAoACkAKgArACoAKwAsACsALAAr' +
+    'AAEAAQAXABcALQAuAC0ALgAvADAAMQAwADIAMAAyADAAGAAZABgAGQAtAC4ALQAuAC8AMAAxADAAMgAwADIAMAABAAEAAQAB' +
+    'ACgAKQAoACkAKgArACoAKwAsACsALAArAAEAAQABAAEAKAApACgAKQAqACsAKgArACwAKwAsACsAAQABAAEAAQAoACkAKAAp' +
+    'ACoAKwAqACsALAArACwAKwABAAEAAQABACgAKQAoACkAKgArACoAKwAsACsALAArAAEAAQAXABcAKAApACgAKQAqACsAKgAr' +
+    'ACwAKwAsACsAGAAZABgAGQAoACkAKAApACoAKwAqACsALAArACwAKwABAAEAFwAXAC0ALgAtAC4ALwAwADEAMAAyADAAMgAw' +
+    'ABgAGQAYABkALQAuAC0ALgAvADAAMQAwADIAMAAyADAAAQABAAEAAQAzADQAMwA0ADUANgA3ADYAOAA2ADgANgABAAEAAQAB' +
+    'ADMANAAzADQANQA2ADcANgA4ADYAOAA2AAEAAQABAAEAMwA0ADMANAA1ADYANwA2ADgANgA4ADYAAQABAAEAAQAzADQAMwA0' +
+    'ADUANgA3ADYAOAA2ADgANgABAAEABgAGADMANAAzADQANQA2ADcANgA4ADYAOAA2AAcABwAHAAcAMwA0ADMANAA1ADYANwA2' +
+    'ADgANgA4ADYAAQABAAYABgA5ADoAOQA6ADsAPAA9ADwAPgA8AD4APAAHAAcABwAHADkAOgA5ADoAOwA8AD0APAA+ADwAPgA8' +
+    'AAEAAQABAAEAMwA0ADMANAA/AEAAQQBAAEIAQABCAEAAAQABAAEAAQAzADQAMwA0AD8AQABBAEAAQgBAAEIAQAABAAEAAQAB' +
+    'ADMANAAzADQAPwBAAEEAQABCAEAAQgBAAAEAAQABAAEAMwA0ADMANAA/AEAAQQBAAEIAQABCAEAAAQABAAYABgAzADQAMwA0' +
+    'AD8AQABBAEAAQgBAAEIAQAAHAAcABwAHADMANAAzADQAPwBAAEEAQABCAEAAQgBAAAEAAQAGAAYAOQA6ADkAOgBDAEQARQBE' +
+    'AEYARABGAEQABwAHAAcABwA5ADoAOQA6AEMARABFAEQARgBEAEYARAABAAEAAQABADMANAAzADQARwBIAEkASABKAEgASgBI' +
+    'AAEAAQABAAEAMwA0ADMANABHAEgASQBIAEoASABKAEgAAQABAAEAAQAzADQAMwA0AEcASABJAEgASgBIAEoASAABAAEAAQAB' +
+    'ADMANAAzADQARwBIAEkASABKAEgASgBIAAEAAQAGAAYAMwA0ADMANABHAEgASQBIAEoASABKAEgABwAHAAcABwAzADQAMwA0' +
+    'AEcASABJAEgASgBIAEoASAABAAEABgAGADkAOgA5ADoASwBMAE0ATABOAEwATgBMAAcABwAHAAcAOQA6ADkAOgBLAEwATQBM' +
+    'AE4ATABOAEwAAQABAAEAAQAzADQAMwA0AEcASABJAEgASgBIAEoASAABAAEAAQABADMANAAzADQARwBIAEkASABKAEgASgBI' +
+    'AAEAAQABAAEAMwA0ADMANABHAEgASQBIAEoASABKAEgAAQABAAEAAQAzADQAMwA0AEcASABJAEgASgBIAEoASAABAAEABgAG' +
+    'ADMANAAzADQARwBIAEkASABKAEgASgBIAAcABwAHAAcAMwA0ADMANABHAEgASQBIAEoASABKAEgAAQABAAYABgA5ADoAOQA6' +
+    'AEsATABNAEwATgBMAE4ATAAHAAcABwAHADkAOgA5ADoASwBMAE0ATABOAEwATgBMAAEAAQABAAEAMwA0ADMANAA1ADYANwA2' +
+    'ADgANgA4ADYAAQABAAEAAQAzADQAMwA0ADUANgA3ADYAOAA2ADgANgABAAEAAQABADMANAAzADQANQA2ADcANgA4ADYAOAA2' +
+    'AAEAAQABAAEAMwA0ADMANAA1ADYANwA2ADgANgA4ADYAAQABABcAFwAzADQAMwA0ADUANgA3ADYAOAA2ADgANgAYABkAGAAZ' +
+    'ADMANAAzADQANQA2ADcANgA4ADYAOAA2AAEAAQAXABcAOQA6ADkAOgA7ADwAPQA8AD4APAA+ADwAGAAZABgAGQA5ADoAOQA6' +
+    'ADsAPAA9ADwAPgA8AD4APAABAAEAAQABADMANAAzADQAPwBAAEEAQABCAEAAQgBAAAEAAQABAAEAMwA0ADMANAA/AEAAQQBA' +
+    'AEIAQABCAEAAAQABAAEAAQAzADQAMwA0AD8AQABBAEAAQgBAAEIAQAABAAEAAQABADMANAAzADQAPwBAAEEAQABCAEAAQgBA' +
+    'AAEAAQAXABcAMwA0ADMANAA/AEAAQQBAAEIAQABCAEAAGAAZABgAGQAzADQAMwA0AD8AQABBAEAAQgBAAEIAQAABAAEAFwAX' +
+    'ADkAOgA5ADoAQwBEAEUARABGAEQARgBEABgAGQAYABkAOQA6ADkAOgBDAEQARQBEAEYARABGAEQAAQABAAEAAQAzADQAMwA0' +
+    'AEcASABJAEgASgBIAEoASAABAAEAAQABADMANAAzADQARwBIAEkASABKAEgASgBIAAEAAQABAAEAMwA0ADMANABHAEgASQBI' +
+    'AEoASABKAEgAAQABAAEAAQAzADQAMwA0AEcASABJAEgASgBIAEoASAABAAEAFwAXADMANAAzADQARwBIAEkASABKAEgASgBI' +
+    'ABgAGQAYABkAMwA0ADMANABHAEgASQBIAEoASABKAEgAAQABABcAFwA5ADoAOQA6AEsATABNAEwATgBMAE4ATAAYABkAGAAZ' +
+    'ADkAOgA5ADoASwBMAE0ATABOAEwATgBMAAEAAQABAAEAMwA0ADMANABHAEgASQBIAEoASABKAEgAAQABAAEAAQAzADQAMwA0' +
+    'AEcASABJAEgASgBIAEoASAABAAEAAQABADMANAAzADQARwBIAEkASABKAEgASgBIAAEAAQABAAEAMwA0ADMANABHAEgASQBI' +
+    'AEoASABKAEgAAQABABcAFwAzADQAMwA0AEcASABJAEgASgBIAEoASAAYABkAGAAZADMANAAzADQARwBIAEkASABKAEgASgBI' +
+    'AAEAAQAXABcAOQA6ADkAOgBLAEwATQBMAE4ATABOAEwAGAAZABgAGQA5ADoAOQA6AEsATABNAEwATgBMAE4ATA==';
+
+export const CHORD_TABLE = Uint8Array.from(atob(ENCODED), c => c.charCodeAt(0));
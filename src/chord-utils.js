@@ -3,6 +3,8 @@
  * Shared chord helper functions used by the application
  */
 
+import { CHORD_TYPES, CHORD_TABLE } from './chord-table.js';
+
 // MIDI note number to note name mapping (using flats by default for jazz notation)
 export const NOTE_NAMES = ['C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B'];
 
@@ -52,6 +54,12 @@ export function noteNameToSemitone(noteName) {
 /**
  * Detect chord from array of note names
  * Uses jazz theory conventions - bass note is always the lowest note
+ *
+ * Builds a 12-bit interval mask relative to the bass and looks the chord type
+ * up in CHORD_TABLE (generated from detectChordByRules by
+ * scripts/generate_chord_table.py), so the cost no longer depends on the
+ * length of the rule chain.
+ *
  * @param {string[]} noteNames - Array of note names with octaves (e.g., ["C4", "E4", "G4"])
  * @returns {object|null} Chord info with root and type, or null if single note/no chord
  */
@@ -59,6 +67,36 @@ export function detectChord(noteNames) {
     if (noteNames.length < 2) {
         return noteNames.length === 1 ? { root: getPitchClass(noteNames[0]), type: '' } : null;
     }
+
+    const uniquePitches = [...new Set(noteNames.map(getPitchClass))];
+
+    if (uniquePitches.length < 2) {
+        return { root: uniquePitches[0], type: '' };
+    }
+
+    const root = uniquePitches[0];
+    const rootValue = noteNameToSemitone(root);
+
+    let mask = 0;
+    for (const note of uniquePitches) {
+        mask |= 1 << ((noteNameToSemitone(note) - rootValue + 12) % 12);
+    }
+
+    const type = CHORD_TYPES[CHORD_TABLE[mask]];
+    return type === 'Custom' ? { root, type, notes: uniquePitches } : { root, type };
+}
+
+/**
+ * Rule-based chord detection — the reference for detectChord
+ * CHORD_TABLE is generated from a port of these rules; after changing them,
+ * update scripts/generate_chord_table.py and regenerate src/chord-table.js
+ * @param {string[]} noteNames - Array of note names with octaves (e.g., ["C4", "E4", "G4"])
+ * @returns {object|null} Chord info with root and type, or null if single note/no chord
+ */
+export function detectChordByRules(noteNames) {
+    if (noteNames.length < 2) {
+        return noteNames.length === 1 ? { root: getPitchClass(noteNames[0]), type: '' } : null;
+    }
     
     // Get pitch classes (notes without octaves)
     const pitchClasses = noteNames.map(getPitchClass);
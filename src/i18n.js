@@ -75,6 +75,12 @@ export const translations = {
         'settings.lowLatencyOn': '⚡ Low-Latency Mode ON (unordered, no retransmits) — reconnect to apply',
         'settings.lowLatencyOff': '🔁 Low-Latency Mode OFF — reconnect to apply',
 
+        // MIDI relay mode
+        'settings.relayMode': '📡 Server MIDI Relay (large rooms)',
+        'settings.relayModeDesc': 'Sends your MIDI once to the signaling server, which forwards it to everyone in the room, instead of once per participant. Saves upload bandwidth and CPU in rooms with many players at the cost of one extra network hop. Reconnect after toggling.',
+        'settings.relayOn': '📡 MIDI Relay ON — reconnect to apply',
+        'settings.relayOff': '🔁 MIDI Relay OFF — reconnect to apply',
+
         // Emergency
         'debug.emergencyHotkey': 'Ctrl+Shift+F4',
         'debug.emergency': '🛑 Emergency: All Notes Off',
@@ -144,6 +150,8 @@ export const translations = {
         'webrtc.signalFailed': 'Unable to reconnect to signaling server',
         'webrtc.wtActive': '⚡ WebTransport (QUIC datagram) active',
         'webrtc.wtUnavailable': '⚠️ WebTransport unavailable ({error}), falling back to WebRTC',
+        'webrtc.relayActive': '📡 MIDI relay connected',
+        'webrtc.relayUnavailable': '⚠️ MIDI relay unavailable ({error}), sending MIDI peer-to-peer',
         'webrtc.wtReceiveError': '⚠️ WebTransport receive error: {error}',
         'webrtc.connected': '✅ Connected to {peer}{mode} ({n} peer{plural} total)',
         'webrtc.connectedMode': ' ⚡ Low-Latency',
@@ -356,6 +364,12 @@ export const translations = {
         'settings.lowLatencyOn': '⚡ Режим минимальной задержки ВКЛЮЧЁН — переподключитесь для применения',
         'settings.lowLatencyOff': '🔁 Режим минимальной задержки ВЫКЛЮЧЕН — переподключитесь для применения',
 
+        // MIDI relay mode
+        'settings.relayMode': '📡 Серверная пересылка MIDI (большие комнаты)',
+        'settings.relayModeDesc': 'Отправляет ваш MIDI один раз на сервер сигнализации, который пересылает его всем в комнате, вместо отдельной отправки каждому участнику. Экономит исходящий трафик и процессор в комнатах с большим числом игроков ценой одного дополнительного сетевого перехода. Переподключитесь после переключения.',
+        'settings.relayOn': '📡 Пересылка MIDI ВКЛЮЧЕНА — переподключитесь для применения',
+        'settings.relayOff': '🔁 Пересылка MIDI ВЫКЛЮЧЕНА — переподключитесь для применения',
+
         // Emergency
         'debug.emergencyHotkey': 'Ctrl+Shift+F4',
         'debug.emergency': '🛑 Аварийное отключение нот',
@@ -425,6 +439,8 @@ export const translations = {
         'webrtc.signalFailed': 'Не удалось переподключиться к серверу сигнализации',
         'webrtc.wtActive': '⚡ WebTransport (QUIC датаграмма) активен',
         'webrtc.wtUnavailable': '⚠️ WebTransport недоступен ({error}), используется WebRTC',
+        'webrtc.relayActive': '📡 Пересылка MIDI через сервер подключена',
+        'webrtc.relayUnavailable': '⚠️ Пересылка MIDI недоступна ({error}), MIDI отправляется напрямую',
         'webrtc.wtReceiveError': '⚠️ Ошибка получения WebTransport: {error}',
         'webrtc.connected': '✅ Подключено к {peer}{mode} (всего {n} участник{plural})',
         'webrtc.connectedMode': ' ⚡ Мин. задержка',
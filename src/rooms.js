@@ -12,6 +12,8 @@ export class RoomManager {
         this.rooms = [];
         this.isLoading = false;
         this.lastRoomNames = new Set();
+        this.etag = null;          // version of this.rooms, from the signaler's ETag
+        this._watch = null;        // AbortController of the running long-poll
     }
 
     /**
@@ -34,9 +36,12 @@ export class RoomManager {
                 cache: 'no-store',
                 headers: {
                     'Accept': 'application/json',
+                    ...(this.etag ? { 'If-None-Match': this.etag } : {}),
                 },
             });
 
+            if (response.status === 304) return this.rooms;
+
             if (!response.ok) {
                 console.error('Failed to fetch rooms:', response.status);
                 return [];
@@ -44,6 +49,7 @@ export class RoomManager {
 
             const data = await response.json();
             this.rooms = Array.isArray(data) ? data : [];
+            this.etag = response.headers.get('ETag');
             
             // Sort rooms by peer count (descending)
             this.rooms.sort((a, b) => b.peerCount - a.peerCount);
@@ -57,6 +63,84 @@ export class RoomManager {
         }
     }
 
+    /**
+     * Long-poll the signaler for room list changes.
+     *
+     * Each request is held by the signaler until the list changes (or 25 s
+     * pass) and returns only the rooms that changed. onChange receives the
+     * full, sorted list after every change. Resolves false when the signaler
+     * does not version /rooms, so the caller can fall back to polling.
+     */
+    async watchRooms(onChange) {
+        this.stopWatching();
+        const controller = new AbortController();
+        this._watch = controller;
+
+        await this.fetchRooms();
+        if (controller.signal.aborted) return true;
+        if (!this.etag) {
+            this._watch = null;
+            return false;
+        }
+        onChange(this.rooms);
+
+        (async () => {
+            let failures = 0;
+            while (!controller.signal.aborted) {
+                try {
+                    const response = await fetch(`${this.getSignalerUrl()}/rooms?wait=25&delta=1`, {
+                        method: 'GET',
+                        cache: 'no-store',
+                        headers: {
+                            'Accept': 'application/json',
+                            'If-None-Match': this.etag,
+                        },
+                        signal: controller.signal,
+                    });
+                    if (response.status === 304) {
+                        failures = 0;
+                        continue;
+                    }
+                    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+                    const delta = await response.json();
+                    this.applyDelta(delta);
+                    this.etag = delta.version ?? response.headers.get('ETag');
+                    failures = 0;
+                    onChange(this.rooms);
+                } catch (error) {
+                    if (controller.signal.aborted) return;
+                    console.error('Error watching rooms:', error);
+                    failures++;
+                    await new Promise((resolve) => setTimeout(resolve, Math.min(30000, 1000 * 2 ** failures)));
+                }
+            }
+        })();
+        return true;
+    }
+
+    /**
+     * Stop the long-poll started by watchRooms()
+     */
+    stopWatching() {
+        this._watch?.abort();
+        this._watch = null;
+    }
+
+    /**
+     * Apply a /rooms?delta=1 response to this.rooms
+     */
+    applyDelta(delta) {
+        const byName = new Map(delta.full ? [] : this.rooms.map((room) => [room.name, room]));
+        for (const room of (delta.full ? delta.rooms : delta.changed) || []) {
+            byName.set(room.name, room);
+        }
+        for (const name of delta.removed || []) {
+            byName.delete(name);
+        }
+        this.rooms = [...byName.values()].sort((a, b) => b.peerCount - a.peerCount);
+    }
+
     /**
      * Display rooms in the UI
      */
@@ -7,6 +7,8 @@
  *  • IPv6 preference: non-IPv6 candidates filtered when disabled
  *  • Binary MIDI path: Uint8Array through DataChannel (no JSON overhead)
  *  • One-way latency estimation via performance.now() timestamps in binary packets
+ *  • MIDI relay mode: binary packets go once to the signaler's /relay, which
+ *    fans them out, instead of N−1 times over the mesh (large rooms)
  *  • WebTransport skeleton (datagram mode) with graceful fallback to WebRTC
  */
 
@@ -14,6 +16,8 @@ const SIGNALING_HOST  = location.hostname;
 const SIGNALING_PROTO = location.protocol === 'https:' ? 'wss' : 'ws';
 const SIGNALING_URL   = (room, peer) =>
     `${SIGNALING_PROTO}://${SIGNALING_HOST}/signal?room=${encodeURIComponent(room)}&peer=${encodeURIComponent(peer)}`;
+const RELAY_URL       = (room, peer) =>
+    `${SIGNALING_PROTO}://${SIGNALING_HOST}/relay?room=${encodeURIComponent(room)}&peer=${encodeURIComponent(peer)}`;
 
 const DEFAULT_ICE_SERVERS = [
     { urls: 'stun:stun.l.google.com:19302' },
@@ -22,6 +26,17 @@ const DEFAULT_ICE_SERVERS = [
     { urls: 'stun:stun.stunprotocol.org:3478' },
 ];
 
+// Ranked, trimmed list written by `scripts/test_turn_server.py --rank`.
+// Only STUN entries are taken: TURN needs credentials from the PHP endpoint.
+let iceServers = DEFAULT_ICE_SERVERS;
+const iceServersLoading = fetch('ice-servers.json')
+    .then(res => res.ok ? res.json() : null)
+    .then(cfg => {
+        const stun = (cfg?.iceServers ?? []).filter(s => [s.urls].flat().every(u => /^stuns?:/.test(u)));
+        if (stun.length) iceServers = stun;
+    })
+    .catch(() => {});   // no ranked list deployed — keep the defaults
+
 // ── ICE candidate analyser ─────────────────────────────────────────────────────
 
 function analyseCandidate(candidate) {
@@ -51,17 +66,95 @@ class PeerConn {
     isOpen() { return this.dataChannel?.readyState === 'open'; }
 }
 
+// ── MIDI relay ─────────────────────────────────────────────────────────────────
+
+/**
+ * Split a relay frame into sender id and midi-worker.js packet.
+ *
+ * Layout (shared by the WebSocket relay and WebTransport datagrams):
+ *   byte 0        sender id length L
+ *   bytes 1..L    sender peer id (UTF-8)
+ *   remaining     packet as built by midi-worker.js
+ */
+function decodeRelayFrame(bytes) {
+    const len = bytes[0];
+    if (bytes.length <= 1 + len) return null;
+    return {
+        from:   new TextDecoder().decode(bytes.subarray(1, 1 + len)),
+        packet: bytes.subarray(1 + len),
+    };
+}
+
+/**
+ * MidiRelay — binary MIDI over the signaler's /relay WebSocket.
+ *
+ * The server forwards each packet to the other relay subscribers in the
+ * room through bounded per-subscriber queues, and announces the current
+ * subscriber set so the manager can keep using the mesh for peers that
+ * are not on the relay.
+ */
+class MidiRelay {
+    constructor(url, onPacket, onSubscribers) {
+        this.url           = url;
+        this.onPacket      = onPacket;        // (fromId, Uint8Array) => void
+        this.onSubscribers = onSubscribers;   // (Set<peerId>) => void
+        this.ws            = null;
+    }
+
+    connect() {
+        return new Promise((resolve, reject) => {
+            const ws = new WebSocket(this.url);
+            ws.binaryType = 'arraybuffer';
+            this.ws = ws;
+            // A socket that opens after we gave up would stay subscribed and
+            // keep delivering room MIDI that nothing can disconnect
+            const fail = (err) => {
+                clearTimeout(timer);
+                ws.onopen = ws.onerror = ws.onclose = ws.onmessage = null;
+                ws.close();
+                if (this.ws === ws) this.ws = null;
+                reject(err);
+            };
+            const timer = setTimeout(() => fail(new Error(`Cannot reach MIDI relay at ${this.url}`)), 5000);
+            ws.onopen    = () => { clearTimeout(timer); ws.onerror = null; resolve(); };
+            ws.onerror   = () => fail(new Error('MIDI relay WebSocket error'));
+            ws.onclose   = () => this.onSubscribers(new Set());
+            ws.onmessage = ({ data }) => {
+                if (typeof data === 'string') {
+                    try {
+                        const msg = JSON.parse(data);
+                        if (msg.type === 'subscribers') this.onSubscribers(new Set(msg.peers));
+                    } catch {}
+                    return;
+                }
+                const frame = decodeRelayFrame(new Uint8Array(data));
+                if (frame) this.onPacket(frame.from, frame.packet);
+            };
+        });
+    }
+
+    isOpen() { return this.ws?.readyState === WebSocket.OPEN; }
+
+    send(uint8Array) { this.ws.send(uint8Array); }
+
+    close() {
+        if (this.ws) { this.ws.onclose = null; this.ws.close(); }
+        this.ws = null;
+    }
+}
+
 // ── WebTransport skeleton ──────────────────────────────────────────────────────
 
 /**
  * WebTransportRelay — skeleton for datagram-mode WebTransport.
  *
  * True browser-native WebTransport requires an HTTPS/3 server endpoint
- * (not direct P2P). For a real deployment you would run a QUIC relay (e.g.
- * using Go's quic-go library or Cloudflare Workers) and set webTransportUrl.
+ * (not direct P2P). The signaler's /relay speaks WebSocket only; an HTTP/3
+ * front (e.g. quic-go's webtransport-go) that forwards datagrams in the
+ * same relay frame format can be pointed to with webTransportUrl.
  *
- * Until a relay server exists this class self-reports as unavailable so the
- * manager falls back to WebRTC automatically.
+ * Without webTransportUrl this class is never used and the manager falls
+ * back to the WebSocket relay or WebRTC automatically.
  */
 class WebTransportRelay {
     constructor(url) {
@@ -137,6 +230,11 @@ export class WebRTCManager {
         this.maxReconnectAttempts = 6;
         this.reconnectTimer       = null;
 
+        // Server-side MIDI relay (large rooms)
+        this.relayMode       = false;
+        this._relay          = null;
+        this._relayPeers     = new Set();   // peers receiving our MIDI via the relay
+
         // WebTransport (experimental)
         this.webTransportUrl = null;
         this._wt             = null;
@@ -160,11 +258,13 @@ export class WebRTCManager {
         this.roomName = roomName;
         this.myId     = this._uid();
         this.onStatusUpdate(this._t('webrtc.connecting'), 'info');
+        await iceServersLoading;
 
         // Try WebTransport if relay URL is configured
         if (this.webTransportUrl && WebTransportRelay.isSupported()) {
             try {
-                this._wt = new WebTransportRelay(this.webTransportUrl);
+                this._wt = new WebTransportRelay(
+                    `${this.webTransportUrl}?room=${encodeURIComponent(roomName)}&peer=${encodeURIComponent(this.myId)}`);
                 await this._wt.connect();
                 this.useWebTransport = true;
                 this.onStatusUpdate(this._t('webrtc.wtActive'), 'success');
@@ -176,6 +276,8 @@ export class WebRTCManager {
             }
         }
 
+        if (this.relayMode && !this.useWebTransport) await this._relayOpen();
+
         await this._wsOpen();
         this._send({ type: 'join', from: this.myId });
         this.onStatusUpdate(this._t('webrtc.waiting'), 'info', false);
@@ -206,8 +308,16 @@ export class WebRTCManager {
             this._wt?.send(data).catch(e => console.warn('WT send error:', e));
             return 1;
         }
+        // Binary MIDI: one upload to the relay reaches every subscriber;
+        // peers not on the relay still get it over their DataChannel.
+        const viaRelay = data instanceof Uint8Array && this._relay?.isOpen() && this._relayPeers.size > 0;
         let sent = 0;
+        if (viaRelay) {
+            this._relay.send(data);
+            sent += this._relayPeers.size;
+        }
         for (const p of this.peers.values()) {
+            if (viaRelay && this._relayPeers.has(p.remoteId)) continue;
             if (p.isOpen()) {
                 if (data instanceof Uint8Array) {
                     p.dataChannel.send(data);
@@ -253,6 +363,7 @@ export class WebRTCManager {
         // Stop any running stability test
         if (this._stabTimer) { clearInterval(this._stabTimer); this._stabTimer = null; }
         this._wt?.close(); this._wt = null; this.useWebTransport = false;
+        this._relay?.close(); this._relay = null; this._relayPeers = new Set();
     }
 
     sendPing() {
@@ -356,12 +467,33 @@ export class WebRTCManager {
         this._lastProbeSeq     = msg.seq;
     }
 
+    // ── MIDI relay ────────────────────────────────────────────────────────────
+
+    async _relayOpen() {
+        this._relay = new MidiRelay(
+            RELAY_URL(this.roomName, this.myId),
+            (fromId, packet) => this._handleBinaryPacket(packet, fromId),
+            (subscribers) => {
+                subscribers.delete(this.myId);
+                this._relayPeers = subscribers;
+            },
+        );
+        try {
+            await this._relay.connect();
+            this.onStatusUpdate(this._t('webrtc.relayActive'), 'success', false);
+        } catch (err) {
+            this.onStatusUpdate(this._t('webrtc.relayUnavailable').replace('{error}', err.message), 'warning', false);
+            this._relay = null;
+        }
+    }
+
     // ── WebTransport receive loop ─────────────────────────────────────────────
 
     async _startWebTransportReceiveLoop() {
         try {
             for await (const datagram of this._wt.receive()) {
-                this._handleBinaryPacket(datagram, 'webtransport');
+                const frame = decodeRelayFrame(datagram);
+                if (frame) this._handleBinaryPacket(frame.packet, frame.from);
             }
         } catch (err) {
             if (!this.manualDisconnect) {
@@ -404,7 +536,10 @@ export class WebRTCManager {
         }
         const delay = Math.min(30000, 1000 * Math.pow(2, ++this.reconnectAttempts));
         this.reconnectTimer = setTimeout(async () => {
-            try { await this._wsOpen(); this._send({ type:'join', from:this.myId }); }
+            try {
+                await this._wsOpen(); this._send({ type:'join', from:this.myId });
+                if (this.relayMode && !this.useWebTransport && !this._relay?.isOpen()) await this._relayOpen();
+            }
             catch { this._scheduleReconnect(); }
         }, delay);
     }
@@ -467,7 +602,7 @@ export class WebRTCManager {
         this.peers.set(remoteId, peer);
 
         const pc = new RTCPeerConnection({
-            iceServers:           DEFAULT_ICE_SERVERS,
+            iceServers:           iceServers,
             iceCandidatePoolSize: 4,
             bundlePolicy:         'max-bundle',
             rtcpMuxPolicy:        'require',
@@ -96,6 +96,24 @@ test('Toggling Low-Latency Mode appends a message to the log', async () => {
     await page.locator('#lowLatencyMode').evaluate(el => el.click());
 });
 
+// ── MIDI relay toggle ─────────────────────────────────────────────────────────
+
+test('MIDI relay checkbox exists and is unchecked by default', async () => {
+    await expect(page.locator('#relayMode')).toHaveCount(1);
+    const checked = await page.locator('#relayMode').evaluate(el => el.checked);
+    expect(checked).toBe(false);
+});
+
+test('Toggling MIDI relay appends a message to the log', async () => {
+    const before = (await page.locator('#messageLog').innerText()).length;
+    await page.locator('#relayMode').evaluate(el => el.click());
+    await page.waitForTimeout(250);
+    const after = (await page.locator('#messageLog').innerText()).length;
+    expect(after).toBeGreaterThan(before);
+    // Reset
+    await page.locator('#relayMode').evaluate(el => el.click());
+});
+
 // ── IP version badge CSS ──────────────────────────────────────────────────────
 
 test('IP badge accepts ip-version-v6 class', async () => {
@@ -201,6 +219,22 @@ test('Packet with timestamp: flag=0x01, f64 timestamp, MIDI bytes intact', async
     expect(r.decoded).toEqual([0x80,60,0]);
 });
 
+test('Relay frame: sender id prefix is stripped, packet intact', async () => {
+    const r = await page.evaluate(() => {
+        const id=new TextEncoder().encode('abc123');
+        const packet=new Uint8Array([0x00,0x90,64,90]);
+        const frame=new Uint8Array(1+id.length+packet.length);
+        frame[0]=id.length; frame.set(id,1); frame.set(packet,1+id.length);
+        const len=frame[0];
+        return {
+            from:new TextDecoder().decode(frame.subarray(1,1+len)),
+            packet:Array.from(frame.subarray(1+len)),
+        };
+    });
+    expect(r.from).toBe('abc123');
+    expect(r.packet).toEqual([0x00,0x90,64,90]);
+});
+
 // ── Service worker ────────────────────────────────────────────────────────────
 
 test('Service worker cache version is >= v1.4.0', async () => {